@@ -0,0 +1,213 @@
+"""Бенчмарк RealStatCollector на большой синтетической таблице messages.
+
+Данные генерируются в отдельной схеме (по умолчанию stats_bench), поэтому
+рабочая таблица messages не затрагивается; схема удаляется после прогона.
+Сравниваются последовательные запросы (по запросу на каждый период и
+timeline), однопроходный параллельный сбор RealStatCollector.get_stats
+по сырым строкам, он же после заполнения дневного rollup и приближённый
+режим (HyperLogLog скетчи дней).
+
+Запуск:
+    uv run python -m backend.api.benchmark_stats --rows 1000000 --runs 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+from functools import partial
+
+import asyncpg  # type: ignore[import-untyped]
+
+from backend.api.collectors import PERIOD_DURATIONS, RealStatCollector
+from backend.api.config import APIConfig
+from backend.api.models import MetricCard, PeriodEnum
+from backend.api.rollup import RollupRefresher
+
+SEED_SQL = """
+    INSERT INTO messages (user_id, chat_id, role, content, content_length, username, created_at)
+    SELECT
+        u,
+        u % 5000,
+        CASE WHEN i % 2 = 0 THEN 'user' ELSE 'assistant' END,
+        'benchmark message',
+        17,
+        'user' || u,
+        $2::timestamp - (random() * $3) * INTERVAL '1 day'
+    FROM generate_series(1, $1) AS i,
+        LATERAL (SELECT (i::bigint * 7919) % $4 + 1 AS u) AS users
+"""
+
+METRICS_SQL = """
+    SELECT
+        COUNT(*) as total_messages,
+        COUNT(DISTINCT user_id) as active_users,
+        COUNT(DISTINCT (chat_id, user_id)) as total_dialogs
+    FROM messages
+    WHERE created_at >= $1 AND created_at < $2
+"""
+
+TIMELINE_SQL = """
+    SELECT
+        DATE(created_at) as date,
+        COUNT(*) as total_messages,
+        COUNT(DISTINCT user_id) as active_users
+    FROM messages
+    WHERE created_at >= $1 AND created_at < $2
+    GROUP BY DATE(created_at)
+    ORDER BY date
+"""
+
+
+async def sequential_stats(pool: asyncpg.Pool, period: PeriodEnum) -> None:
+    """Прежняя схема сбора: три последовательных запроса на отдельных соединениях.
+
+    Args:
+        pool: Connection pool
+        period: Период статистики
+    """
+    collector = RealStatCollector(pool)
+    current_end = datetime.now(UTC)
+    current_start = collector._get_period_start(current_end, period)
+    previous_start = collector._get_period_start(current_start, period)
+    bounds = [
+        (current_start, current_end, METRICS_SQL),
+        (previous_start, current_start, METRICS_SQL),
+        (current_start, current_end, TIMELINE_SQL),
+    ]
+    for start, end, sql in bounds:
+        async with pool.acquire() as conn:
+            await conn.fetch(sql, start.replace(tzinfo=None), end.replace(tzinfo=None))
+
+
+def relative_error(exact: MetricCard, approx: MetricCard) -> float:
+    """Относительная ошибка приближённой метрики (%).
+
+    Args:
+        exact: Точная метрика
+        approx: Приближённая метрика
+
+    Returns:
+        Ошибка в процентах от точного значения
+    """
+    if not exact.value:
+        return 0.0 if not approx.value else 100.0
+    return abs(approx.value - exact.value) / exact.value * 100
+
+
+async def measure(operation: Callable[[], Awaitable[object]], runs: int) -> list[float]:
+    """Время выполнения операции (мс) за runs прогонов после одного прогрева.
+
+    Args:
+        operation: Измеряемая операция
+        runs: Количество прогонов
+
+    Returns:
+        Время каждого прогона в миллисекундах
+    """
+    await operation()
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await operation()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def main(rows: int, users: int, days: int, runs: int, schema: str) -> None:
+    """Заполнение схемы бенчмарка и сравнение способов сбора статистики.
+
+    Args:
+        rows: Количество сообщений
+        users: Количество пользователей
+        days: Глубина истории (дни)
+        runs: Количество прогонов на каждый вариант
+        schema: Временная схема для данных бенчмарка
+    """
+    config = APIConfig()  # type: ignore[call-arg]
+    admin = await asyncpg.connect(config.get_db_dsn())
+    try:
+        await admin.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        await admin.execute(f"CREATE SCHEMA {schema}")
+        tables = (
+            "messages",
+            "message_daily_rollup",
+            "message_rollup_days",
+            "message_daily_stats",
+            "message_hourly_stats",
+        )
+        for table in tables:
+            await admin.execute(
+                f"CREATE TABLE {schema}.{table} (LIKE public.{table} INCLUDING ALL)"
+            )
+
+        pool = await asyncpg.create_pool(
+            config.get_db_dsn(),
+            min_size=2,
+            max_size=4,
+            server_settings={"search_path": schema},
+        )
+        results: dict[PeriodEnum, list[list[float]]] = {}
+        try:
+            print(f"Seeding {rows} messages ({users} users, {days} days)...")
+            async with pool.acquire() as conn:
+                now = datetime.now(UTC).replace(tzinfo=None)
+                await conn.execute(SEED_SQL, rows, now, float(days), users)
+                await conn.execute("ANALYZE messages")
+
+            # Фиксированные периоды (custom требует явных границ)
+            collector = RealStatCollector(pool)
+            for period in PERIOD_DURATIONS:
+                before = await measure(partial(sequential_stats, pool, period), runs)
+                raw = await measure(partial(collector.get_stats, period), runs)
+                results[period] = [before, raw]
+
+            started = time.perf_counter()
+            await RollupRefresher(pool).refresh()
+            print(f"Rollup refresh: {(time.perf_counter() - started) * 1000:.1f} ms")
+            approximate = RealStatCollector(pool, approximate=True)
+            for period in PERIOD_DURATIONS:
+                results[period].append(await measure(partial(collector.get_stats, period), runs))
+                results[period].append(await measure(partial(approximate.get_stats, period), runs))
+
+            for period, (before, raw, rolled, approx) in results.items():
+                baseline = statistics.median(before)
+                print(
+                    f"{period.value:>4}: sequential {baseline:8.1f} ms"
+                    f" | single-pass {statistics.median(raw):8.1f} ms"
+                    f" | with rollup {statistics.median(rolled):8.1f} ms"
+                    f" | approximate {statistics.median(approx):8.1f} ms"
+                    f" (x{baseline / statistics.median(approx):.1f})"
+                )
+
+            for period in PERIOD_DURATIONS:
+                exact_metrics = (await collector.get_stats(period)).metrics
+                approx_metrics = (await approximate.get_stats(period)).metrics
+                users_error = relative_error(
+                    exact_metrics.active_users, approx_metrics.active_users
+                )
+                dialogs_error = relative_error(
+                    exact_metrics.total_dialogs, approx_metrics.total_dialogs
+                )
+                print(
+                    f"{period.value:>4}: approximate error active_users {users_error:.2f}%"
+                    f" | total_dialogs {dialogs_error:.2f}%"
+                )
+        finally:
+            await pool.close()
+    finally:
+        await admin.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        await admin.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dashboard stats queries")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Seeded messages")
+    parser.add_argument("--users", type=int, default=2_000, help="Distinct users")
+    parser.add_argument("--days", type=int, default=180, help="History depth in days")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per variant")
+    parser.add_argument("--schema", default="stats_bench", help="Temporary schema name")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.users, args.days, args.runs, args.schema))
@@ -1,13 +1,19 @@
 """Сервис обработки чат сообщений."""
 
 import logging
+from collections.abc import AsyncIterator
 from datetime import datetime
 
 import asyncpg  # type: ignore[import-untyped]
 
-from backend.api.models import ChatMode, ChatRequest, ChatResponse
+from backend.api.models import ChatMode, ChatRequest, ChatResponse, ChatStreamEvent
 from backend.api.prompts import CHAT_SYSTEM_PROMPT
+from backend.api.result_summary import ResultSummary
+from backend.api.schema_catalog import SchemaCatalog
+from backend.api.sql_cache import DATA_VERSION_SQL, SQLCache
 from backend.api.sql_generator import SQLGenerator
+from backend.api.sql_sandbox import SQLSandbox
+from backend.api.sql_templates import SQLTemplateMatcher
 from src.llm.client import LLMClient
 from src.storage.models import Message
 
@@ -17,25 +23,40 @@ logger = logging.getLogger(__name__)
 class ChatService:
     """Сервис для обработки сообщений чата в разных режимах."""
 
-    def __init__(self, llm_client: LLMClient, db_pool: asyncpg.Pool):
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        db_pool: asyncpg.Pool,
+        sql_cache: SQLCache | None = None,
+        templates: SQLTemplateMatcher | None = None,
+        sandbox: SQLSandbox | None = None,
+        schema_catalog: SchemaCatalog | None = None,
+    ):
         """Инициализация сервиса чата.
 
         Args:
             llm_client: Клиент для работы с LLM
             db_pool: Connection pool к базе данных
+            sql_cache: Кэш text-to-SQL (общий для всех запросов, None - без кэша)
+            templates: Шаблоны частых вопросов admin режима (None - всегда через LLM)
+            sandbox: Ограниченное выполнение SQL admin режима (None - через db_pool)
+            schema_catalog: Каталог схемы БД для генерации SQL (None - схема по умолчанию)
         """
         self.llm_client = llm_client
         self.db_pool = db_pool
-        self.sql_generator = SQLGenerator(llm_client)
+        self.sql_cache = sql_cache
+        self.templates = templates
+        self.sql_generator = SQLGenerator(llm_client, sandbox, schema_catalog)
 
     async def process_message(
-        self, request: ChatRequest, history: list[Message]
+        self, request: ChatRequest, history: list[Message], chat_id: int | None = None
     ) -> ChatResponse:
         """Обрабатывает сообщение в зависимости от режима.
 
         Args:
             request: Запрос с сообщением и режимом
             history: История предыдущих сообщений
+            chat_id: ID чата сессии (для справедливой очереди запросов к LLM)
 
         Returns:
             Ответ от чата
@@ -49,18 +70,148 @@ class ChatService:
         )
 
         if request.mode == ChatMode.NORMAL:
-            return await self._process_normal(request, history)
+            return await self._process_normal(request, history, chat_id)
         else:
             return await self._process_admin(request, history)
 
+    async def stream_message(
+        self, request: ChatRequest, history: list[Message], chat_id: int | None = None
+    ) -> AsyncIterator[ChatStreamEvent]:
+        """Обрабатывает сообщение с потоковой выдачей событий.
+
+        В обычном режиме отдает фрагменты ответа LLM по мере генерации.
+        В режиме администратора отдает этапы pipeline (SQL сгенерирован,
+        строки получены), затем фрагменты интерпретации.
+        Последнее событие - done с полным ответом (или error в обычном режиме).
+
+        Args:
+            request: Запрос с сообщением и режимом
+            history: История предыдущих сообщений
+            chat_id: ID чата сессии (для справедливой очереди запросов к LLM)
+
+        Yields:
+            События потока
+        """
+        logger.info(
+            f"Streaming message in {request.mode} mode, "
+            f"session={request.session_id}, history_len={len(history)}"
+        )
+
+        if request.mode == ChatMode.NORMAL:
+            events = self._stream_normal(request, history, chat_id)
+        else:
+            events = self._stream_admin(request)
+
+        async for event in events:
+            yield event
+
+    async def _stream_normal(
+        self, request: ChatRequest, history: list[Message], chat_id: int | None = None
+    ) -> AsyncIterator[ChatStreamEvent]:
+        """Потоковая обработка в обычном режиме.
+
+        Args:
+            request: Запрос с сообщением
+            history: История диалога
+            chat_id: ID чата сессии
+
+        Yields:
+            События token, затем done (или error)
+        """
+        try:
+            current_message = Message(
+                user_id=0,  # Для веб-чата используем 0
+                chat_id=0,
+                role="user",
+                content=request.message,
+                content_length=len(request.message),
+                username="web_user",
+            )
+
+            stream = self.llm_client.stream_response(
+                messages=history + [current_message],
+                system_prompt=CHAT_SYSTEM_PROMPT,
+                chat_id=chat_id,
+            )
+            async for delta in stream:
+                yield ChatStreamEvent(event="token", data={"text": delta})
+
+            logger.info(
+                f"NORMAL mode stream finished: length={len(stream.text)}, "
+                f"ttft={stream.time_to_first_token:.3f}s"
+            )
+            yield ChatStreamEvent(
+                event="done",
+                data={"message": stream.text, "mode": ChatMode.NORMAL.value, "sql_query": None},
+            )
+
+        except Exception as e:
+            logger.error(f"Error in NORMAL mode stream: {e}")
+            yield ChatStreamEvent(event="error", data={"message": str(e)})
+
+    async def _stream_admin(self, request: ChatRequest) -> AsyncIterator[ChatStreamEvent]:
+        """Потоковая обработка в режиме администратора (text-to-SQL pipeline).
+
+        Args:
+            request: Запрос с вопросом по статистике
+
+        Yields:
+            События stage, token, затем done
+        """
+        sql: str | None = None
+        try:
+            match = self.templates.match(request.message) if self.templates else None
+            if match is not None:
+                # Частый вопрос: SQL и ответ по шаблону, без LLM
+                sql = match.sql
+                yield ChatStreamEvent(event="stage", data={"stage": "sql_generated", "sql": sql})
+                rows = await self.sql_generator.execute_sql(sql, self.db_pool, *match.args)
+                yield ChatStreamEvent(
+                    event="stage", data={"stage": "rows_fetched", "rows": len(rows)}
+                )
+                answer = match.render(rows)
+                yield ChatStreamEvent(event="token", data={"text": answer})
+            else:
+                sql = await self._get_sql(request.message)
+                yield ChatStreamEvent(
+                    event="stage", data={"stage": "sql_generated", "sql": sql}
+                )
+
+                results = await self._get_results(request.message, sql)
+                yield ChatStreamEvent(
+                    event="stage", data={"stage": "rows_fetched", "rows": results.row_count}
+                )
+
+                stream = self.sql_generator.interpret_results_stream(
+                    request.message, sql, results
+                )
+                async for delta in stream:
+                    yield ChatStreamEvent(event="token", data={"text": delta})
+
+                answer = stream.text
+
+        except Exception as e:
+            logger.error(f"Error in ADMIN mode stream: {e}")
+            answer = (
+                f"Произошла ошибка при обработке запроса: {str(e)}\n\n"
+                "Попробуйте переформулировать вопрос или обратитесь к администратору."
+            )
+            sql = None
+
+        yield ChatStreamEvent(
+            event="done",
+            data={"message": answer, "mode": ChatMode.ADMIN.value, "sql_query": sql},
+        )
+
     async def _process_normal(
-        self, request: ChatRequest, history: list[Message]
+        self, request: ChatRequest, history: list[Message], chat_id: int | None = None
     ) -> ChatResponse:
         """Обрабатывает сообщение в обычном режиме (прямое общение с LLM).
 
         Args:
             request: Запрос с сообщением
             history: История диалога
+            chat_id: ID чата сессии
 
         Returns:
             Ответ от LLM
@@ -83,7 +234,7 @@ class ChatService:
 
             # Получаем ответ от LLM
             response = await self.llm_client.get_response(
-                messages=full_history, system_prompt=CHAT_SYSTEM_PROMPT
+                messages=full_history, system_prompt=CHAT_SYSTEM_PROMPT, chat_id=chat_id
             )
 
             logger.info(f"NORMAL mode response length: {len(response)}")
@@ -109,11 +260,19 @@ class ChatService:
         logger.info("Processing in ADMIN mode (text-to-SQL pipeline)")
 
         try:
-            # 1. Генерация SQL через LLM
-            sql = await self.sql_generator.generate_sql(request.message)
+            # 0. Частые вопросы - по шаблону, без LLM
+            match = self.templates.match(request.message) if self.templates else None
+            if match is not None:
+                rows = await self.sql_generator.execute_sql(match.sql, self.db_pool, *match.args)
+                return ChatResponse(
+                    message=match.render(rows), sql_query=match.sql, mode=ChatMode.ADMIN
+                )
 
-            # 2. Выполнение SQL запроса
-            results = await self.sql_generator.execute_sql(sql, self.db_pool)
+            # 1. Генерация SQL через LLM (или из кэша для повторного вопроса)
+            sql = await self._get_sql(request.message)
+
+            # 2. Выполнение SQL запроса (или результаты из кэша, если данные не менялись)
+            results = await self._get_results(request.message, sql)
 
             # 3. Интерпретация результатов через LLM
             answer = await self.sql_generator.interpret_results(request.message, sql, results)
@@ -135,3 +294,45 @@ class ChatService:
             )
             return ChatResponse(message=error_message, mode=ChatMode.ADMIN)
 
+    async def _get_sql(self, question: str) -> str:
+        """SQL для вопроса: из кэша или сгенерированный LLM.
+
+        Args:
+            question: Вопрос пользователя
+
+        Returns:
+            SQL запрос
+        """
+        if self.sql_cache is not None:
+            sql = self.sql_cache.get_sql(question)
+            if sql is not None:
+                logger.info("ADMIN mode: SQL taken from cache")
+                return sql
+        return await self.sql_generator.generate_sql(question)
+
+    async def _get_results(self, question: str, sql: str) -> ResultSummary:
+        """Сводка результатов SQL запроса: из кэша, если данные не менялись, иначе из БД.
+
+        SQL запоминается для вопроса только после успешного выполнения.
+
+        Args:
+            question: Вопрос пользователя
+            sql: SQL запрос
+
+        Returns:
+            Сводка результатов
+        """
+        if self.sql_cache is None:
+            return await self.sql_generator.summarize_sql(sql, self.db_pool)
+
+        # Версия читается до выполнения: изменения во время запроса инвалидируют результат
+        async with self.db_pool.acquire() as conn:
+            version = await conn.fetchval(DATA_VERSION_SQL)
+        results = self.sql_cache.get_results(sql, version)
+        if results is None:
+            results = await self.sql_generator.summarize_sql(sql, self.db_pool)
+            self.sql_cache.put_results(sql, version, results)
+        else:
+            logger.info(f"ADMIN mode: results of {results.row_count} rows taken from cache")
+        self.sql_cache.put_sql(question, sql)
+        return results
@@ -1,12 +1,16 @@
 """Реализации сборщиков статистики."""
 
+import asyncio
+import math
 import random
-from datetime import UTC, datetime, timedelta
+from datetime import UTC, date, datetime, timedelta
 from typing import Any
 
 import asyncpg  # type: ignore[import-untyped]
 
+from backend.api.hll import HyperLogLog
 from backend.api.models import (
+    GranularityEnum,
     MetricCard,
     MetricsData,
     PeriodEnum,
@@ -15,6 +19,56 @@ from backend.api.models import (
     TrendEnum,
 )
 
+# Длительность фиксированных периодов
+PERIOD_DURATIONS = {
+    PeriodEnum.TWENTY_FOUR_HOURS: timedelta(hours=24),
+    PeriodEnum.FORTY_EIGHT_HOURS: timedelta(hours=48),
+    PeriodEnum.SEVEN_DAYS: timedelta(days=7),
+    PeriodEnum.THIRTY_DAYS: timedelta(days=30),
+    PeriodEnum.THREE_MONTHS: timedelta(days=90),
+}
+
+# Длительность шага timeline
+GRANULARITY_STEPS = {
+    GranularityEnum.HOUR: timedelta(hours=1),
+    GranularityEnum.DAY: timedelta(days=1),
+}
+
+# Формат TimelinePoint.date
+TIMELINE_FORMATS = {
+    GranularityEnum.HOUR: "%Y-%m-%dT%H:00",
+    GranularityEnum.DAY: "%Y-%m-%d",
+}
+
+# Готовые итоги закрытых дней по шагам timeline: (bucket, messages, active_users)
+# $2, $3 - границы диапазона, $4 - агрегированные дни
+_TIMELINE_ROLLUPS = {
+    GranularityEnum.HOUR: """
+        SELECT hour, messages, active_users
+        FROM message_hourly_stats
+        WHERE hour >= $2::timestamp AND hour < $3::timestamp AND hour::date = ANY($4::date[])
+    """,
+    GranularityEnum.DAY: """
+        SELECT day::timestamp, messages, active_users
+        FROM message_daily_stats
+        WHERE day = ANY($4::date[])
+    """,
+}
+
+
+def default_granularity(period: PeriodEnum) -> GranularityEnum:
+    """Шаг timeline по умолчанию: по часам для 24h/48h, иначе по дням.
+
+    Args:
+        period: Период статистики
+
+    Returns:
+        Шаг timeline
+    """
+    if period in (PeriodEnum.TWENTY_FOUR_HOURS, PeriodEnum.FORTY_EIGHT_HOURS):
+        return GranularityEnum.HOUR
+    return GranularityEnum.DAY
+
 
 class MockStatCollector:
     """Mock реализация сборщика статистики.
@@ -31,44 +85,64 @@ class MockStatCollector:
         """
         self._seed = seed
 
-    async def get_stats(self, period: PeriodEnum) -> StatsResponse:
+    async def get_stats(
+        self,
+        period: PeriodEnum,
+        granularity: GranularityEnum | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> StatsResponse:
         """Получить mock статистику за указанный период.
 
         Args:
-            period: Период для сбора статистики (7d, 30d, 3m)
+            period: Период для сбора статистики (24h, 48h, 7d, 30d, 3m, custom)
+            granularity: Шаг timeline (по умолчанию зависит от периода)
+            start: Начало диапазона (для custom)
+            end: Конец диапазона (по умолчанию - сейчас)
 
         Returns:
             StatsResponse с сгенерированными данными
         """
         # Устанавливаем seed для повторяемости
         random.seed(self._seed)
+        granularity = granularity or default_granularity(period)
 
         # Определяем количество точек на графике в зависимости от периода
-        timeline_points_count = self._get_timeline_points_count(period)
+        timeline_points_count = self._get_timeline_points_count(period, granularity, start, end)
 
         # Генерируем метрики
         metrics = self._generate_metrics()
 
         # Генерируем timeline
-        timeline = self._generate_timeline(timeline_points_count)
+        timeline = self._generate_timeline(timeline_points_count, granularity)
 
-        return StatsResponse(period=period, metrics=metrics, timeline=timeline)
+        return StatsResponse(
+            period=period, metrics=metrics, timeline=timeline, granularity=granularity
+        )
 
-    def _get_timeline_points_count(self, period: PeriodEnum) -> int:
+    def _get_timeline_points_count(
+        self,
+        period: PeriodEnum,
+        granularity: GranularityEnum,
+        start: datetime | None,
+        end: datetime | None,
+    ) -> int:
         """Определить количество точек на графике.
 
         Args:
             period: Период статистики
+            granularity: Шаг timeline
+            start: Начало диапазона (для custom)
+            end: Конец диапазона
 
         Returns:
             Количество точек данных
         """
-        if period == PeriodEnum.SEVEN_DAYS:
-            return 7
-        if period == PeriodEnum.THIRTY_DAYS:
-            return 30
-        # THREE_MONTHS
-        return 90
+        if start is not None:
+            duration = (end or datetime.now(UTC)) - start
+        else:
+            duration = PERIOD_DURATIONS.get(period, timedelta(days=7))
+        return max(1, math.ceil(duration / GRANULARITY_STEPS[granularity]))
 
     def _generate_metrics(self) -> MetricsData:
         """Сгенерировать mock метрики.
@@ -105,11 +179,14 @@ class MockStatCollector:
             ),
         )
 
-    def _generate_timeline(self, points_count: int) -> list[TimelinePoint]:
+    def _generate_timeline(
+        self, points_count: int, granularity: GranularityEnum = GranularityEnum.DAY
+    ) -> list[TimelinePoint]:
         """Сгенерировать mock данные для timeline.
 
         Args:
             points_count: Количество точек данных
+            granularity: Шаг timeline
 
         Returns:
             Список TimelinePoint с датами и значениями для метрик
@@ -117,7 +194,8 @@ class MockStatCollector:
         timeline = []
         base_messages = random.randint(1000, 2000)
         base_users = random.randint(100, 300)
-        current_date = datetime.now(UTC) - timedelta(days=points_count - 1)
+        step = GRANULARITY_STEPS[granularity]
+        current_date = datetime.now(UTC) - step * (points_count - 1)
 
         for _ in range(points_count):
             # Генерируем значения с небольшой волатильностью
@@ -129,7 +207,7 @@ class MockStatCollector:
 
             timeline.append(
                 TimelinePoint(
-                    date=current_date.strftime("%Y-%m-%d"),
+                    date=current_date.strftime(TIMELINE_FORMATS[granularity]),
                     total_messages=total_messages,
                     active_users=active_users,
                 )
@@ -138,7 +216,7 @@ class MockStatCollector:
             # Плавное изменение base значений для следующей точки
             base_messages = int(base_messages * random.uniform(0.95, 1.15))
             base_users = int(base_users * random.uniform(0.93, 1.12))
-            current_date += timedelta(days=1)
+            current_date += step
 
         return timeline
 
@@ -146,150 +224,398 @@ class MockStatCollector:
 class RealStatCollector:
     """Реальная реализация сборщика статистики.
     
-    Получает данные из PostgreSQL базы данных (таблица messages).
+    Получает данные из PostgreSQL базы данных: закрытые дни - из дневного
+    rollup (message_daily_rollup), неполные дни и сегодня - из messages.
+
+    В приближённом режиме (approximate=True) закрытые дни читаются из
+    message_daily_stats: сообщения и timeline точные, а active_users и
+    total_dialogs за период оцениваются объединением дневных HyperLogLog
+    скетчей (стандартная ошибка ~1.6%, в 95% случаев не больше ~3.3%).
     """
 
-    def __init__(self, db_pool: asyncpg.Pool):
+    def __init__(self, db_pool: asyncpg.Pool, approximate: bool = False):
         """Инициализация RealStatCollector.
         
         Args:
             db_pool: Connection pool для работы с PostgreSQL
+            approximate: Оценивать уникальных пользователей и диалоги по HLL скетчам
         """
         self._pool = db_pool
-
-    async def get_stats(self, period: PeriodEnum) -> StatsResponse:
+        self._approximate = approximate
+
+    async def get_stats(
+        self,
+        period: PeriodEnum,
+        granularity: GranularityEnum | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> StatsResponse:
         """Получить статистику за указанный период из БД.
         
+        Предыдущий период (для change и trend) - диапазон той же длины
+        непосредственно перед текущим.
+
         Args:
-            period: Период для сбора статистики (7d, 30d, 3m)
+            period: Период для сбора статистики (24h, 48h, 7d, 30d, 3m, custom)
+            granularity: Шаг timeline (по умолчанию: hour для 24h/48h, иначе day)
+            start: Начало диапазона (обязательно для custom, иначе - end минус период)
+            end: Конец диапазона (по умолчанию - сейчас)
             
         Returns:
             StatsResponse с реальными данными из БД
+
+        Raises:
+            ValueError: Если для custom не задано начало или диапазон пуст
         """
         # Определяем временные границы
-        current_end = datetime.now(UTC)
-        current_start = self._get_period_start(current_end, period)
-        previous_start = self._get_period_start(current_start, period)
+        current_end = end or datetime.now(UTC)
+        if start is not None:
+            current_start = start
+        elif period == PeriodEnum.CUSTOM:
+            raise ValueError("Custom period requires a start")
+        else:
+            current_start = self._get_period_start(current_end, period)
+        if current_start >= current_end:
+            raise ValueError("Stats range start must be before its end")
+        previous_start = current_start - (current_end - current_start)
+        granularity = granularity or default_granularity(period)
         
-        # Получаем метрики для текущего периода
-        current_metrics = await self._fetch_metrics(current_start, current_end)
+        # Закрытые дни берутся из rollup таблиц, остальное - из messages
+        rolled_days = await self._fetch_rolled_days(previous_start, current_end)
         
-        # Получаем метрики для предыдущего периода (для расчета change)
-        previous_metrics = await self._fetch_metrics(previous_start, current_start)
-        
-        # Получаем timeline данные
-        timeline = await self._fetch_timeline(current_start, current_end)
+        # Метрики обоих периодов параллельно с timeline
+        # (запросы идут на разных соединениях пула)
+        if self._approximate:
+            metrics_query = self._fetch_sketch_metrics(
+                previous_start, current_start, current_end, rolled_days
+            )
+        else:
+            metrics_query = self._fetch_period_metrics(
+                previous_start, current_start, current_end, rolled_days
+            )
+        (current_metrics, previous_metrics), timeline = await asyncio.gather(
+            metrics_query,
+            self._fetch_timeline(current_start, current_end, granularity, rolled_days),
+        )
         
         # Формируем MetricsData с расчетом change и trend
         metrics = self._build_metrics_data(current_metrics, previous_metrics)
         
-        return StatsResponse(period=period, metrics=metrics, timeline=timeline)
+        return StatsResponse(
+            period=period,
+            metrics=metrics,
+            timeline=timeline,
+            granularity=granularity,
+            approximate=self._approximate,
+        )
 
     def _get_period_start(self, end_date: datetime, period: PeriodEnum) -> datetime:
         """Определить начало периода.
         
         Args:
             end_date: Конечная дата
-            period: Период статистики
+            period: Период статистики (кроме custom)
             
         Returns:
             Дата начала периода
         """
-        if period == PeriodEnum.SEVEN_DAYS:
-            return end_date - timedelta(days=7)
-        if period == PeriodEnum.THIRTY_DAYS:
-            return end_date - timedelta(days=30)
-        # THREE_MONTHS
-        return end_date - timedelta(days=90)
-
-    async def _fetch_metrics(
-        self, start_date: datetime, end_date: datetime
-    ) -> dict[str, Any]:
-        """Получить метрики из БД за указанный период.
+        return end_date - PERIOD_DURATIONS[period]
+
+    async def _fetch_rolled_days(self, start_date: datetime, end_date: datetime) -> set[date]:
+        """Получить дни диапазона, уже агрегированные в message_daily_rollup.
         
         Args:
-            start_date: Начало периода
-            end_date: Конец периода
+            start_date: Начало диапазона
+            end_date: Конец диапазона
             
         Returns:
-            Словарь с метриками: total_messages, active_users, total_dialogs
+            Множество дней, для которых rollup актуален
+        """
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT day FROM message_rollup_days
+                WHERE day >= $1::date AND day <= $2::date
+                """,
+                start_date.date(),
+                end_date.date(),
+            )
+        return {row["day"] for row in rows}
+
+    @staticmethod
+    def _split_range(
+        start_date: datetime, end_date: datetime, rolled_days: set[date]
+    ) -> tuple[list[date], list[tuple[datetime, datetime]]]:
+        """Разбить диапазон на дни из rollup и интервалы сырых строк messages.
+
+        Из rollup берутся только дни, целиком входящие в диапазон; неполные
+        дни на границах, сегодняшний день и ещё не агрегированные дни читаются
+        из messages (соседние интервалы объединяются).
+
+        Args:
+            start_date: Начало диапазона
+            end_date: Конец диапазона
+            rolled_days: Дни, агрегированные в rollup
+
+        Returns:
+            Кортеж (дни из rollup, интервалы [начало, конец) в naive datetime)
         """
         # Конвертируем в naive datetime для PostgreSQL TIMESTAMP (без timezone)
         start_naive = start_date.replace(tzinfo=None)
         end_naive = end_date.replace(tzinfo=None)
         
+        days: list[date] = []
+        ranges: list[tuple[datetime, datetime]] = []
+        day_start = datetime.combine(start_naive.date(), datetime.min.time())
+        while day_start < end_naive:
+            day_end = day_start + timedelta(days=1)
+            if (
+                day_start >= start_naive
+                and day_end <= end_naive
+                and day_start.date() in rolled_days
+            ):
+                days.append(day_start.date())
+            else:
+                range_start = max(day_start, start_naive)
+                range_end = min(day_end, end_naive)
+                if ranges and ranges[-1][1] == range_start:
+                    ranges[-1] = (ranges[-1][0], range_end)
+                else:
+                    ranges.append((range_start, range_end))
+            day_start = day_end
+        return days, ranges
+
+    async def _fetch_period_metrics(
+        self,
+        previous_start: datetime,
+        current_start: datetime,
+        current_end: datetime,
+        rolled_days: set[date],
+    ) -> tuple[dict[str, int], dict[str, int]]:
+        """Получить метрики текущего и предыдущего периодов одним запросом.
+
+        Строки диалогов (chat_id, user_id) каждого периода собираются из rollup
+        закрытых дней и сырых строк messages для остальных интервалов,
+        сворачиваются hash-агрегацией, а метрики периодов считаются по ним
+        агрегатами с FILTER (без сортировки всех сообщений для DISTINCT).
+
+        Args:
+            previous_start: Начало предыдущего периода
+            current_start: Начало текущего периода (конец предыдущего)
+            current_end: Конец текущего периода
+            rolled_days: Дни, агрегированные в rollup
+
+        Returns:
+            Кортеж (текущий, предыдущий) словарей с метриками:
+            total_messages, active_users, total_dialogs
+        """
+        previous_days, previous_ranges = self._split_range(
+            previous_start, current_start, rolled_days
+        )
+        current_days, current_ranges = self._split_range(current_start, current_end, rolled_days)
+        ranges = previous_ranges + current_ranges
+
         async with self._pool.acquire() as conn:
             row = await conn.fetchrow(
                 """
-                SELECT 
-                    COUNT(*) as total_messages,
-                    COUNT(DISTINCT user_id) as active_users,
-                    COUNT(DISTINCT (chat_id, user_id)) as total_dialogs
-                FROM messages
-                WHERE created_at >= $1 AND created_at < $2
+                SELECT
+                    COALESCE(SUM(messages) FILTER (WHERE is_current), 0) as current_messages,
+                    COUNT(DISTINCT user_id) FILTER (WHERE is_current) as current_users,
+                    COUNT(*) FILTER (WHERE is_current) as current_dialogs,
+                    COALESCE(SUM(messages) FILTER (WHERE NOT is_current), 0)
+                        as previous_messages,
+                    COUNT(DISTINCT user_id) FILTER (WHERE NOT is_current) as previous_users,
+                    COUNT(*) FILTER (WHERE NOT is_current) as previous_dialogs
+                FROM (
+                    SELECT chat_id, user_id, is_current, SUM(messages) as messages
+                    FROM (
+                        SELECT chat_id, user_id, day >= $1::timestamp as is_current, messages
+                        FROM message_daily_rollup
+                        WHERE day = ANY($2::date[])
+                        UNION ALL
+                        SELECT m.chat_id, m.user_id, m.created_at >= $1::timestamp, 1
+                        FROM unnest($3::timestamp[], $4::timestamp[]) as r(range_start, range_end)
+                        JOIN messages m
+                            ON m.created_at >= r.range_start AND m.created_at < r.range_end
+                    ) parts
+                    GROUP BY chat_id, user_id, is_current
+                ) dialogs
                 """,
-                start_naive,
-                end_naive,
+                current_start.replace(tzinfo=None),
+                previous_days + current_days,
+                [r[0] for r in ranges],
+                [r[1] for r in ranges],
             )
-            
+
+        def period(prefix: str) -> dict[str, int]:
             return {
-                "total_messages": int(row["total_messages"]) if row else 0,
-                "active_users": int(row["active_users"]) if row else 0,
-                "total_dialogs": int(row["total_dialogs"]) if row else 0,
+                "total_messages": int(row[f"{prefix}_messages"]) if row else 0,
+                "active_users": int(row[f"{prefix}_users"]) if row else 0,
+                "total_dialogs": int(row[f"{prefix}_dialogs"]) if row else 0,
             }
 
+        return period("current"), period("previous")
+
+    async def _fetch_sketch_metrics(
+        self,
+        previous_start: datetime,
+        current_start: datetime,
+        current_end: datetime,
+        rolled_days: set[date],
+    ) -> tuple[dict[str, int], dict[str, int]]:
+        """Получить метрики периодов по дневным итогам и HLL скетчам (приближённо).
+
+        Сообщения суммируются точно; уникальные пользователи и диалоги
+        оцениваются объединением скетчей закрытых дней и скетча, построенного
+        по сырым строкам неполных дней и сегодня.
+
+        Args:
+            previous_start: Начало предыдущего периода
+            current_start: Начало текущего периода (конец предыдущего)
+            current_end: Конец текущего периода
+            rolled_days: Дни, агрегированные в rollup
+
+        Returns:
+            Кортеж (текущий, предыдущий) словарей с метриками:
+            total_messages, active_users, total_dialogs
+        """
+        previous_days, previous_ranges = self._split_range(
+            previous_start, current_start, rolled_days
+        )
+        current_days, current_ranges = self._split_range(current_start, current_end, rolled_days)
+        ranges = previous_ranges + current_ranges
+
+        async with self._pool.acquire() as conn:
+            day_rows = await conn.fetch(
+                """
+                SELECT day, messages, users_hll, dialogs_hll
+                FROM message_daily_stats
+                WHERE day = ANY($1::date[])
+                """,
+                previous_days + current_days,
+            )
+            raw_rows = await conn.fetch(
+                """
+                SELECT
+                    m.chat_id,
+                    m.user_id,
+                    m.created_at >= $1::timestamp as is_current,
+                    COUNT(*) as messages
+                FROM unnest($2::timestamp[], $3::timestamp[]) as r(range_start, range_end)
+                JOIN messages m
+                    ON m.created_at >= r.range_start AND m.created_at < r.range_end
+                GROUP BY m.chat_id, m.user_id, is_current
+                """,
+                current_start.replace(tzinfo=None),
+                [r[0] for r in ranges],
+                [r[1] for r in ranges],
+            )
+
+        current_set = set(current_days)
+        current = self._merge_sketches(
+            [row for row in day_rows if row["day"] in current_set],
+            [row for row in raw_rows if row["is_current"]],
+        )
+        previous = self._merge_sketches(
+            [row for row in day_rows if row["day"] not in current_set],
+            [row for row in raw_rows if not row["is_current"]],
+        )
+        return current, previous
+
+    @staticmethod
+    def _merge_sketches(day_rows: list[Any], raw_rows: list[Any]) -> dict[str, int]:
+        """Метрики периода по строкам message_daily_stats и сырым строкам диалогов.
+
+        Args:
+            day_rows: Дневные итоги со скетчами закрытых дней периода
+            raw_rows: Диалоги (chat_id, user_id, messages) остальных интервалов периода
+
+        Returns:
+            Словарь с метриками: total_messages, active_users, total_dialogs
+        """
+        raw_users = HyperLogLog()
+        raw_dialogs = HyperLogLog()
+        for row in raw_rows:
+            raw_users.add(row["user_id"])
+            raw_dialogs.add(row["chat_id"], row["user_id"])
+
+        users = HyperLogLog.merge([*(row["users_hll"] for row in day_rows), raw_users.to_bytes()])
+        dialogs = HyperLogLog.merge(
+            [*(row["dialogs_hll"] for row in day_rows), raw_dialogs.to_bytes()]
+        )
+        return {
+            "total_messages": sum(int(row["messages"]) for row in day_rows)
+            + sum(int(row["messages"]) for row in raw_rows),
+            "active_users": users.count(),
+            "total_dialogs": dialogs.count(),
+        }
+
     async def _fetch_timeline(
-        self, start_date: datetime, end_date: datetime
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        granularity: GranularityEnum,
+        rolled_days: set[date],
     ) -> list[TimelinePoint]:
-        """Получить timeline данные из БД.
+        """Получить timeline с шагом hour или day без пропусков.
+
+        Интервалы строятся date_trunc от начала диапазона (первый интервал
+        может быть неполным) и дополняются нулями через generate_series.
+        Закрытые дни берутся из готовых итогов (message_hourly_stats или
+        message_daily_stats), остальное - из messages.
         
         Args:
             start_date: Начало периода
             end_date: Конец периода
+            granularity: Шаг timeline
+            rolled_days: Дни, агрегированные в rollup
             
         Returns:
-            Список TimelinePoint с данными по дням
+            Список TimelinePoint по интервалам
         """
-        # Конвертируем в naive datetime для PostgreSQL TIMESTAMP (без timezone)
-        start_naive = start_date.replace(tzinfo=None)
-        end_naive = end_date.replace(tzinfo=None)
+        days, ranges = self._split_range(start_date, end_date, rolled_days)
         
         async with self._pool.acquire() as conn:
             rows = await conn.fetch(
-                """
-                SELECT 
-                    DATE(created_at) as date,
-                    COUNT(*) as total_messages,
-                    COUNT(DISTINCT user_id) as active_users
-                FROM messages
-                WHERE created_at >= $1 AND created_at < $2
-                GROUP BY DATE(created_at)
-                ORDER BY date
+                f"""
+                WITH points(bucket, messages, active_users) AS (
+                    {_TIMELINE_ROLLUPS[granularity]}
+                    UNION ALL
+                    SELECT date_trunc($1, m.created_at), COUNT(*), COUNT(DISTINCT m.user_id)
+                    FROM unnest($5::timestamp[], $6::timestamp[]) as r(range_start, range_end)
+                    JOIN messages m
+                        ON m.created_at >= r.range_start AND m.created_at < r.range_end
+                    GROUP BY 1
+                )
+                SELECT
+                    buckets.bucket,
+                    COALESCE(SUM(points.messages), 0) as total_messages,
+                    COALESCE(SUM(points.active_users), 0) as active_users
+                FROM generate_series(
+                    date_trunc($1, $2::timestamp),
+                    $3::timestamp - INTERVAL '1 microsecond',
+                    ('1 ' || $1)::interval
+                ) as buckets(bucket)
+                LEFT JOIN points ON points.bucket = buckets.bucket
+                GROUP BY buckets.bucket
+                ORDER BY buckets.bucket
                 """,
-                start_naive,
-                end_naive,
+                granularity.value,
+                start_date.replace(tzinfo=None),
+                end_date.replace(tzinfo=None),
+                days,
+                [r[0] for r in ranges],
+                [r[1] for r in ranges],
             )
-            
-            timeline = [
-                TimelinePoint(
-                    date=row["date"].strftime("%Y-%m-%d"),
-                    total_messages=int(row["total_messages"]),
-                    active_users=int(row["active_users"]),
-                )
-                for row in rows
-            ]
-            
-            # Если данных нет, возвращаем хотя бы одну точку с нулями
-            if not timeline:
-                timeline = [
-                    TimelinePoint(
-                        date=start_date.strftime("%Y-%m-%d"),
-                        total_messages=0,
-                        active_users=0,
-                    )
-                ]
-            
-            return timeline
+
+        return [
+            TimelinePoint(
+                date=row["bucket"].strftime(TIMELINE_FORMATS[granularity]),
+                total_messages=int(row["total_messages"]),
+                active_users=int(row["active_users"]),
+            )
+            for row in rows
+        ]
 
     def _build_metrics_data(
         self, current: dict[str, Any], previous: dict[str, Any]
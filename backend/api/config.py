@@ -20,6 +20,26 @@ class APIConfig(BaseSettings):
     postgres_user: str = "postgres"
     postgres_password: str
 
+    # Dashboard statistics
+    stats_rollup_interval: float = 300.0  # Период обновления дневного rollup (секунды)
+    stats_rollup_lookback_days: int = 2  # Сколько последних закрытых дней пересчитывать
+    stats_cache_ttl: float = 60.0  # Время жизни ответа /api/stats в кэше (секунды)
+    stats_cache_max_stale: float = 600.0  # Сколько отдавать устаревший ответ при обновлении
+
+    # Admin chat (text-to-SQL)
+    sql_cache_max_questions: int = 512  # Вопросов в кэше вопрос -> SQL
+    sql_cache_max_results: int = 128  # Запросов в кэше SQL -> результаты
+    sql_cache_result_ttl: float = 300.0  # Время жизни результатов (секунды)
+    sql_sandbox_pool_size: int = 2  # Соединений в отдельном pool для SQL admin режима
+    # Логин pool SQL admin режима (член роли aidd_sql_reader), по умолчанию POSTGRES_USER
+    sql_sandbox_user: str | None = None
+    sql_sandbox_password: str | None = None
+    sql_statement_timeout: float = 5.0  # Максимальное время выполнения запроса (секунды)
+    sql_max_cost: float = 1_000_000.0  # Максимальная оценка стоимости плана (EXPLAIN)
+    sql_max_rows: int = 1000  # Максимальное количество строк результата
+    sql_max_scan_rows: int = 100_000  # Максимум строк, читаемых курсором для сводки
+    sql_schema_refresh_interval: float = 600.0  # Интервал обновления каталога схемы (секунды)
+
     def get_db_dsn(self) -> str:
         """Получить DSN строку для подключения к PostgreSQL.
         
@@ -0,0 +1,133 @@
+"""HyperLogLog: приближённый подсчёт уникальных значений с объединением скетчей."""
+
+import hashlib
+import math
+from collections.abc import Iterable
+
+# Точность по умолчанию: 2**12 = 4096 регистров (4 КБ на скетч)
+DEFAULT_PRECISION = 12
+
+# Значения 2**-r для регистров (r <= 64 - precision + 1)
+_POW2_NEG = [2.0**-r for r in range(66)]
+
+
+def hash_key(*parts: int) -> int:
+    """64-битный хеш ключа из целых чисел (user_id или chat_id, user_id).
+
+    Используется blake2b, а не hash(): значение одинаково во всех процессах,
+    поэтому скетчи, построенные разными воркерами, можно объединять.
+
+    Args:
+        *parts: Части ключа
+
+    Returns:
+        Беззнаковый 64-битный хеш
+    """
+    data = b"".join(part.to_bytes(8, "big", signed=True) for part in parts)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Скетч HyperLogLog (Flajolet et al., 2007) с коррекцией малых значений.
+
+    Относительная стандартная ошибка оценки - 1.04 / sqrt(2**precision):
+    около 1.6% для precision=12 (в 95% случаев ошибка не больше ~3.3%).
+    Объединение скетчей (поэлементный максимум регистров) даёт скетч
+    объединения множеств, поэтому уникальные значения за любой диапазон
+    дней считаются слиянием дневных скетчей.
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: bytes | None = None):
+        """Инициализация.
+
+        Args:
+            precision: Количество бит хеша на номер регистра (4..16)
+            registers: Готовые регистры (2**precision байт)
+
+        Raises:
+            ValueError: Если precision вне диапазона или размер регистров не совпадает
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError(f"HyperLogLog precision must be in [4, 16], got {precision}")
+        size = 1 << precision
+        if registers is not None and len(registers) != size:
+            raise ValueError(f"Expected {size} registers, got {len(registers)}")
+        self.precision = precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(size)
+
+    def add_hash(self, value: int) -> None:
+        """Добавить значение по его 64-битному хешу.
+
+        Args:
+            value: Результат hash_key
+        """
+        index = value >> (64 - self.precision)
+        rest_bits = 64 - self.precision
+        rest = value & ((1 << rest_bits) - 1)
+        rank = rest_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add(self, *parts: int) -> None:
+        """Добавить ключ из целых чисел.
+
+        Args:
+            *parts: Части ключа (например, chat_id и user_id)
+        """
+        self.add_hash(hash_key(*parts))
+
+    def count(self) -> int:
+        """Оценка количества уникальных значений.
+
+        Returns:
+            Приближённое количество уникальных значений
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(_POW2_NEG[r] for r in self.registers)
+
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting: точнее на малых множествах
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        """Сериализация регистров (для хранения в BYTEA).
+
+        Returns:
+            Регистры скетча
+        """
+        return bytes(self.registers)
+
+    @classmethod
+    def merge(cls, sketches: Iterable[bytes], precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        """Объединить скетчи (сериализованные регистры) в один.
+
+        Args:
+            sketches: Регистры скетчей одинаковой точности
+            precision: Точность скетчей
+
+        Returns:
+            Скетч объединения множеств
+        """
+        size = 1 << precision
+        # Поэлементный максимум байтов над регистрами, упакованными в одно целое
+        # (SWAR): регистры < 128, поэтому (a | 0x80) - b не даёт заёма между
+        # байтами, а старший бит байта результата равен a >= b
+        high = int.from_bytes(b"\x80" * size, "big")
+        full = (1 << (8 * size)) - 1
+        merged: int | None = None
+        for sketch in sketches:
+            if len(sketch) != size:
+                raise ValueError(f"Expected {size} registers, got {len(sketch)}")
+            other = int.from_bytes(sketch, "big")
+            if merged is None:
+                merged = other
+                continue
+            mask = ((((merged | high) - other) & high) >> 7) * 0xFF
+            merged = (merged & mask) | (other & (mask ^ full))
+
+        if merged is None:
+            return cls(precision)
+        return cls(precision, merged.to_bytes(size, "big"))
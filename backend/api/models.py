@@ -1,8 +1,8 @@
 """Pydantic модели для API статистики."""
 
 from datetime import datetime
-from enum import Enum
-from typing import Literal
+from enum import Enum, StrEnum
+from typing import Any, Literal
 
 from pydantic import BaseModel, Field
 
@@ -10,9 +10,19 @@ from pydantic import BaseModel, Field
 class PeriodEnum(str, Enum):
     """Перечисление доступных периодов для статистики."""
 
+    TWENTY_FOUR_HOURS = "24h"
+    FORTY_EIGHT_HOURS = "48h"
     SEVEN_DAYS = "7d"
     THIRTY_DAYS = "30d"
     THREE_MONTHS = "3m"
+    CUSTOM = "custom"
+
+
+class GranularityEnum(StrEnum):
+    """Перечисление шагов timeline."""
+
+    HOUR = "hour"
+    DAY = "day"
 
 
 class TrendEnum(str, Enum):
@@ -43,12 +53,12 @@ class TimelinePoint(BaseModel):
     """Точка данных для графика временной шкалы.
 
     Attributes:
-        date: Дата в формате YYYY-MM-DD
+        date: Дата в формате YYYY-MM-DD (или час YYYY-MM-DDTHH:00 для шага hour)
         total_messages: Количество сообщений на эту дату
         active_users: Количество активных пользователей на эту дату
     """
 
-    date: str = Field(..., description="Дата в формате YYYY-MM-DD")
+    date: str = Field(..., description="Дата YYYY-MM-DD или час YYYY-MM-DDTHH:00")
     total_messages: int = Field(..., description="Количество сообщений", ge=0)
     active_users: int = Field(..., description="Количество активных пользователей", ge=0)
 
@@ -76,6 +86,8 @@ class StatsResponse(BaseModel):
         period: Период, за который собрана статистика
         metrics: Набор метрик (карточки дашборда)
         timeline: Данные для графика изменения во времени
+        granularity: Шаг timeline (hour, day)
+        approximate: active_users и total_dialogs оценены по HyperLogLog скетчам
     """
 
     period: PeriodEnum = Field(..., description="Период статистики")
@@ -83,6 +95,13 @@ class StatsResponse(BaseModel):
     timeline: list[TimelinePoint] = Field(
         ..., description="Данные для графика временной шкалы", min_length=1
     )
+    granularity: GranularityEnum = Field(
+        default=GranularityEnum.DAY, description="Шаг timeline"
+    )
+    approximate: bool = Field(
+        default=False,
+        description="Уникальные пользователи и диалоги оценены приближённо (~1.6%)",
+    )
 
 
 class ChatMode(str, Enum):
@@ -137,3 +156,20 @@ class ChatResponse(BaseModel):
     message: str = Field(..., description="Текст ответа")
     sql_query: str | None = Field(None, description="SQL запрос (только для admin режима)")
     mode: ChatMode = Field(..., description="Режим обработки")
+
+
+class ChatStreamEvent(BaseModel):
+    """Событие потокового ответа чата (Server-Sent Events).
+
+    Attributes:
+        event: Тип события:
+            token - фрагмент ответа ({"text": ...}),
+            stage - этап admin pipeline ({"stage": "sql_generated", "sql": ...}
+                или {"stage": "rows_fetched", "rows": ...}),
+            done - ответ завершён ({"message", "mode", "sql_query"}),
+            error - ошибка обработки ({"message": ...})
+        data: Данные события
+    """
+
+    event: Literal["token", "stage", "done", "error"] = Field(..., description="Тип события")
+    data: dict[str, Any] = Field(default_factory=dict, description="Данные события")
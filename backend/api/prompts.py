@@ -12,12 +12,8 @@ CHAT_SYSTEM_PROMPT = """Ты дружелюбный AI-ассистент для
 Отвечай кратко и по делу."""
 
 
-# Промпт для генерации SQL запросов (text-to-SQL)
-TEXT_TO_SQL_PROMPT = """Ты SQL эксперт. На основе вопроса пользователя создай SQL запрос к базе данных PostgreSQL.
-
-Доступные таблицы и схема:
-
-**Таблица: messages**
+# Схема для TEXT_TO_SQL_PROMPT, если каталог схемы недоступен (SchemaCatalog)
+DEFAULT_SQL_SCHEMA = """**Таблица: messages**
 - id: INTEGER (PRIMARY KEY)
 - user_id: BIGINT (Telegram user ID)
 - chat_id: BIGINT (Telegram chat ID)
@@ -26,7 +22,15 @@ TEXT_TO_SQL_PROMPT = """Ты SQL эксперт. На основе вопрос
 - content_length: INTEGER (длина сообщения)
 - username: VARCHAR (имя пользователя)
 - created_at: TIMESTAMP (время создания)
-- is_deleted: BOOLEAN (флаг удаления)
+- is_deleted: BOOLEAN (флаг удаления)"""
+
+
+# Промпт для генерации SQL запросов (text-to-SQL)
+TEXT_TO_SQL_PROMPT = """Ты SQL эксперт. На основе вопроса пользователя создай SQL запрос к базе данных PostgreSQL.
+
+Доступные таблицы и схема:
+
+{schema}
 
 Правила:
 1. Возвращай ТОЛЬКО SQL запрос, без markdown, без объяснений
@@ -34,6 +38,8 @@ TEXT_TO_SQL_PROMPT = """Ты SQL эксперт. На основе вопрос
 3. Учитывай is_deleted = false для получения активных сообщений
 4. Используй PostgreSQL синтаксис
 5. Добавляй LIMIT если не указано иное (по умолчанию 100)
+6. В больших таблицах фильтруй по индексированным колонкам
+7. Если агрегатная таблица отвечает на вопрос, используй её вместо messages
 
 Вопрос пользователя: {question}
 
@@ -48,7 +54,7 @@ INTERPRET_RESULTS_PROMPT = """На основе результатов SQL за
 Выполненный SQL запрос:
 {sql}
 
-Результаты выполнения:
+Результаты выполнения (для больших результатов - сводка по колонкам и первые строки):
 {results}
 
 Твоя задача:
@@ -1,8 +1,9 @@
 """Протоколы для сборщиков статистики."""
 
+from datetime import datetime
 from typing import Protocol
 
-from backend.api.models import PeriodEnum, StatsResponse
+from backend.api.models import GranularityEnum, PeriodEnum, StatsResponse
 
 
 class StatCollectorProtocol(Protocol):
@@ -12,11 +13,20 @@ class StatCollectorProtocol(Protocol):
     Реализации: MockStatCollector (mock данные), RealStatCollector (из БД).
     """
 
-    async def get_stats(self, period: PeriodEnum) -> StatsResponse:
+    async def get_stats(
+        self,
+        period: PeriodEnum,
+        granularity: GranularityEnum | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> StatsResponse:
         """Получить статистику за указанный период.
 
         Args:
-            period: Период для сбора статистики (7d, 30d, 3m)
+            period: Период для сбора статистики (24h, 48h, 7d, 30d, 3m, custom)
+            granularity: Шаг timeline (hour, day; по умолчанию зависит от периода)
+            start: Начало диапазона (обязательно для custom)
+            end: Конец диапазона (по умолчанию - сейчас)
 
         Returns:
             StatsResponse с метриками и данными timeline
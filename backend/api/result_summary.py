@@ -0,0 +1,273 @@
+"""Потоковая сводка результатов SQL запроса для промпта интерпретации."""
+
+import json
+import math
+import random
+from collections.abc import Mapping
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any
+
+# Первые строки результата, передаваемые LLM как есть
+DEFAULT_SAMPLE_SIZE = 20
+
+# Размер выборки (reservoir) для квантилей числовой колонки
+DEFAULT_RESERVOIR_SIZE = 1024
+
+# Сколько частых значений показывать и сколько отслеживать (space-saving)
+DEFAULT_TOP_K = 5
+_TOP_K_CAPACITY = 64
+
+# Максимальная длина текстового значения в сводке и примере строк
+MAX_VALUE_LENGTH = 200
+
+_QUANTILES = (0.25, 0.5, 0.75, 0.9)
+
+
+def _is_number(value: Any) -> bool:
+    """Числовое значение (bool не считается числом)."""
+    return isinstance(value, int | float | Decimal) and not isinstance(value, bool)
+
+
+def _compact(value: Any) -> Any:
+    """Значение для промпта: длинные строки обрезаются, прочие типы - в str для JSON.
+
+    Args:
+        value: Значение колонки
+
+    Returns:
+        Значение, сериализуемое в JSON
+    """
+    if value is None or isinstance(value, bool | int | float):
+        return value
+    if isinstance(value, Decimal):
+        return float(value)
+    text = value if isinstance(value, str) else str(value)
+    if len(text) > MAX_VALUE_LENGTH:
+        return text[:MAX_VALUE_LENGTH] + "..."
+    return text
+
+
+def _format_number(value: float) -> str:
+    """Число для сводки: целые без дробной части, остальные - 4 значащие цифры."""
+    if math.isfinite(value) and value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.4g}"
+
+
+class ColumnSummary:
+    """Потоковая сводка одной колонки.
+
+    Числа: min, max, mean и квантили по равномерной выборке (reservoir
+    sampling, алгоритм R), точные, пока значений не больше размера выборки.
+    Даты и время: min и max. Остальные значения: частые значения по алгоритму
+    space-saving (точные счётчики, пока различных значений не больше ёмкости).
+    """
+
+    def __init__(self, name: str, reservoir_size: int, rng: random.Random):
+        """Инициализация.
+
+        Args:
+            name: Имя колонки
+            reservoir_size: Размер выборки для квантилей
+            rng: Генератор случайных чисел выборки
+        """
+        self.name = name
+        self.reservoir_size = reservoir_size
+        self.rng = rng
+        self.count = 0
+        self.nulls = 0
+        self.numbers = 0
+        self.total = 0.0
+        self.min: Any = None
+        self.max: Any = None
+        self.reservoir: list[float] = []
+        self.counters: dict[str, int] = {}
+
+    def add(self, value: Any) -> None:
+        """Учесть значение колонки.
+
+        Args:
+            value: Значение (None - NULL)
+        """
+        self.count += 1
+        if value is None:
+            self.nulls += 1
+            return
+
+        if _is_number(value) or isinstance(value, datetime | date | time | timedelta):
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+            if not _is_number(value):
+                return
+            number = float(value)
+            self.numbers += 1
+            self.total += number
+            if len(self.reservoir) < self.reservoir_size:
+                self.reservoir.append(number)
+            else:
+                slot = self.rng.randrange(self.numbers)
+                if slot < self.reservoir_size:
+                    self.reservoir[slot] = number
+            return
+
+        self._count_value(str(_compact(value)))
+
+    def _count_value(self, key: str) -> None:
+        """Счётчик частого значения (space-saving: вытесняется минимальный счётчик).
+
+        Args:
+            key: Значение
+        """
+        if key in self.counters:
+            self.counters[key] += 1
+        elif len(self.counters) < _TOP_K_CAPACITY:
+            self.counters[key] = 1
+        else:
+            smallest = min(self.counters, key=self.counters.__getitem__)
+            self.counters[key] = self.counters.pop(smallest) + 1
+
+    def quantiles(self) -> dict[float, float]:
+        """Квантили числовых значений по выборке.
+
+        Returns:
+            Квантиль -> значение (пусто, если чисел не было)
+        """
+        if not self.reservoir:
+            return {}
+        ordered = sorted(self.reservoir)
+        last = len(ordered) - 1
+        return {q: ordered[round(q * last)] for q in _QUANTILES}
+
+    def top(self, k: int) -> list[tuple[str, int]]:
+        """Частые значения.
+
+        Args:
+            k: Количество значений
+
+        Returns:
+            Пары (значение, оценка количества) по убыванию количества
+        """
+        return sorted(self.counters.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    def describe(self, top_k: int) -> str:
+        """Строка сводки для промпта.
+
+        Args:
+            top_k: Сколько частых значений показывать
+
+        Returns:
+            Описание колонки
+        """
+        parts = []
+        if self.numbers:
+            quantiles = ", ".join(
+                f"p{round(q * 100)}={_format_number(v)}" for q, v in self.quantiles().items()
+            )
+            parts.append(
+                f"число: min={_format_number(float(self.min))}, "
+                f"max={_format_number(float(self.max))}, "
+                f"mean={_format_number(self.total / self.numbers)}, {quantiles}"
+            )
+        elif self.min is not None:
+            parts.append(f"min={self.min}, max={self.max}")
+        if self.counters:
+            values = ", ".join(
+                f"{json.dumps(v, ensure_ascii=False)} ({n})" for v, n in self.top(top_k)
+            )
+            parts.append(f"частые: {values}")
+        if self.nulls:
+            parts.append(f"NULL: {self.nulls}")
+        return f"- {self.name}: " + ("; ".join(parts) or "нет значений")
+
+
+class ResultSummary:
+    """Сводка результатов SQL запроса постоянного размера.
+
+    Строки добавляются по одной (по мере чтения курсора) и не хранятся:
+    остаются только первые sample_size строк и сводки колонок. Поэтому
+    память и размер промпта интерпретации не зависят от числа строк.
+    """
+
+    def __init__(
+        self,
+        sample_size: int = DEFAULT_SAMPLE_SIZE,
+        reservoir_size: int = DEFAULT_RESERVOIR_SIZE,
+        top_k: int = DEFAULT_TOP_K,
+        seed: int = 0,
+    ):
+        """Инициализация.
+
+        Args:
+            sample_size: Сколько первых строк передавать как есть
+            reservoir_size: Размер выборки для квантилей числовых колонок
+            top_k: Сколько частых значений показывать для колонки
+            seed: Seed выборки (сводка воспроизводима)
+        """
+        self.sample_size = sample_size
+        self.reservoir_size = reservoir_size
+        self.top_k = top_k
+        self.row_count = 0
+        self.truncated = False
+        self.sample: list[dict[str, Any]] = []
+        self.columns: dict[str, ColumnSummary] = {}
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def from_rows(cls, rows: list[Mapping[str, Any]], **kwargs: Any) -> "ResultSummary":
+        """Сводка по готовому списку строк.
+
+        Args:
+            rows: Строки результата
+            **kwargs: Параметры ResultSummary
+
+        Returns:
+            Сводка
+        """
+        summary = cls(**kwargs)
+        for row in rows:
+            summary.add(row)
+        return summary
+
+    def add(self, row: Mapping[str, Any]) -> None:
+        """Учесть строку результата.
+
+        Args:
+            row: Строка (asyncpg.Record или dict)
+        """
+        self.row_count += 1
+        if len(self.sample) < self.sample_size:
+            self.sample.append(dict(row))
+        for name, value in row.items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = ColumnSummary(name, self.reservoir_size, self._rng)
+            column.add(value)
+
+    @property
+    def complete(self) -> bool:
+        """Все строки результата есть в sample."""
+        return self.row_count <= self.sample_size and not self.truncated
+
+    def to_prompt(self) -> str:
+        """Текст результатов для промпта интерпретации.
+
+        Returns:
+            Строки как есть (если их не больше sample_size) или сводка колонок
+            и первые строки
+        """
+        sample = "\n".join(
+            json.dumps({key: _compact(value) for key, value in row.items()}, ensure_ascii=False)
+            for row in self.sample
+        )
+        if self.complete:
+            return f"Строк: {self.row_count}\n{sample}" if self.sample else "Строк: 0"
+
+        limit = " (результат обрезан по лимиту строк)" if self.truncated else ""
+        lines = [f"Строк: {self.row_count}{limit}", "Сводка по колонкам:"]
+        lines += [column.describe(self.top_k) for column in self.columns.values()]
+        lines.append(f"Первые {len(self.sample)} строк:")
+        lines.append(sample)
+        return "\n".join(lines)
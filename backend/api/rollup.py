@@ -0,0 +1,223 @@
+"""Инкрементальное обслуживание дневного rollup таблицы messages."""
+
+import asyncio
+import contextlib
+import logging
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
+
+import asyncpg  # type: ignore[import-untyped]
+
+from backend.api.hll import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+
+class RollupRefresher:
+    """Периодическое обновление rollup таблиц статистики по закрытым дням.
+
+    Таблицы: message_daily_rollup (диалоги за день), message_daily_stats
+    (итоги и HLL скетчи дней) и message_hourly_stats (итоги часов).
+
+    Сегодняшний день не агрегируется: RealStatCollector читает его из messages.
+    Каждое обновление пересчитывает закрытые дни после последнего обновлённого
+    и lookback_days последних дней, чтобы учесть сообщения, записанные с
+    опозданием (write-behind, сообщения около полуночи).
+    """
+
+    def __init__(self, pool: asyncpg.Pool, interval: float = 300.0, lookback_days: int = 2):
+        """Инициализация.
+
+        Args:
+            pool: Connection pool к базе данных
+            interval: Интервал между обновлениями (секунды)
+            lookback_days: Сколько последних закрытых дней пересчитывать каждый раз
+        """
+        self.pool = pool
+        self.interval = interval
+        self.lookback_days = lookback_days
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Запуск фонового обновления (первое обновление - сразу)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+            logger.info(f"Stats rollup refresher started: interval={self.interval}s")
+
+    async def stop(self) -> None:
+        """Остановка фонового обновления."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        """Фоновая задача: обновление rollup по таймеру."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Stats rollup refresh failed, will retry: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self, today: date | None = None) -> int:
+        """Пересчитать rollup для закрытых дней, которые нужно обновить.
+
+        Дни пересчитываются целиком в одной транзакции, поэтому читатели видят
+        либо старые, либо новые данные дня. Если rollup обновляет другой
+        процесс, обновление пропускается.
+
+        Args:
+            today: Текущий день UTC (по умолчанию - сегодня)
+
+        Returns:
+            Количество пересчитанных дней
+        """
+        today = today or datetime.now(UTC).date()
+        last_closed = today - timedelta(days=1)
+
+        async with self.pool.acquire() as conn, conn.transaction():
+            # Rollup обновляет один воркер API за раз
+            locked = await conn.fetchval(
+                "SELECT pg_try_advisory_xact_lock(hashtext('message_daily_rollup'))"
+            )
+            if not locked:
+                return 0
+
+            first: date | None
+            last_rolled = await conn.fetchval("SELECT MAX(day) FROM message_rollup_days")
+            if last_rolled is None:
+                first = await conn.fetchval("SELECT MIN(created_at)::date FROM messages")
+                if first is None:
+                    return 0
+            else:
+                first = min(
+                    last_rolled + timedelta(days=1), today - timedelta(days=self.lookback_days)
+                )
+            if first > last_closed:
+                return 0
+
+            await conn.execute(
+                "DELETE FROM message_daily_rollup WHERE day >= $1 AND day <= $2",
+                first,
+                last_closed,
+            )
+            await conn.execute(
+                """
+                INSERT INTO message_daily_rollup (day, chat_id, user_id, messages)
+                SELECT created_at::date, chat_id, user_id, COUNT(*)
+                FROM messages
+                WHERE created_at >= $1::date AND created_at < $2::date
+                GROUP BY created_at::date, chat_id, user_id
+                """,
+                first,
+                today,
+            )
+            await self._refresh_daily_stats(conn, first, last_closed)
+            await conn.execute(
+                "DELETE FROM message_hourly_stats WHERE hour >= $1::date AND hour < $2::date",
+                first,
+                today,
+            )
+            await conn.execute(
+                """
+                INSERT INTO message_hourly_stats (hour, messages, active_users)
+                SELECT date_trunc('hour', created_at), COUNT(*), COUNT(DISTINCT user_id)
+                FROM messages
+                WHERE created_at >= $1::date AND created_at < $2::date
+                GROUP BY date_trunc('hour', created_at)
+                """,
+                first,
+                today,
+            )
+            await conn.execute(
+                """
+                INSERT INTO message_rollup_days (day)
+                SELECT generate_series($1::date, $2::date, INTERVAL '1 day')::date
+                ON CONFLICT (day) DO UPDATE SET refreshed_at = CURRENT_TIMESTAMP
+                """,
+                first,
+                last_closed,
+            )
+
+        days = (last_closed - first).days + 1
+        logger.info(f"Stats rollup refreshed: {first}..{last_closed} ({days} days)")
+        return days
+
+    async def _refresh_daily_stats(self, conn: asyncpg.Connection, first: date, last: date) -> None:
+        """Пересчитать message_daily_stats (итоги и HLL скетчи дней) по rollup.
+
+        Args:
+            conn: Соединение с открытой транзакцией обновления rollup
+            first: Первый пересчитываемый день
+            last: Последний пересчитываемый день
+        """
+        rows = await conn.fetch(
+            """
+            SELECT day, chat_id, user_id, messages
+            FROM message_daily_rollup
+            WHERE day >= $1 AND day <= $2
+            """,
+            first,
+            last,
+        )
+
+        days: dict[date, _DaySketch] = {}
+        for row in rows:
+            day = days.get(row["day"])
+            if day is None:
+                day = days[row["day"]] = _DaySketch()
+            day.add(row["chat_id"], row["user_id"], row["messages"])
+
+        await conn.execute(
+            "DELETE FROM message_daily_stats WHERE day >= $1 AND day <= $2", first, last
+        )
+        await conn.copy_records_to_table(
+            "message_daily_stats",
+            records=[
+                (
+                    day,
+                    sketch.messages,
+                    len(sketch.users),
+                    sketch.dialogs,
+                    sketch.users_hll.to_bytes(),
+                    sketch.dialogs_hll.to_bytes(),
+                )
+                for day, sketch in days.items()
+            ],
+            columns=[
+                "day",
+                "messages",
+                "active_users",
+                "total_dialogs",
+                "users_hll",
+                "dialogs_hll",
+            ],
+        )
+
+
+@dataclass
+class _DaySketch:
+    """Итоги одного дня при пересчёте message_daily_stats."""
+
+    messages: int = 0
+    dialogs: int = 0
+    users: set[int] = field(default_factory=set)
+    users_hll: HyperLogLog = field(default_factory=HyperLogLog)
+    dialogs_hll: HyperLogLog = field(default_factory=HyperLogLog)
+
+    def add(self, chat_id: int, user_id: int, messages: int) -> None:
+        """Учесть строку rollup (диалог за день).
+
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+            messages: Количество сообщений диалога за день
+        """
+        self.messages += messages
+        self.dialogs += 1
+        if user_id not in self.users:
+            self.users.add(user_id)
+            self.users_hll.add(user_id)
+        self.dialogs_hll.add(chat_id, user_id)
@@ -0,0 +1,254 @@
+"""Каталог схемы БД для промпта генерации SQL admin режима."""
+
+import asyncio
+import logging
+import re
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+import asyncpg  # type: ignore[import-untyped]
+
+from backend.api.sql_sandbox import ALLOWED_TABLES
+
+logger = logging.getLogger(__name__)
+
+# Колонки с не больше чем столькими различными значениями (по pg_stats)
+# показываются со списком значений
+MAX_ENUM_VALUES = 10
+
+# Максимальная длина значения в списке значений колонки
+_MAX_ENUM_VALUE_LENGTH = 30
+
+# Текстовые типы, для которых показываются значения из pg_stats
+_TEXT_TYPES = ("character varying", "character", "text")
+
+# Короткие имена типов для промпта
+_TYPE_NAMES = {
+    "character varying": "varchar",
+    "timestamp without time zone": "timestamp",
+    "timestamp with time zone": "timestamptz",
+    "double precision": "float8",
+}
+
+_TABLES_SQL = """
+    SELECT c.relname AS table_name,
+           c.reltuples::bigint AS row_estimate,
+           obj_description(c.oid, 'pg_class') AS description
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = $1 AND c.relkind IN ('r', 'p', 'v', 'm')
+    ORDER BY c.relname
+"""
+
+_COLUMNS_SQL = """
+    SELECT table_name, column_name, data_type, is_nullable = 'YES' AS nullable,
+           col_description(
+               format('%I.%I', table_schema, table_name)::regclass, ordinal_position
+           ) AS description
+    FROM information_schema.columns
+    WHERE table_schema = $1 AND data_type <> 'bytea'
+    ORDER BY table_name, ordinal_position
+"""
+
+_INDEXES_SQL = """
+    SELECT t.relname AS table_name, i.indisprimary AS is_primary, i.indisunique AS is_unique,
+           pg_get_indexdef(i.indexrelid) AS definition
+    FROM pg_index i
+    JOIN pg_class t ON t.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    WHERE n.nspname = $1
+    ORDER BY t.relname, i.indisprimary DESC, i.indexrelid
+"""
+
+_VALUES_SQL = """
+    SELECT tablename AS table_name, attname AS column_name,
+           most_common_vals::text::text[] AS values
+    FROM pg_stats
+    WHERE schemaname = $1 AND n_distinct BETWEEN 1 AND $2 AND most_common_vals IS NOT NULL
+"""
+
+# Колонки индекса из pg_get_indexdef: "... USING btree (chat_id, created_at DESC)"
+_INDEX_COLUMNS = re.compile(r"USING \w+ \((?P<columns>.*)\)")
+
+
+@dataclass
+class ColumnInfo:
+    """Колонка таблицы.
+
+    Attributes:
+        name: Имя колонки
+        data_type: Тип (короткое имя)
+        nullable: Допускает NULL
+        description: Комментарий колонки (COMMENT ON COLUMN)
+        values: Все значения колонки с малым числом различных значений (по pg_stats)
+    """
+
+    name: str
+    data_type: str
+    nullable: bool = True
+    description: str | None = None
+    values: list[str] = field(default_factory=list)
+
+
+@dataclass
+class TableInfo:
+    """Таблица схемы.
+
+    Attributes:
+        name: Имя таблицы
+        row_estimate: Оценка количества строк (pg_class.reltuples, None - нет статистики)
+        description: Комментарий таблицы (COMMENT ON TABLE)
+        columns: Колонки в порядке объявления
+        indexes: Индексы в виде "PRIMARY KEY (id)", "UNIQUE (chat_id)", "(created_at)"
+    """
+
+    name: str
+    row_estimate: int | None = None
+    description: str | None = None
+    columns: list[ColumnInfo] = field(default_factory=list)
+    indexes: list[str] = field(default_factory=list)
+
+
+class SchemaCatalog:
+    """Кэш схемы БД для TEXT_TO_SQL_PROMPT.
+
+    Таблицы, колонки (information_schema), комментарии, индексы, оценки
+    количества строк (pg_class.reltuples) и значения колонок-перечислений
+    (pg_stats) читаются при старте после миграций и затем не чаще одного раза
+    в max_age секунд. Показываются только таблицы из allowed_tables.
+    Описание схемы для промпта строится один раз на обновление. Если
+    обновление не удалось, используется прежнее описание.
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        schema: str = "public",
+        allowed_tables: tuple[str, ...] = ALLOWED_TABLES,
+        max_age: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Инициализация.
+
+        Args:
+            pool: Connection pool к базе данных
+            schema: Схема PostgreSQL
+            allowed_tables: Таблицы, показываемые LLM (те же, что доступны SQLSandbox)
+            max_age: Интервал обновления каталога (секунды)
+            clock: Часы (для тестов)
+        """
+        self.pool = pool
+        self.schema = schema
+        self.allowed_tables = allowed_tables
+        self.max_age = max_age
+        self.clock = clock
+        self.tables: dict[str, TableInfo] = {}
+        self._rendered: str | None = None
+        self._refreshed_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def refresh(self) -> None:
+        """Перечитать схему из каталога PostgreSQL.
+
+        Raises:
+            asyncpg.PostgresError: При ошибке чтения каталога
+        """
+        async with self.pool.acquire() as conn:
+            table_rows = await conn.fetch(_TABLES_SQL, self.schema)
+            column_rows = await conn.fetch(_COLUMNS_SQL, self.schema)
+            index_rows = await conn.fetch(_INDEXES_SQL, self.schema)
+            value_rows = await conn.fetch(_VALUES_SQL, self.schema, MAX_ENUM_VALUES)
+
+        tables = {
+            row["table_name"]: TableInfo(
+                name=row["table_name"],
+                row_estimate=row["row_estimate"] if row["row_estimate"] >= 0 else None,
+                description=row["description"],
+            )
+            for row in table_rows
+            if row["table_name"] in self.allowed_tables
+        }
+
+        values = {(row["table_name"], row["column_name"]): row["values"] for row in value_rows}
+        for row in column_rows:
+            table = tables.get(row["table_name"])
+            if table is None:
+                continue
+            key = (row["table_name"], row["column_name"])
+            table.columns.append(
+                ColumnInfo(
+                    name=row["column_name"],
+                    data_type=_TYPE_NAMES.get(row["data_type"], row["data_type"]),
+                    nullable=row["nullable"],
+                    description=row["description"],
+                    values=list(values.get(key) or []) if row["data_type"] in _TEXT_TYPES else [],
+                )
+            )
+
+        for row in index_rows:
+            table = tables.get(row["table_name"])
+            if table is None:
+                continue
+            found = _INDEX_COLUMNS.search(row["definition"])
+            columns = f"({found['columns']})" if found else row["definition"]
+            if row["is_primary"]:
+                table.indexes.append(f"PRIMARY KEY {columns}")
+            elif row["is_unique"]:
+                table.indexes.append(f"UNIQUE {columns}")
+            else:
+                table.indexes.append(columns)
+
+        self.tables = tables
+        self._rendered = self.render()
+        self._refreshed_at = self.clock()
+        logger.info(f"Schema catalog refreshed: {len(tables)} tables")
+
+    async def get_prompt_schema(self) -> str | None:
+        """Описание схемы для промпта (каталог обновляется, если устарел).
+
+        Returns:
+            Описание схемы или None, если каталог ещё ни разу не прочитан
+        """
+        if self._refreshed_at is None or self.clock() - self._refreshed_at >= self.max_age:
+            async with self._lock:
+                # Каталог мог обновить другой запрос, пока ждали lock
+                if self._refreshed_at is None or self.clock() - self._refreshed_at >= self.max_age:
+                    try:
+                        await self.refresh()
+                    except Exception as e:
+                        logger.error(f"Schema catalog refresh failed, using previous: {e}")
+                        self._refreshed_at = self.clock()
+        return self._rendered
+
+    def render(self) -> str:
+        """Компактное описание схемы для промпта.
+
+        Returns:
+            Таблицы с оценкой строк, колонками и индексами
+        """
+        blocks = []
+        for table in self.tables.values():
+            header = f"**Таблица: {table.name}**"
+            if table.row_estimate is not None:
+                header += f" (~{table.row_estimate} строк)"
+            if table.description:
+                header += f" - {table.description}"
+
+            lines = [header]
+            for column in table.columns:
+                line = f"- {column.name}: {column.data_type}"
+                if not column.nullable:
+                    line += " NOT NULL"
+                if column.description:
+                    line += f" ({column.description})"
+                if column.values:
+                    shown = ", ".join(
+                        f"'{value[:_MAX_ENUM_VALUE_LENGTH]}'" for value in sorted(column.values)
+                    )
+                    line += f", значения: {shown}"
+                lines.append(line)
+            if table.indexes:
+                lines.append(f"- индексы: {'; '.join(table.indexes)}")
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
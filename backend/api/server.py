@@ -1,23 +1,51 @@
 """FastAPI приложение для API статистики."""
 
+import json
 import logging
-from datetime import datetime
-from typing import Annotated
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+from typing import Annotated, Any
 
-import asyncpg  # type: ignore[import-untyped]
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
 from backend.api.chat_service import ChatService
-from backend.api.collectors import RealStatCollector
+from backend.api.collectors import (
+    GRANULARITY_STEPS,
+    PERIOD_DURATIONS,
+    RealStatCollector,
+    default_granularity,
+)
 from backend.api.config import APIConfig
-from backend.api.models import ChatMessage, ChatRequest, ChatResponse, PeriodEnum, StatsResponse
+from backend.api.models import (
+    ChatMessage,
+    ChatRequest,
+    ChatResponse,
+    ChatStreamEvent,
+    GranularityEnum,
+    PeriodEnum,
+    StatsResponse,
+)
+from backend.api.rollup import RollupRefresher
+from backend.api.schema_catalog import SchemaCatalog
+from backend.api.sessions import SessionMapper
+from backend.api.sql_cache import SQLCache
+from backend.api.sql_sandbox import SQLSandbox
+from backend.api.sql_templates import SQLTemplateMatcher
+from backend.api.stats_cache import StatsCache, StatsQuery, etag_matches
 from src.config import Config
+from src.llm.admission import LLMBusyError
 from src.llm.client import LLMClient
+from src.storage.database import Database
 from src.storage.models import Message
 
 logger = logging.getLogger(__name__)
 
+# Максимальное количество точек timeline в ответе /api/stats
+MAX_TIMELINE_POINTS = 1000
+
 # Создаем FastAPI приложение
 app = FastAPI(
     title="Systech AIDD Bot Statistics API",
@@ -32,6 +60,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Age", "X-Cache"],
 )
 
 # Загружаем конфигурацию
@@ -42,22 +71,62 @@ config = APIConfig()
 async def startup() -> None:
     """Инициализация при старте приложения.
     
-    Создает connection pool для PostgreSQL и инициализирует LLM клиент.
+    Создает Database (connection pool для PostgreSQL, миграции) и инициализирует LLM клиент.
     """
-    app.state.db_pool = await asyncpg.create_pool(
+    app.state.database = Database(
         host=config.postgres_host,
         port=config.postgres_port,
         database=config.postgres_db,
         user=config.postgres_user,
         password=config.postgres_password,
-        min_size=2,
-        max_size=10,
+    )
+    await app.state.database.connect()
+    await app.state.database.init_db()
+    app.state.db_pool = app.state.database.pool
+    app.state.sessions = SessionMapper(app.state.db_pool)
+    app.state.rollup = RollupRefresher(
+        app.state.db_pool,
+        interval=config.stats_rollup_interval,
+        lookback_days=config.stats_rollup_lookback_days,
+    )
+    app.state.rollup.start()
+
+    async def load_stats(query: StatsQuery) -> StatsResponse:
+        collector = RealStatCollector(app.state.db_pool, approximate=query.approximate)
+        return await collector.get_stats(query.period, query.granularity, query.start, query.end)
+
+    app.state.stats_cache = StatsCache(
+        load_stats, ttl=config.stats_cache_ttl, max_stale=config.stats_cache_max_stale
+    )
+    app.state.sql_cache = SQLCache(
+        max_questions=config.sql_cache_max_questions,
+        max_results=config.sql_cache_max_results,
+        result_ttl=config.sql_cache_result_ttl,
+    )
+    app.state.sql_templates = SQLTemplateMatcher()
+    # Схема читается после миграций: в промпте сразу новые таблицы и индексы
+    app.state.schema_catalog = SchemaCatalog(
+        app.state.db_pool, max_age=config.sql_schema_refresh_interval
+    )
+    await app.state.schema_catalog.refresh()
+    app.state.sql_sandbox = await SQLSandbox.create(
+        host=config.postgres_host,
+        port=config.postgres_port,
+        database=config.postgres_db,
+        user=config.sql_sandbox_user or config.postgres_user,
+        password=config.sql_sandbox_password or config.postgres_password,
+        pool_size=config.sql_sandbox_pool_size,
+        statement_timeout=config.sql_statement_timeout,
+        max_cost=config.sql_max_cost,
+        max_rows=config.sql_max_rows,
+        max_scan_rows=config.sql_max_scan_rows,
     )
     print(f"[OK] Database connection pool created: {config.postgres_host}:{config.postgres_port}/{config.postgres_db}")
     
     # Инициализируем LLM клиент для чата
     bot_config = Config()
     app.state.llm_client = LLMClient(bot_config)
+    app.state.history_token_budget = bot_config.history_token_budget
     print("[OK] LLM client initialized for chat service")
 
 
@@ -65,10 +134,16 @@ async def startup() -> None:
 async def shutdown() -> None:
     """Очистка при остановке приложения.
     
-    Закрывает connection pool.
+    Останавливает обновление rollup и закрывает connection pools (основной и SQL sandbox).
     """
-    if hasattr(app.state, "db_pool") and app.state.db_pool:
-        await app.state.db_pool.close()
+    if hasattr(app.state, "stats_cache"):
+        await app.state.stats_cache.close()
+    if hasattr(app.state, "rollup"):
+        await app.state.rollup.stop()
+    if hasattr(app.state, "sql_sandbox"):
+        await app.state.sql_sandbox.close()
+    if hasattr(app.state, "database") and app.state.database:
+        await app.state.database.close()
         print("[OK] Database connection pool closed")
 
 
@@ -81,19 +156,101 @@ async def shutdown() -> None:
 async def get_stats(
     period: Annotated[
         PeriodEnum,
-        Query(description="Период для сбора статистики: 7d (7 дней), 30d (30 дней), 3m (3 месяца)"),
+        Query(
+            description="Период для сбора статистики: 24h, 48h, 7d (7 дней), 30d (30 дней), "
+            "3m (3 месяца) или custom (диапазон from/to)"
+        ),
     ] = PeriodEnum.SEVEN_DAYS,
-) -> StatsResponse:
+    approximate: Annotated[
+        bool,
+        Query(
+            description="Оценить active_users и total_dialogs по HyperLogLog скетчам "
+            "(быстрее, стандартная ошибка ~1.6%)"
+        ),
+    ] = False,
+    granularity: Annotated[
+        GranularityEnum | None,
+        Query(description="Шаг timeline: hour или day (по умолчанию hour для 24h/48h)"),
+    ] = None,
+    from_: Annotated[
+        datetime | None,
+        Query(alias="from", description="Начало диапазона (ISO 8601, UTC без зоны)"),
+    ] = None,
+    to: Annotated[
+        datetime | None,
+        Query(description="Конец диапазона (ISO 8601, по умолчанию - сейчас)"),
+    ] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
     """Получить статистику за указанный период.
 
+    Ответ берётся из StatsCache (TTL + stale-while-revalidate). Заголовки:
+    ETag и Cache-Control для условных запросов (304 Not Modified),
+    Age - возраст ответа в кэше, X-Cache - HIT (свежий) или STALE.
+
+    Args:
+        period: Период статистики (24h, 48h, 7d, 30d, 3m, custom)
+        approximate: Приближённый подсчёт уникальных пользователей и диалогов
+        granularity: Шаг timeline (hour, day)
+        from_: Начало диапазона (задаёт period=custom)
+        to: Конец диапазона
+        if_none_match: ETag ответа, который уже есть у клиента
+
+    Returns:
+        StatsResponse с метриками и timeline (или 304 без тела)
+
+    Raises:
+        HTTPException: 422 при некорректном диапазоне или слишком большом timeline
+    """
+    start = _to_utc(from_)
+    end = _to_utc(to)
+    if start is not None:
+        period = PeriodEnum.CUSTOM
+    elif period == PeriodEnum.CUSTOM:
+        raise HTTPException(status_code=422, detail="Custom period requires 'from'")
+    granularity = granularity or default_granularity(period)
+
+    if start is not None:
+        duration = (end or datetime.now(UTC)) - start
+        if duration.total_seconds() <= 0:
+            raise HTTPException(status_code=422, detail="'from' must be before 'to'")
+    else:
+        duration = PERIOD_DURATIONS[period]
+    if duration / GRANULARITY_STEPS[granularity] > MAX_TIMELINE_POINTS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Timeline is limited to {MAX_TIMELINE_POINTS} points, "
+            "use a coarser granularity or a shorter range",
+        )
+
+    cache: StatsCache = app.state.stats_cache
+    cached = await cache.get(StatsQuery(period, granularity, approximate, start, end))
+    age = cache.age(cached)
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": f"private, max-age={int(cache.ttl)}",
+        "Age": str(int(age)),
+        "X-Cache": "HIT" if age < cache.ttl else "STALE",
+    }
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+def _to_utc(value: datetime | None) -> datetime | None:
+    """Привести время из запроса к UTC (время без зоны считается UTC).
+
     Args:
-        period: Период статистики (7d, 30d, 3m)
+        value: Время из query параметра
 
     Returns:
-        StatsResponse с метриками и timeline
+        Время с зоной UTC или None
     """
-    stat_collector = RealStatCollector(app.state.db_pool)
-    return await stat_collector.get_stats(period)
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
 
 
 @app.get("/health", summary="Health check", description="Проверка работоспособности API")
@@ -106,21 +263,19 @@ async def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
-def _session_to_chat_id(session_id: str) -> int:
-    """Конвертирует session_id в chat_id для БД.
-    
-    Используем хеш от session_id как chat_id для веб-чата.
-    Добавляем большое отрицательное число чтобы отличать от telegram chat_id.
-    
-    Args:
-        session_id: ID сессии веб-чата
-        
+@app.get(
+    "/api/chat/templates/stats",
+    summary="Статистика шаблонов admin режима",
+    description="Попадания частых вопросов в SQL шаблоны (без LLM) и доля попаданий",
+)
+async def get_template_stats() -> dict[str, Any]:
+    """Счётчики SQLTemplateMatcher.
+
     Returns:
-        chat_id для использования в БД
+        Попадания по шаблонам, промахи и доля попаданий
     """
-    # Используем hash для генерации числового chat_id
-    # Делаем отрицательным и большим чтобы отличать от telegram
-    return -(abs(hash(session_id)) % 1_000_000_000 + 1_000_000_000)
+    stats = app.state.sql_templates.stats
+    return {"hits": dict(stats.hits), "misses": stats.misses, "hit_rate": stats.hit_rate}
 
 
 @app.post(
@@ -141,83 +296,151 @@ async def chat_message(request: ChatRequest) -> ChatResponse:
     logger.info(f"Chat message received: mode={request.mode}, session={request.session_id}")
 
     try:
-        # Конвертируем session_id в chat_id
-        chat_id = _session_to_chat_id(request.session_id)
+        # Стабильный chat_id сессии (таблица web_sessions)
+        chat_id = await app.state.sessions.get_chat_id(request.session_id)
         user_id = 0  # Для веб-чата используем фиксированный user_id
 
-        # Загружаем историю диалога из БД (последние 20 сообщений)
-        async with app.state.db_pool.acquire() as conn:
-            rows = await conn.fetch(
-                """
-                SELECT id, user_id, chat_id, role, content, content_length, username,
-                       created_at, is_deleted
-                FROM messages
-                WHERE chat_id = $1 AND user_id = $2 AND is_deleted = FALSE
-                ORDER BY created_at DESC, id DESC
-                LIMIT 20
-                """,
-                chat_id,
-                user_id,
-            )
-
-            # Преобразуем в список Message (от старых к новым)
-            history = [
-                Message(
-                    id=row["id"],
-                    user_id=row["user_id"],
-                    chat_id=row["chat_id"],
-                    role=row["role"],
-                    content=row["content"],
-                    content_length=row["content_length"],
-                    username=row["username"],
-                    created_at=row["created_at"],
-                    is_deleted=row["is_deleted"],
-                )
-                for row in reversed(rows)
-            ]
+        # Сохраняем сообщение пользователя и загружаем историю одним запросом
+        # (последние 20 сообщений + текущее, в пределах бюджета токенов)
+        user_message = Message(
+            user_id=user_id,
+            chat_id=chat_id,
+            role="user",
+            content=request.message,
+            content_length=len(request.message),
+            username="web_user",
+        )
+        history = await app.state.database.append_and_get_history(
+            user_message, limit=21, max_tokens=app.state.history_token_budget
+        )
 
         # Создаем ChatService и обрабатываем сообщение
-        chat_service = ChatService(app.state.llm_client, app.state.db_pool)
-        response = await chat_service.process_message(request, history)
-
-        # Сохраняем сообщение пользователя и ответ ассистента в БД
-        async with app.state.db_pool.acquire() as conn:
-            # Сохраняем сообщение пользователя
-            await conn.execute(
-                """
-                INSERT INTO messages (user_id, chat_id, role, content, content_length, username)
-                VALUES ($1, $2, $3, $4, $5, $6)
-                """,
-                user_id,
-                chat_id,
-                "user",
-                request.message,
-                len(request.message),
-                "web_user",
-            )
-
-            # Сохраняем ответ ассистента
-            await conn.execute(
-                """
-                INSERT INTO messages (user_id, chat_id, role, content, content_length, username)
-                VALUES ($1, $2, $3, $4, $5, $6)
-                """,
-                user_id,
-                chat_id,
-                "assistant",
-                response.message,
-                len(response.message),
-                "assistant",
+        # (ChatService сам добавляет текущее сообщение, поэтому передаем историю без него)
+        chat_service = ChatService(
+            app.state.llm_client,
+            app.state.db_pool,
+            app.state.sql_cache,
+            app.state.sql_templates,
+            app.state.sql_sandbox,
+            app.state.schema_catalog,
+        )
+        response = await chat_service.process_message(request, history[:-1], chat_id)
+
+        # Сохраняем ответ ассистента в БД
+        await app.state.database.save_message(
+            Message(
+                user_id=user_id,
+                chat_id=chat_id,
+                role="assistant",
+                content=response.message,
+                content_length=len(response.message),
+                username="assistant",
             )
+        )
 
         logger.info(f"Chat response sent: mode={response.mode}")
         return response
 
+    except LLMBusyError as e:
+        logger.warning(f"Chat message rejected, LLM busy: session={request.session_id}")
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "10"}
+        ) from e
+
     except Exception as e:
         logger.error(f"Error processing chat message: {e}")
         raise
 
 
+def _format_sse(event: ChatStreamEvent) -> str:
+    """Форматирует событие в формат Server-Sent Events.
+
+    Args:
+        event: Событие потока
+
+    Returns:
+        Строка SSE события
+    """
+    return f"event: {event.event}\ndata: {json.dumps(event.data, ensure_ascii=False)}\n\n"
+
+
+@app.post(
+    "/api/chat/stream",
+    summary="Отправить сообщение в чат (потоковый ответ)",
+    description=(
+        "Отправляет сообщение в чат и возвращает ответ потоком Server-Sent Events: "
+        "token (фрагменты ответа), stage (этапы admin режима), done (итог) или error"
+    ),
+    response_class=StreamingResponse,
+)
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """Обработка сообщения чата с потоковым ответом (SSE).
+
+    Ответ ассистента сохраняется в БД после закрытия потока.
+
+    Args:
+        request: Запрос с сообщением, режимом и session_id
+
+    Returns:
+        Поток событий text/event-stream
+    """
+    logger.info(f"Chat stream requested: mode={request.mode}, session={request.session_id}")
+
+    chat_id = await app.state.sessions.get_chat_id(request.session_id)
+    user_id = 0
+
+    # Сохраняем сообщение пользователя и загружаем историю одним запросом
+    user_message = Message(
+        user_id=user_id,
+        chat_id=chat_id,
+        role="user",
+        content=request.message,
+        content_length=len(request.message),
+        username="web_user",
+    )
+    history = await app.state.database.append_and_get_history(
+        user_message, limit=21, max_tokens=app.state.history_token_budget
+    )
+
+    chat_service = ChatService(
+        app.state.llm_client,
+        app.state.db_pool,
+        app.state.sql_cache,
+        app.state.sql_templates,
+        app.state.sql_sandbox,
+        app.state.schema_catalog,
+    )
+    final_message: list[str] = []
+
+    async def event_source() -> AsyncIterator[str]:
+        async for event in chat_service.stream_message(request, history[:-1], chat_id):
+            if event.event == "done":
+                final_message.append(event.data["message"])
+            yield _format_sse(event)
+
+    async def save_response() -> None:
+        if not final_message:
+            return
+        await app.state.database.save_message(
+            Message(
+                user_id=user_id,
+                chat_id=chat_id,
+                role="assistant",
+                content=final_message[0],
+                content_length=len(final_message[0]),
+                username="assistant",
+            )
+        )
+        logger.info(f"Chat stream response saved: mode={request.mode}")
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(save_response),
+    )
+
+
 @app.get(
     "/api/chat/history/{session_id}",
     response_model=list[ChatMessage],
@@ -240,8 +463,10 @@ async def get_chat_history(
     logger.info(f"Fetching chat history: session={session_id}, limit={limit}")
 
     try:
-        # Конвертируем session_id в chat_id
-        chat_id = _session_to_chat_id(session_id)
+        # chat_id сессии; у сессии без сообщений истории нет
+        chat_id = await app.state.sessions.find_chat_id(session_id)
+        if chat_id is None:
+            return []
         user_id = 0
 
         async with app.state.db_pool.acquire() as conn:
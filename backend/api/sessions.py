@@ -0,0 +1,122 @@
+"""Стабильное соответствие session_id веб-чата и chat_id в БД."""
+
+import logging
+from collections import OrderedDict
+
+import asyncpg  # type: ignore[import-untyped]
+
+logger = logging.getLogger(__name__)
+
+# Чтение существующей сессии или создание новой одним round-trip
+UPSERT_SESSION_SQL = """
+    WITH existing AS (
+        SELECT chat_id FROM web_sessions WHERE session_id = $1
+    ),
+    inserted AS (
+        INSERT INTO web_sessions (session_id)
+        SELECT $1 WHERE NOT EXISTS (SELECT 1 FROM existing)
+        ON CONFLICT (session_id) DO NOTHING
+        RETURNING chat_id
+    )
+    SELECT chat_id FROM existing
+    UNION ALL
+    SELECT chat_id FROM inserted
+    LIMIT 1
+"""
+
+SELECT_SESSION_SQL = "SELECT chat_id FROM web_sessions WHERE session_id = $1"
+
+
+class SessionMapper:
+    """Соответствие session_id -> chat_id, общее для всех процессов API.
+
+    chat_id выдаётся последовательностью БД при первом обращении сессии и
+    хранится в таблице web_sessions, поэтому одинаков во всех воркерах uvicorn
+    и после перезапуска. Соответствие неизменяемо, и LRU кэш в памяти
+    процесса не требует инвалидации.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, max_cached: int = 10000, retries: int = 3):
+        """Инициализация.
+
+        Args:
+            pool: Connection pool к базе данных
+            max_cached: Максимальное количество сессий в LRU кэше
+            retries: Количество попыток при гонке создания одной сессии
+        """
+        self.pool = pool
+        self.max_cached = max_cached
+        self.retries = retries
+        self._cache: OrderedDict[str, int] = OrderedDict()
+
+    async def get_chat_id(self, session_id: str) -> int:
+        """chat_id сессии (сессия создаётся при первом обращении).
+
+        Args:
+            session_id: ID сессии веб-чата
+
+        Returns:
+            chat_id для использования в БД
+
+        Raises:
+            RuntimeError: Если не удалось получить chat_id за retries попыток
+        """
+        cached = self._get_cached(session_id)
+        if cached is not None:
+            return cached
+
+        for _ in range(self.retries):
+            async with self.pool.acquire() as conn:
+                chat_id = await conn.fetchval(UPSERT_SESSION_SQL, session_id)
+            # None - параллельная вставка той же сессии ещё не видна снимку запроса
+            if chat_id is not None:
+                self._remember(session_id, chat_id)
+                return int(chat_id)
+
+        raise RuntimeError(f"Failed to resolve chat_id for session {session_id}")
+
+    async def find_chat_id(self, session_id: str) -> int | None:
+        """chat_id существующей сессии без создания новой.
+
+        Args:
+            session_id: ID сессии веб-чата
+
+        Returns:
+            chat_id или None, если сессия ещё не писала сообщений
+        """
+        cached = self._get_cached(session_id)
+        if cached is not None:
+            return cached
+
+        async with self.pool.acquire() as conn:
+            chat_id = await conn.fetchval(SELECT_SESSION_SQL, session_id)
+        if chat_id is None:
+            return None
+        self._remember(session_id, chat_id)
+        return int(chat_id)
+
+    def _get_cached(self, session_id: str) -> int | None:
+        """Поиск в LRU кэше.
+
+        Args:
+            session_id: ID сессии
+
+        Returns:
+            chat_id или None при промахе
+        """
+        chat_id = self._cache.get(session_id)
+        if chat_id is not None:
+            self._cache.move_to_end(session_id)
+        return chat_id
+
+    def _remember(self, session_id: str, chat_id: int) -> None:
+        """Добавление в LRU кэш с вытеснением самых старых сессий.
+
+        Args:
+            session_id: ID сессии
+            chat_id: chat_id сессии
+        """
+        self._cache[session_id] = int(chat_id)
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
@@ -0,0 +1,162 @@
+"""Кэш text-to-SQL: вопрос -> SQL и SQL -> сводка результатов по версии данных."""
+
+import logging
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from backend.api.result_summary import ResultSummary
+
+logger = logging.getLogger(__name__)
+
+# Версия данных для инвалидации результатов: новое сообщение увеличивает MAX(id)
+# (индекс по первичному ключу, запрос не читает таблицу)
+DATA_VERSION_SQL = "SELECT COALESCE(MAX(id), 0) FROM messages"
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Нормализация вопроса для ключа кэша.
+
+    Регистр, ё/е, повторные пробелы и завершающие знаки препинания не влияют
+    на сгенерированный SQL, поэтому не должны влиять и на ключ.
+
+    Args:
+        question: Вопрос пользователя
+
+    Returns:
+        Нормализованный вопрос
+    """
+    question = question.lower().replace("ё", "е")
+    return _SPACES.sub(" ", question).strip().rstrip("?!.").rstrip()
+
+
+@dataclass
+class SQLCacheStats:
+    """Счётчики работы кэша text-to-SQL.
+
+    Attributes:
+        sql_hits: Вопросы, для которых SQL взят из кэша (без генерации LLM)
+        sql_misses: Вопросы, для которых SQL генерировался
+        result_hits: Запросы, результаты которых взяты из кэша (без выполнения)
+        result_misses: Запросы, выполненные в БД
+    """
+
+    sql_hits: int = 0
+    sql_misses: int = 0
+    result_hits: int = 0
+    result_misses: int = 0
+
+
+@dataclass
+class _CachedResult:
+    """Сводка результатов SQL запроса при определённой версии данных."""
+
+    version: int
+    summary: ResultSummary
+    created_at: float
+
+
+class SQLCache:
+    """Двухуровневый LRU кэш admin режима чата.
+
+    Первый уровень - нормализованный вопрос -> SQL: повторный вопрос не требует
+    генерации SQL через LLM. Второй уровень - SQL -> сводка результата
+    (ResultSummary постоянного размера) вместе с версией данных
+    (DATA_VERSION_SQL): пока версия не изменилась, запрос не выполняется
+    повторно. Изменения без новых строк (soft delete в clear_history,
+    смена CURRENT_DATE в запросах "за сегодня") версию не меняют, поэтому
+    результаты дополнительно ограничены временем жизни result_ttl.
+    """
+
+    def __init__(
+        self,
+        max_questions: int = 512,
+        max_results: int = 128,
+        result_ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Инициализация.
+
+        Args:
+            max_questions: Максимальное количество вопросов (первый уровень)
+            max_results: Максимальное количество результатов (второй уровень)
+            result_ttl: Время жизни результатов (секунды)
+            clock: Часы (для тестов)
+        """
+        self.max_questions = max_questions
+        self.max_results = max_results
+        self.result_ttl = result_ttl
+        self.clock = clock
+        self._sql: OrderedDict[str, str] = OrderedDict()
+        self._results: OrderedDict[str, _CachedResult] = OrderedDict()
+        self.stats = SQLCacheStats()
+
+    def get_sql(self, question: str) -> str | None:
+        """SQL для вопроса, если он уже генерировался.
+
+        Args:
+            question: Вопрос пользователя
+
+        Returns:
+            SQL запрос или None при промахе
+        """
+        key = normalize_question(question)
+        sql = self._sql.get(key)
+        if sql is None:
+            self.stats.sql_misses += 1
+            return None
+        self._sql.move_to_end(key)
+        self.stats.sql_hits += 1
+        return sql
+
+    def put_sql(self, question: str, sql: str) -> None:
+        """Запомнить SQL для вопроса (после успешного выполнения).
+
+        Args:
+            question: Вопрос пользователя
+            sql: Сгенерированный SQL запрос
+        """
+        key = normalize_question(question)
+        self._sql[key] = sql
+        self._sql.move_to_end(key)
+        while len(self._sql) > self.max_questions:
+            self._sql.popitem(last=False)
+
+    def get_results(self, sql: str, version: int) -> ResultSummary | None:
+        """Сводка результатов запроса, если данные с тех пор не менялись.
+
+        Args:
+            sql: SQL запрос
+            version: Текущая версия данных
+
+        Returns:
+            Сводка результатов или None при промахе
+        """
+        entry = self._results.get(sql)
+        if (
+            entry is None
+            or entry.version != version
+            or self.clock() - entry.created_at >= self.result_ttl
+        ):
+            self.stats.result_misses += 1
+            return None
+        self._results.move_to_end(sql)
+        self.stats.result_hits += 1
+        return entry.summary
+
+    def put_results(self, sql: str, version: int, summary: ResultSummary) -> None:
+        """Запомнить сводку результатов запроса при версии данных version.
+
+        Args:
+            sql: SQL запрос
+            version: Версия данных, при которой запрос выполнялся
+            summary: Сводка результатов
+        """
+        self._results[sql] = _CachedResult(version, summary, self.clock())
+        self._results.move_to_end(sql)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
@@ -1,28 +1,42 @@
 """SQL генератор для text-to-SQL функциональности."""
 
-import json
 import logging
 from typing import Any
 
 import asyncpg  # type: ignore[import-untyped]
 
-from backend.api.prompts import INTERPRET_RESULTS_PROMPT, TEXT_TO_SQL_PROMPT
+from backend.api.prompts import DEFAULT_SQL_SCHEMA, INTERPRET_RESULTS_PROMPT, TEXT_TO_SQL_PROMPT
+from backend.api.result_summary import ResultSummary
+from backend.api.schema_catalog import SchemaCatalog
+from backend.api.sql_sandbox import SQLSandbox
 from src.llm.client import LLMClient
+from src.llm.streaming import ResponseStream
 from src.storage.models import Message
 
 logger = logging.getLogger(__name__)
 
+INTERPRET_SYSTEM_PROMPT = "Ты аналитик данных. Интерпретируй результаты запросов понятно."
+
 
 class SQLGenerator:
     """Генератор SQL запросов через LLM и выполнение их."""
 
-    def __init__(self, llm_client: LLMClient):
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        sandbox: SQLSandbox | None = None,
+        schema_catalog: SchemaCatalog | None = None,
+    ):
         """Инициализация SQL генератора.
 
         Args:
             llm_client: Клиент для работы с LLM
+            sandbox: Ограниченное выполнение запросов (None - напрямую через db_pool)
+            schema_catalog: Каталог схемы БД для промпта (None - DEFAULT_SQL_SCHEMA)
         """
         self.llm_client = llm_client
+        self.sandbox = sandbox
+        self.schema_catalog = schema_catalog
 
     async def generate_sql(self, question: str) -> str:
         """Генерирует SQL запрос на основе вопроса пользователя.
@@ -39,8 +53,13 @@ class SQLGenerator:
         logger.info(f"Generating SQL for question: {question[:100]}")
 
         try:
-            # Формируем промпт с вопросом
-            prompt = TEXT_TO_SQL_PROMPT.format(question=question)
+            # Формируем промпт со схемой БД и вопросом
+            schema = None
+            if self.schema_catalog is not None:
+                schema = await self.schema_catalog.get_prompt_schema()
+            prompt = TEXT_TO_SQL_PROMPT.format(
+                schema=schema or DEFAULT_SQL_SCHEMA, question=question
+            )
 
             # Создаем пустое сообщение с промптом для LLM
             messages = [
@@ -76,12 +95,18 @@ class SQLGenerator:
             logger.error(f"Error generating SQL: {e}")
             raise
 
-    async def execute_sql(self, sql: str, db_pool: asyncpg.Pool) -> list[dict[str, Any]]:
+    async def execute_sql(
+        self, sql: str, db_pool: asyncpg.Pool, *args: Any
+    ) -> list[dict[str, Any]]:
         """Выполняет SQL запрос и возвращает результаты.
 
+        Если задан sandbox, запрос выполняется в нём (отдельный pool, только
+        чтение, таймаут, ограничение стоимости и строк), а db_pool не используется.
+
         Args:
             sql: SQL запрос для выполнения
             db_pool: Connection pool к базе данных
+            *args: Параметры запроса ($1, $2, ...)
 
         Returns:
             Список словарей с результатами запроса
@@ -92,9 +117,14 @@ class SQLGenerator:
         logger.info(f"Executing SQL: {sql[:200]}")
 
         try:
+            if self.sandbox is not None:
+                results = await self.sandbox.execute(sql, *args)
+                logger.info(f"SQL execution returned {len(results)} rows")
+                return results
+
             async with db_pool.acquire() as conn:
                 # Выполняем запрос
-                rows = await conn.fetch(sql)
+                rows = await conn.fetch(sql, *args)
 
                 # Преобразуем результаты в список словарей
                 results = [dict(row) for row in rows]
@@ -106,15 +136,51 @@ class SQLGenerator:
             logger.error(f"Error executing SQL: {e}")
             raise
 
-    async def interpret_results(
-        self, question: str, sql: str, results: list[dict[str, Any]]
-    ) -> str:
+    async def summarize_sql(
+        self, sql: str, db_pool: asyncpg.Pool, *args: Any, chunk_size: int = 500
+    ) -> ResultSummary:
+        """Выполняет SQL запрос и возвращает сводку результатов.
+
+        Строки читаются серверным курсором порциями и не накапливаются в памяти.
+        Если задан sandbox, запрос выполняется в нём, а db_pool не используется.
+
+        Args:
+            sql: SQL запрос для выполнения
+            db_pool: Connection pool к базе данных
+            *args: Параметры запроса ($1, $2, ...)
+            chunk_size: Размер порции чтения курсора (без sandbox)
+
+        Returns:
+            Сводка результатов (первые строки и статистика колонок)
+
+        Raises:
+            Exception: При ошибке выполнения SQL
+        """
+        logger.info(f"Executing SQL (summary): {sql[:200]}")
+
+        try:
+            if self.sandbox is not None:
+                summary = await self.sandbox.summarize(sql, *args)
+            else:
+                summary = ResultSummary()
+                async with db_pool.acquire() as conn, conn.transaction(readonly=True):
+                    async for row in conn.cursor(sql, *args, prefetch=chunk_size):
+                        summary.add(row)
+
+            logger.info(f"SQL execution returned {summary.row_count} rows")
+            return summary
+
+        except Exception as e:
+            logger.error(f"Error executing SQL: {e}")
+            raise
+
+    async def interpret_results(self, question: str, sql: str, results: ResultSummary) -> str:
         """Интерпретирует результаты SQL запроса через LLM.
 
         Args:
             question: Исходный вопрос пользователя
             sql: Выполненный SQL запрос
-            results: Результаты выполнения SQL
+            results: Сводка результатов выполнения SQL
 
         Returns:
             Человекочитаемая интерпретация результатов
@@ -125,32 +191,11 @@ class SQLGenerator:
         logger.info(f"Interpreting results for question: {question[:100]}")
 
         try:
-            # Форматируем результаты для LLM (ограничиваем объем)
-            results_str = json.dumps(results[:50], ensure_ascii=False, indent=2, default=str)
-            if len(results) > 50:
-                results_str += f"\n\n... и еще {len(results) - 50} строк"
-
-            # Формируем промпт
-            prompt = INTERPRET_RESULTS_PROMPT.format(
-                question=question, sql=sql, results=results_str
-            )
-
-            # Создаем сообщение для LLM
-            messages = [
-                Message(
-                    user_id=0,
-                    chat_id=0,
-                    role="user",
-                    content=prompt,
-                    content_length=len(prompt),
-                    username="system",
-                )
-            ]
+            messages = self._build_interpret_messages(question, sql, results)
 
             # Получаем интерпретацию от LLM
             interpretation = await self.llm_client.get_response(
-                messages=messages,
-                system_prompt="Ты аналитик данных. Интерпретируй результаты запросов понятно.",
+                messages=messages, system_prompt=INTERPRET_SYSTEM_PROMPT
             )
 
             logger.info(f"Generated interpretation: {interpretation[:100]}")
@@ -160,3 +205,51 @@ class SQLGenerator:
             logger.error(f"Error interpreting results: {e}")
             raise
 
+    def interpret_results_stream(
+        self, question: str, sql: str, results: ResultSummary
+    ) -> ResponseStream:
+        """Интерпретирует результаты SQL запроса через LLM потоком фрагментов.
+
+        Args:
+            question: Исходный вопрос пользователя
+            sql: Выполненный SQL запрос
+            results: Сводка результатов выполнения SQL
+
+        Returns:
+            Поток фрагментов интерпретации
+        """
+        logger.info(f"Interpreting results (streaming) for question: {question[:100]}")
+
+        messages = self._build_interpret_messages(question, sql, results)
+        return self.llm_client.stream_response(
+            messages=messages, system_prompt=INTERPRET_SYSTEM_PROMPT
+        )
+
+    def _build_interpret_messages(
+        self, question: str, sql: str, results: ResultSummary
+    ) -> list[Message]:
+        """Формирует сообщение для LLM с результатами SQL запроса.
+
+        Args:
+            question: Исходный вопрос пользователя
+            sql: Выполненный SQL запрос
+            results: Сводка результатов выполнения SQL
+
+        Returns:
+            Список из одного сообщения с промптом интерпретации
+        """
+        # Размер промпта не зависит от числа строк: первые строки и сводка колонок
+        prompt = INTERPRET_RESULTS_PROMPT.format(
+            question=question, sql=sql, results=results.to_prompt()
+        )
+
+        return [
+            Message(
+                user_id=0,
+                chat_id=0,
+                role="user",
+                content=prompt,
+                content_length=len(prompt),
+                username="system",
+            )
+        ]
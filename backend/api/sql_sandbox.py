@@ -0,0 +1,362 @@
+"""Ограниченное выполнение SQL, сгенерированного для admin режима."""
+
+import json
+import logging
+from typing import Any
+
+import asyncpg  # type: ignore[import-untyped]
+
+from backend.api.result_summary import ResultSummary
+
+logger = logging.getLogger(__name__)
+
+# Таблицы, доступные SQL admin режима: сообщения и агрегаты статистики.
+# Служебные таблицы и web_sessions (id сессий дают доступ к истории веб-чата)
+# недоступны. Тот же список показывает LLM SchemaCatalog
+ALLOWED_TABLES = (
+    "messages",
+    "message_daily_rollup",
+    "message_daily_stats",
+    "message_hourly_stats",
+)
+
+# Роль с SELECT только на ALLOWED_TABLES (migrations/008_sql_reader_role.sql)
+READER_ROLE = "aidd_sql_reader"
+
+# Таблицы вне списка разрешённых, которые может читать сам логин pool
+_READABLE_TABLES_SQL = """
+    SELECT c.relname
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname NOT IN ('pg_catalog', 'information_schema')
+      AND n.nspname NOT LIKE 'pg_toast%'
+      AND c.relkind IN ('r', 'p', 'v', 'm')
+      AND c.relname <> ALL($1::text[])
+      AND has_table_privilege(session_user, c.oid, 'SELECT')
+    ORDER BY c.relname
+"""
+
+
+class SQLRejectedError(Exception):
+    """Запрос отклонён: оценка стоимости выше допустимой или недоступные таблицы."""
+
+
+class SQLSandbox:
+    """Выполнение аналитических запросов с ограничениями.
+
+    - Отдельный небольшой pool: аналитика не занимает соединения бота и дашборда.
+    - Транзакция только для чтения (и default_transaction_read_only у соединений pool).
+    - statement_timeout на каждый запрос (SET LOCAL).
+    - Оценка стоимости через EXPLAIN до выполнения: дорогие запросы (полный
+      перебор больших таблиц, декартовы произведения) отклоняются.
+    - Только ALLOWED_TABLES: запросы, план которых читает другие таблицы
+      (в том числе системные каталоги), отклоняются. Сам запрос выполняется
+      под ролью READER_ROLE (SET LOCAL ROLE) с SELECT только на эти таблицы,
+      поэтому функции, выполняющие SQL (query_to_xml и т. п.), тоже не
+      получают доступа к остальным таблицам. Смена роли внутри запроса
+      (set_config) обнаруживается после выполнения, результат отбрасывается.
+      Запрос может вернуть роль до проверки, поэтому pool должен подключаться
+      логином с правами только READER_ROLE (SQL_SANDBOX_USER), иначе при
+      старте пишется предупреждение.
+    - Жёсткое ограничение строк: запрос оборачивается в SELECT ... LIMIT.
+
+    execute() возвращает строки (не больше max_rows), summarize() читает до
+    max_scan_rows строк серверным курсором и возвращает их сводку.
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        statement_timeout: float = 5.0,
+        max_cost: float = 1_000_000.0,
+        max_rows: int = 1000,
+        max_scan_rows: int = 100_000,
+        chunk_size: int = 500,
+        allowed_tables: tuple[str, ...] = ALLOWED_TABLES,
+        role: str | None = None,
+    ):
+        """Инициализация.
+
+        Args:
+            pool: Отдельный connection pool для аналитических запросов
+            statement_timeout: Максимальное время выполнения запроса (секунды)
+            max_cost: Максимальная оценка стоимости плана (единицы планировщика)
+            max_rows: Максимальное количество строк результата execute()
+            max_scan_rows: Максимальное количество строк, читаемых summarize()
+            chunk_size: Размер порции чтения серверного курсора
+            allowed_tables: Таблицы, которые может читать запрос
+            role: Роль для выполнения запросов (None - роль соединения)
+        """
+        self.pool = pool
+        self.statement_timeout = statement_timeout
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.max_scan_rows = max_scan_rows
+        self.chunk_size = chunk_size
+        self.allowed_tables = allowed_tables
+        self.role = role
+
+    @classmethod
+    async def create(
+        cls,
+        host: str,
+        port: int,
+        database: str,
+        user: str,
+        password: str,
+        pool_size: int = 2,
+        statement_timeout: float = 5.0,
+        max_cost: float = 1_000_000.0,
+        max_rows: int = 1000,
+        max_scan_rows: int = 100_000,
+        role: str = READER_ROLE,
+    ) -> "SQLSandbox":
+        """Создание sandbox с собственным connection pool.
+
+        Args:
+            host: Хост PostgreSQL
+            port: Порт PostgreSQL
+            database: Имя базы данных
+            user: Пользователь
+            password: Пароль
+            pool_size: Максимальное количество соединений
+            statement_timeout: Максимальное время выполнения запроса (секунды)
+            max_cost: Максимальная оценка стоимости плана
+            max_rows: Максимальное количество строк результата execute()
+            max_scan_rows: Максимальное количество строк, читаемых summarize()
+            role: Роль с SELECT только на разрешённые таблицы
+
+        Returns:
+            Sandbox с открытым pool
+        """
+        timeout_ms = str(int(statement_timeout * 1000))
+        pool = await asyncpg.create_pool(
+            host=host,
+            port=port,
+            database=database,
+            user=user,
+            password=password,
+            min_size=1,
+            max_size=pool_size,
+            server_settings={
+                "default_transaction_read_only": "on",
+                "statement_timeout": timeout_ms,
+                # Границы периодов передаются как naive UTC (см. Database.connect)
+                "timezone": "UTC",
+                "application_name": "aidd-sql-sandbox",
+            },
+        )
+        # Роль создаёт миграция 008; без прав на CREATE ROLE её может не быть
+        async with pool.acquire() as conn:
+            available = await conn.fetchval(
+                "SELECT pg_has_role(current_user, oid, 'MEMBER') FROM pg_roles WHERE rolname = $1",
+                role,
+            )
+            readable = await conn.fetch(_READABLE_TABLES_SQL, list(ALLOWED_TABLES))
+        if not available:
+            logger.warning(
+                f"SQL sandbox role {role} is not available: queries run as {user}, "
+                f"only the EXPLAIN table check is enforced"
+            )
+        # Запрос может вернуться из роли к логину через set_config('role', ...)
+        # и обратно, поэтому права логина - последняя граница
+        if readable:
+            tables = ", ".join(row["relname"] for row in readable)
+            logger.warning(
+                f"SQL sandbox login {user} can read tables outside the allow-list ({tables}): "
+                f"set SQL_SANDBOX_USER to a login that is only a member of {role}"
+            )
+        logger.info(
+            f"SQL sandbox pool created: size={pool_size}, timeout={statement_timeout}s, "
+            f"max_cost={max_cost}, max_rows={max_rows}, role={role if available else user}"
+        )
+        return cls(
+            pool,
+            statement_timeout,
+            max_cost,
+            max_rows,
+            max_scan_rows,
+            role=role if available else None,
+        )
+
+    async def close(self) -> None:
+        """Закрытие connection pool."""
+        await self.pool.close()
+
+    async def execute(self, sql: str, *args: Any) -> list[dict[str, Any]]:
+        """Выполнить запрос с ограничениями.
+
+        Args:
+            sql: SQL запрос (один SELECT или WITH ... SELECT)
+            *args: Параметры запроса ($1, $2, ...)
+
+        Returns:
+            Не больше max_rows строк результата
+
+        Raises:
+            SQLRejectedError: Если оценка стоимости выше max_cost
+            asyncpg.QueryCanceledError: Если запрос не уложился в statement_timeout
+            asyncpg.PostgresError: При ошибке запроса (в том числе попытке записи)
+        """
+        # Лишняя строка показывает, что результат обрезан
+        bounded = self._bound(sql, self.max_rows + 1)
+
+        async with self.pool.acquire() as conn, conn.transaction(readonly=True):
+            await self._check(conn, bounded, args, sql)
+            rows = await conn.fetch(bounded, *args)
+            await self._check_role(conn, sql)
+
+        if len(rows) > self.max_rows:
+            logger.warning(f"SQL result truncated to {self.max_rows} rows: {sql[:200]}")
+            rows = rows[: self.max_rows]
+        return [dict(row) for row in rows]
+
+    async def summarize(self, sql: str, *args: Any) -> ResultSummary:
+        """Выполнить запрос с ограничениями и собрать сводку результата.
+
+        Строки читаются серверным курсором порциями по chunk_size и сразу
+        учитываются в сводке, поэтому память не зависит от размера результата.
+        Читается не больше max_scan_rows строк.
+
+        Args:
+            sql: SQL запрос (один SELECT или WITH ... SELECT)
+            *args: Параметры запроса ($1, $2, ...)
+
+        Returns:
+            Сводка результата
+
+        Raises:
+            SQLRejectedError: Если оценка стоимости выше max_cost
+            asyncpg.QueryCanceledError: Если запрос не уложился в statement_timeout
+            asyncpg.PostgresError: При ошибке запроса (в том числе попытке записи)
+        """
+        bounded = self._bound(sql, self.max_scan_rows + 1)
+        summary = ResultSummary()
+
+        async with self.pool.acquire() as conn, conn.transaction(readonly=True):
+            await self._check(conn, bounded, args, sql)
+            async for row in conn.cursor(bounded, *args, prefetch=self.chunk_size):
+                if summary.row_count == self.max_scan_rows:
+                    summary.truncated = True
+                    logger.warning(
+                        f"SQL result truncated to {self.max_scan_rows} rows: {sql[:200]}"
+                    )
+                    break
+                summary.add(row)
+            await self._check_role(conn, sql)
+
+        return summary
+
+    async def _check(
+        self, conn: asyncpg.Connection, bounded: str, args: tuple[Any, ...], sql: str
+    ) -> None:
+        """Таймаут, проверка плана и переход в роль sandbox (внутри транзакции).
+
+        Args:
+            conn: Соединение с открытой транзакцией только для чтения
+            bounded: Запрос, обёрнутый в LIMIT
+            args: Параметры запроса
+            sql: Исходный запрос (для лога)
+
+        Raises:
+            SQLRejectedError: Если оценка стоимости выше max_cost или план
+                читает таблицы не из allowed_tables
+        """
+        await conn.execute(f"SET LOCAL statement_timeout = {int(self.statement_timeout * 1000)}")
+
+        # План строится до смены роли: запрос к недоступной таблице отклоняется
+        # с понятной причиной, а не ошибкой прав
+        plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {bounded}", *args)
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        denied = sorted(self._plan_relations(plan[0]["Plan"]) - set(self.allowed_tables))
+        if denied:
+            logger.warning(f"SQL rejected: tables {denied} are not allowed: {sql[:200]}")
+            raise SQLRejectedError(
+                f"Запрос обращается к недоступным таблицам: {', '.join(denied)}. "
+                f"Доступны: {', '.join(self.allowed_tables)}"
+            )
+
+        cost = self._plan_cost(plan)
+        if cost > self.max_cost:
+            logger.warning(f"SQL rejected: cost {cost:.0f} > {self.max_cost:.0f}: {sql[:200]}")
+            raise SQLRejectedError(
+                f"Запрос слишком тяжёлый (оценка стоимости {cost:.0f}, "
+                f"допустимо {self.max_cost:.0f}): уточните период или условия"
+            )
+
+        if self.role is not None:
+            await conn.execute(f'SET LOCAL ROLE "{self.role}"')
+
+    async def _check_role(self, conn: asyncpg.Connection, sql: str) -> None:
+        """Проверка, что запрос не сменил роль (set_config('role', ...)).
+
+        Args:
+            conn: Соединение с открытой транзакцией
+            sql: Исходный запрос (для лога)
+
+        Raises:
+            SQLRejectedError: Если роль сменилась (транзакция откатывается,
+                результат не возвращается)
+        """
+        if self.role is None:
+            return
+        current = await conn.fetchval("SELECT current_user")
+        if current != self.role:
+            logger.warning(f"SQL rejected: role changed to {current}: {sql[:200]}")
+            raise SQLRejectedError("Запрос изменил роль сессии")
+
+    @classmethod
+    def _plan_relations(cls, node: dict[str, Any]) -> set[str]:
+        """Таблицы, которые читает план (узлы с Relation Name, рекурсивно).
+
+        Args:
+            node: Узел плана EXPLAIN (FORMAT JSON)
+
+        Returns:
+            Имена таблиц
+        """
+        relations = {node["Relation Name"]} if "Relation Name" in node else set()
+        for child in node.get("Plans", []):
+            relations |= cls._plan_relations(child)
+        return relations
+
+    @classmethod
+    def _bound(cls, sql: str, limit: int) -> str:
+        """Запрос, обёрнутый в SELECT * FROM (...) LIMIT.
+
+        Args:
+            sql: SQL запрос
+            limit: Максимальное количество строк
+
+        Returns:
+            Ограниченный запрос
+        """
+        return f"SELECT * FROM (\n{cls._strip(sql)}\n) AS sandboxed LIMIT {limit}"
+
+    @staticmethod
+    def _strip(sql: str) -> str:
+        """Запрос без завершающих ';' (для подзапроса).
+
+        Args:
+            sql: SQL запрос
+
+        Returns:
+            Запрос, пригодный для вложения в SELECT * FROM (...)
+        """
+        return sql.strip().rstrip(";").rstrip()
+
+    @staticmethod
+    def _plan_cost(plan: Any) -> float:
+        """Оценка стоимости из результата EXPLAIN (FORMAT JSON).
+
+        Args:
+            plan: Значение колонки QUERY PLAN (JSON строка или список)
+
+        Returns:
+            Total Cost корневого узла плана
+        """
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return float(plan[0]["Plan"]["Total Cost"])
@@ -0,0 +1,357 @@
+"""Шаблоны SQL для частых вопросов admin режима (без обращения к LLM)."""
+
+import logging
+import re
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from backend.api.sql_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+# Максимальное N в вопросах "топ N пользователей"
+MAX_TOP_USERS = 100
+
+# Начало периода "за всё время"
+_EPOCH = datetime.fromtimestamp(0, UTC).replace(tzinfo=None)
+
+# Фильтр периода, общий для всех шаблонов ($1 - начало, $2 - конец).
+# Границы - naive UTC, как и messages.created_at: pool Database и SQLSandbox
+# открывают сессии с timezone = UTC, поэтому "сегодня" и "за N часов" не
+# сдвигаются, если timezone самой БД не UTC
+_PERIOD_FILTER = "is_deleted = FALSE AND created_at >= $1 AND created_at < $2"
+
+# Единицы периода "за N ...": шаг, формы для 1, 2-4 и 5+
+_PERIOD_UNITS: dict[str, tuple[timedelta, tuple[str, str, str]]] = {
+    "час": (timedelta(hours=1), ("час", "часа", "часов")),
+    "сут": (timedelta(days=1), ("сутки", "суток", "суток")),
+    "д": (timedelta(days=1), ("день", "дня", "дней")),
+    "недел": (timedelta(weeks=1), ("неделю", "недели", "недель")),
+    "месяц": (timedelta(days=30), ("месяц", "месяца", "месяцев")),
+}
+
+_PERIOD_PATTERN = re.compile(
+    r"(?:за )?(?:(?:последн(?:ие|юю|ий|ее) )?(?P<count>\d+) )?(?:последн(?:ие|юю|ий|ее) )?"
+    r"(?P<unit>час(?:а|ов)?|сутки|суток|день|дня|дней|недел[юиь]|месяц(?:а|ев)?)"
+)
+
+
+def plural(n: int, forms: tuple[str, str, str]) -> str:
+    """Форма слова для числа (1 сообщение, 2 сообщения, 5 сообщений).
+
+    Args:
+        n: Число
+        forms: Формы для 1, 2-4 и 5+
+
+    Returns:
+        Подходящая форма
+    """
+    n = abs(n)
+    if n % 10 == 1 and n % 100 != 11:
+        return forms[0]
+    if 2 <= n % 10 <= 4 and not 12 <= n % 100 <= 14:
+        return forms[1]
+    return forms[2]
+
+
+def _number(value: float) -> str:
+    """Число с разделителем тысяч (1 234 567)."""
+    return f"{value:,}".replace(",", " ")
+
+
+@dataclass(frozen=True)
+class Period:
+    """Период вопроса.
+
+    Attributes:
+        start: Начало (UTC, включительно)
+        end: Конец (UTC, не включительно)
+        label: Период для ответа ("сегодня", "за 7 дней")
+    """
+
+    start: datetime
+    end: datetime
+    label: str
+
+
+def parse_period(text: str, now: datetime) -> Period | None:
+    """Разбор периода из конца нормализованного вопроса.
+
+    Args:
+        text: Часть вопроса после намерения ("" - за всё время)
+        now: Текущее время (UTC без зоны)
+
+    Returns:
+        Период или None, если текст не распознан
+    """
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if text in ("", "за все время", "всего"):
+        return Period(_EPOCH, now, "за всё время")
+    if text in ("сегодня", "за сегодня"):
+        return Period(today, now, "сегодня")
+    if text in ("вчера", "за вчера"):
+        return Period(today - timedelta(days=1), today, "вчера")
+
+    match = _PERIOD_PATTERN.fullmatch(text)
+    if match is None:
+        return None
+    count = int(match["count"]) if match["count"] else 1
+    if not 1 <= count <= 3650:
+        return None
+    step, forms = next(
+        unit for prefix, unit in _PERIOD_UNITS.items() if match["unit"].startswith(prefix)
+    )
+    label = f"за {count} {plural(count, forms)}" if count > 1 else f"за {forms[0]}"
+    return Period(now - step * count, now, label)
+
+
+@dataclass(frozen=True)
+class SQLTemplate:
+    """Шаблон SQL для одного намерения.
+
+    Attributes:
+        name: Имя намерения (для статистики попаданий)
+        pattern: Регулярное выражение намерения (полное совпадение с началом вопроса)
+        sql: Параметризованный SQL ($1, $2 - период, $3 - N, если в pattern есть группа limit)
+        render: Форматирование ответа по строкам результата и параметрам
+    """
+
+    name: str
+    pattern: str
+    sql: str
+    render: Callable[[list[dict[str, Any]], "TemplateMatch"], str]
+
+
+@dataclass(frozen=True)
+class TemplateMatch:
+    """Вопрос, распознанный шаблоном.
+
+    Attributes:
+        template: Шаблон
+        period: Период вопроса
+        limit: N для вопросов "топ N" (иначе None)
+    """
+
+    template: SQLTemplate
+    period: Period
+    limit: int | None = None
+
+    @property
+    def sql(self) -> str:
+        """SQL запрос шаблона."""
+        return self.template.sql
+
+    @property
+    def args(self) -> tuple[Any, ...]:
+        """Параметры SQL запроса."""
+        args: tuple[Any, ...] = (self.period.start, self.period.end)
+        return args + (self.limit,) if self.limit is not None else args
+
+    def render(self, rows: list[dict[str, Any]]) -> str:
+        """Ответ по строкам результата.
+
+        Args:
+            rows: Результаты SQL запроса
+
+        Returns:
+            Текст ответа
+        """
+        return self.template.render(rows, self)
+
+
+def _render_message_count(rows: list[dict[str, Any]], match: TemplateMatch) -> str:
+    count = rows[0]["messages"]
+    forms = ("сообщение", "сообщения", "сообщений")
+    return f"{match.period.label.capitalize()}: {_number(count)} {plural(count, forms)}."
+
+
+def _render_user_count(rows: list[dict[str, Any]], match: TemplateMatch) -> str:
+    count = rows[0]["users"]
+    forms = ("активный пользователь", "активных пользователя", "активных пользователей")
+    return f"{match.period.label.capitalize()}: {_number(count)} {plural(count, forms)}."
+
+
+def _render_top_users(rows: list[dict[str, Any]], match: TemplateMatch) -> str:
+    if not rows:
+        return f"{match.period.label.capitalize()} сообщений от пользователей нет."
+    forms = ("сообщение", "сообщения", "сообщений")
+    lines = [f"Топ-{len(rows)} пользователей по сообщениям {match.period.label}:"]
+    for place, row in enumerate(rows, start=1):
+        count = row["messages"]
+        lines.append(
+            f"{place}. {row['username']} (id {row['user_id']}) - "
+            f"{_number(count)} {plural(count, forms)}"
+        )
+    return "\n".join(lines)
+
+
+def _render_average_length(rows: list[dict[str, Any]], match: TemplateMatch) -> str:
+    row = rows[0]
+    if not row["messages"]:
+        return f"{match.period.label.capitalize()} сообщений нет."
+    length = round(float(row["avg_length"]), 1)
+    return (
+        f"Средняя длина сообщения {match.period.label}: {length:g} симв. "
+        f"(сообщений: {_number(row['messages'])})."
+    )
+
+
+def _render_activity_by_hour(rows: list[dict[str, Any]], match: TemplateMatch) -> str:
+    if not rows:
+        return f"{match.period.label.capitalize()} сообщений нет."
+    peak = max(rows, key=lambda row: row["messages"])
+    lines = [f"Сообщения по часам {match.period.label} (UTC):"]
+    lines += [f"{row['hour']:02d}:00 - {_number(row['messages'])}" for row in rows]
+    lines.append(f"Пик активности: {peak['hour']:02d}:00.")
+    return "\n".join(lines)
+
+
+# Шаблоны проверяются по порядку: более специфичные намерения раньше
+TEMPLATES = [
+    SQLTemplate(
+        name="activity_by_hour",
+        pattern=r"(?:активность|сообщения|количество сообщений|распределение сообщений) по часам",
+        sql=f"""
+            SELECT EXTRACT(HOUR FROM created_at)::int AS hour, COUNT(*) AS messages
+            FROM messages
+            WHERE {_PERIOD_FILTER}
+            GROUP BY 1
+            ORDER BY 1
+        """,
+        render=_render_activity_by_hour,
+    ),
+    SQLTemplate(
+        name="top_users",
+        pattern=(
+            r"(?:топ|top)(?:[ -]?(?P<limit>\d+))?(?: самых)?(?: активных)? пользователей"
+            r"|(?:самые активные|самых активных) пользователи"
+        ),
+        sql=f"""
+            SELECT user_id, MAX(username) AS username, COUNT(*) AS messages
+            FROM messages
+            WHERE {_PERIOD_FILTER} AND role = 'user'
+            GROUP BY user_id
+            ORDER BY messages DESC, user_id
+            LIMIT $3
+        """,
+        render=_render_top_users,
+    ),
+    SQLTemplate(
+        name="user_count",
+        pattern=(
+            r"(?:сколько|количество|число)(?: всего)?(?: активных| уникальных)? пользователей"
+            r"(?: было| писали| писало)?"
+        ),
+        sql=f"""
+            SELECT COUNT(DISTINCT user_id) AS users
+            FROM messages
+            WHERE {_PERIOD_FILTER}
+        """,
+        render=_render_user_count,
+    ),
+    SQLTemplate(
+        name="message_count",
+        pattern=(
+            r"(?:сколько|количество|число)(?: всего)? сообщений"
+            r"(?: было| написано| отправлено| написали)?"
+        ),
+        sql=f"""
+            SELECT COUNT(*) AS messages
+            FROM messages
+            WHERE {_PERIOD_FILTER}
+        """,
+        render=_render_message_count,
+    ),
+    SQLTemplate(
+        name="average_length",
+        pattern=r"(?:какая )?(?:средняя длина|средний размер) сообщени[йяе]",
+        sql=f"""
+            SELECT AVG(content_length) AS avg_length, COUNT(*) AS messages
+            FROM messages
+            WHERE {_PERIOD_FILTER}
+        """,
+        render=_render_average_length,
+    ),
+]
+
+
+@dataclass
+class TemplateStats:
+    """Счётчики попаданий в шаблоны.
+
+    Attributes:
+        hits: Попадания по именам шаблонов
+        misses: Вопросы, ушедшие в LLM
+    """
+
+    hits: Counter[str] = field(default_factory=Counter)
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля вопросов, обслуженных шаблонами (0.0 если вопросов не было)."""
+        total = self.hits.total() + self.misses
+        return self.hits.total() / total if total else 0.0
+
+
+class SQLTemplateMatcher:
+    """Распознавание частых вопросов admin режима по регулярным выражениям.
+
+    Вопрос должен целиком состоять из намерения и периода: вопросы с
+    дополнительными условиями ("сколько сообщений от пользователя 42")
+    шаблонами не обслуживаются и уходят в LLM.
+    """
+
+    def __init__(self, templates: list[SQLTemplate] | None = None):
+        """Инициализация.
+
+        Args:
+            templates: Шаблоны (по умолчанию - TEMPLATES)
+        """
+        self.templates = templates if templates is not None else TEMPLATES
+        self._patterns = [
+            (
+                template,
+                re.compile(rf"(?:покажи |выведи )?(?:{template.pattern})(?: (?P<period>.+))?"),
+            )
+            for template in self.templates
+        ]
+        self.stats = TemplateStats()
+
+    def match(self, question: str, now: datetime | None = None) -> TemplateMatch | None:
+        """Найти шаблон для вопроса.
+
+        Args:
+            question: Вопрос пользователя
+            now: Текущее время (UTC, по умолчанию - сейчас)
+
+        Returns:
+            Распознанный вопрос или None, если вопрос нужно передать LLM
+        """
+        now = now or datetime.now(UTC).replace(tzinfo=None)
+        text = normalize_question(question)
+
+        for template, pattern in self._patterns:
+            found = pattern.fullmatch(text)
+            if found is None:
+                continue
+            period = parse_period(found["period"] or "", now)
+            if period is None:
+                continue
+
+            limit = None
+            if "limit" in pattern.groupindex:
+                limit = min(int(found["limit"] or 10), MAX_TOP_USERS)
+                if limit < 1:
+                    continue
+
+            self.stats.hits[template.name] += 1
+            logger.info(f"SQL template hit: {template.name}, {period.label}")
+            return TemplateMatch(template, period, limit)
+
+        self.stats.misses += 1
+        logger.info(f"SQL template miss (hit rate {self.stats.hit_rate:.0%}): {question[:100]}")
+        return None
@@ -0,0 +1,203 @@
+"""Кэш ответов /api/stats с TTL и stale-while-revalidate."""
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+from backend.api.models import GranularityEnum, PeriodEnum, StatsResponse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class StatsQuery:
+    """Параметры запроса статистики (ключ кэша).
+
+    Attributes:
+        period: Период статистики
+        granularity: Шаг timeline
+        approximate: Приближённый режим RealStatCollector
+        start: Начало диапазона (для custom)
+        end: Конец диапазона (None - до текущего момента)
+    """
+
+    period: PeriodEnum
+    granularity: GranularityEnum = GranularityEnum.DAY
+    approximate: bool = False
+    start: datetime | None = None
+    end: datetime | None = None
+
+
+# Загрузка статистики по параметрам запроса
+StatsLoader = Callable[[StatsQuery], Awaitable[StatsResponse]]
+
+
+@dataclass
+class CachedStats:
+    """Закэшированный ответ /api/stats.
+
+    Attributes:
+        body: Сериализованный JSON ответа
+        etag: ETag ответа (хеш body)
+        created_at: Момент загрузки (по часам кэша)
+    """
+
+    body: bytes
+    etag: str
+    created_at: float
+
+
+class StatsCache:
+    """Кэш статистики по параметрам запроса (StatsQuery).
+
+    Свежий ответ (моложе ttl) отдаётся из кэша. Устаревший, но не старше
+    ttl + max_stale, тоже отдаётся сразу, а обновляется одной фоновой задачей.
+    Без ответа в кэше или со слишком старым ответом запрос ждёт загрузку;
+    параллельные запросы ждут одну и ту же загрузку, поэтому БД получает не
+    больше одного запроса статистики на ключ одновременно. Количество ключей
+    ограничено (произвольные диапазоны custom вытесняются по LRU).
+    """
+
+    def __init__(
+        self,
+        loader: StatsLoader,
+        ttl: float = 60.0,
+        max_stale: float = 600.0,
+        max_entries: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Инициализация.
+
+        Args:
+            loader: Загрузка статистики из БД
+            ttl: Время жизни ответа (секунды)
+            max_stale: Сколько секунд после ttl можно отдавать устаревший ответ
+            max_entries: Максимальное количество ключей в кэше
+            clock: Часы (для тестов)
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: OrderedDict[StatsQuery, CachedStats] = OrderedDict()
+        self._loading: dict[StatsQuery, asyncio.Task[CachedStats]] = {}
+
+    def age(self, entry: CachedStats) -> float:
+        """Возраст ответа в секундах.
+
+        Args:
+            entry: Закэшированный ответ
+
+        Returns:
+            Секунды с момента загрузки
+        """
+        return max(0.0, self.clock() - entry.created_at)
+
+    async def get(self, key: StatsQuery) -> CachedStats:
+        """Получить ответ из кэша (или дождаться загрузки).
+
+        Args:
+            key: Параметры запроса статистики
+
+        Returns:
+            Закэшированный ответ
+
+        Raises:
+            Exception: Ошибка загрузки, если в кэше нет пригодного ответа
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = self.age(entry)
+            if age < self.ttl:
+                return entry
+            if age < self.ttl + self.max_stale:
+                self._load(key)
+                return entry
+
+        # shield: отмена запроса клиента не отменяет общую загрузку
+        return await asyncio.shield(self._load(key))
+
+    def _load(self, key: StatsQuery) -> asyncio.Task[CachedStats]:
+        """Запустить загрузку ключа, если она ещё не идёт.
+
+        Args:
+            key: Параметры запроса статистики
+
+        Returns:
+            Задача загрузки
+        """
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key))
+            self._loading[key] = task
+            task.add_done_callback(lambda t: self._on_loaded(key, t))
+        return task
+
+    async def _fetch(self, key: StatsQuery) -> CachedStats:
+        """Загрузка и сериализация статистики.
+
+        Args:
+            key: Параметры запроса статистики
+
+        Returns:
+            Новый ответ для кэша
+        """
+        response = await self.loader(key)
+        body = response.model_dump_json().encode()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        return CachedStats(body=body, etag=etag, created_at=self.clock())
+
+    def _on_loaded(self, key: StatsQuery, task: asyncio.Task[CachedStats]) -> None:
+        """Сохранение результата загрузки в кэш.
+
+        При ошибке в кэше остаётся прежний ответ (если он есть).
+
+        Args:
+            key: Параметры запроса статистики
+            task: Завершённая задача загрузки
+        """
+        self._loading.pop(key, None)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            logger.error(f"Stats refresh failed for {key}: {error}")
+            return
+        self._entries[key] = task.result()
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def close(self) -> None:
+        """Отмена незавершённых загрузок."""
+        tasks = list(self._loading.values())
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(BaseException):
+                await task
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Проверка If-None-Match (слабое сравнение, RFC 9110).
+
+    Args:
+        if_none_match: Значение заголовка If-None-Match
+        etag: Текущий ETag ответа
+
+    Returns:
+        True, если клиент уже имеет этот ответ
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
@@ -23,7 +23,8 @@ const getApiUrl = () => {
 export async function getStats(period: Period = '7d'): Promise<StatsResponse> {
   const apiUrl = getApiUrl();
   const response = await fetch(`${apiUrl}/api/stats?period=${period}`, {
-    cache: 'no-store', // Для серверного рендеринга без кеширования
+    // SSR - без кеширования; в браузере - повторная проверка по ETag (304 Not Modified)
+    cache: typeof window === 'undefined' ? 'no-store' : 'no-cache',
   });
 
   if (!response.ok) {
@@ -32,13 +32,16 @@ export function formatChange(value: number): string {
 
 /**
  * Форматирование даты для графика в зависимости от периода
- * @param date - Дата в формате ISO (YYYY-MM-DD)
+ * @param date - Дата в формате ISO (YYYY-MM-DD или YYYY-MM-DDTHH:00, UTC)
  * @param period - Период статистики
  */
 export function formatChartDate(date: string, period: Period): string {
   const d = new Date(date);
   
-  if (period === '7d') {
+  if (date.includes('T')) {
+    // Для timeline по часам: время (14:00)
+    return d.toLocaleTimeString('ru-RU', { hour: '2-digit', minute: '2-digit' });
+  } else if (period === '7d') {
     // Для недели: короткий день недели + число (Пн 12)
     return d.toLocaleDateString('ru-RU', { weekday: 'short', day: 'numeric' });
   } else if (period === '30d') {
@@ -3,7 +3,8 @@
  * Источник: backend/api/models.py
  */
 
-export type Period = '7d' | '30d' | '3m';
+export type Period = '24h' | '48h' | '7d' | '30d' | '3m' | 'custom';
+export type Granularity = 'hour' | 'day';
 export type Trend = 'up' | 'down' | 'steady';
 
 export interface MetricCard {
@@ -14,7 +15,7 @@ export interface MetricCard {
 }
 
 export interface TimelinePoint {
-  date: string; // Формат: YYYY-MM-DD
+  date: string; // Формат: YYYY-MM-DD (day) или YYYY-MM-DDTHH:00 (hour)
   total_messages: number;
   active_users: number;
 }
@@ -30,6 +31,8 @@ export interface StatsResponse {
   period: Period;
   metrics: MetricsData;
   timeline: TimelinePoint[];
+  approximate?: boolean;
+  granularity?: Granularity;
 }
 
 // Типы для Chat API
@@ -0,0 +1,17 @@
+-- Cached token count per message for token-budgeted history windowing
+-- Migration: 002_add_token_count
+
+-- NULL for messages saved before this migration (estimated on read).
+-- Migrations rerun on every start: ALTER TABLE takes an ACCESS EXCLUSIVE lock
+-- even with IF NOT EXISTS, so it only runs while the column is missing
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name = 'messages' AND column_name = 'token_count'
+    ) THEN
+        ALTER TABLE messages ADD COLUMN token_count INTEGER;
+    END IF;
+END
+$$;
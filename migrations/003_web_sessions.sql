@@ -0,0 +1,13 @@
+-- Stable mapping of web chat sessions to chat_id
+-- Migration: 003_web_sessions
+
+-- Web chat_ids are allocated from a sequence in a negative range far below
+-- Telegram chat ids (|id| < 2^52), so they never collide with bot dialogs
+CREATE SEQUENCE IF NOT EXISTS web_session_chat_id_seq;
+
+CREATE TABLE IF NOT EXISTS web_sessions (
+    session_id VARCHAR(255) PRIMARY KEY,
+    chat_id BIGINT NOT NULL UNIQUE
+        DEFAULT -(1000000000000000000 + nextval('web_session_chat_id_seq')),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,19 @@
+-- Daily rollup of messages for dashboard statistics
+-- Migration: 004_message_daily_rollup
+
+-- Per-day message counts per dialog: per-day distinct users and dialogs
+-- are the sets of (user_id) and (chat_id, user_id) of the day's rows
+CREATE TABLE IF NOT EXISTS message_daily_rollup (
+    day DATE NOT NULL,
+    chat_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    messages INTEGER NOT NULL,
+    PRIMARY KEY (day, chat_id, user_id)
+);
+
+-- Closed days already aggregated into message_daily_rollup
+-- (days without messages have no rollup rows but are still covered)
+CREATE TABLE IF NOT EXISTS message_rollup_days (
+    day DATE PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,14 @@
+-- Per-day totals and HyperLogLog sketches for approximate dashboard statistics
+-- Migration: 005_message_daily_stats
+
+-- Maintained together with message_daily_rollup for closed days.
+-- users_hll / dialogs_hll: HyperLogLog registers of user_id and (chat_id, user_id)
+-- (backend/api/hll.py), merged across days for approximate distinct counts
+CREATE TABLE IF NOT EXISTS message_daily_stats (
+    day DATE PRIMARY KEY,
+    messages BIGINT NOT NULL,
+    active_users INTEGER NOT NULL,
+    total_dialogs INTEGER NOT NULL,
+    users_hll BYTEA NOT NULL,
+    dialogs_hll BYTEA NOT NULL
+);
@@ -0,0 +1,9 @@
+-- Per-hour totals for hourly dashboard timelines
+-- Migration: 006_message_hourly_stats
+
+-- Maintained together with message_daily_stats for closed days
+CREATE TABLE IF NOT EXISTS message_hourly_stats (
+    hour TIMESTAMP PRIMARY KEY,
+    messages BIGINT NOT NULL,
+    active_users INTEGER NOT NULL
+);
@@ -0,0 +1,30 @@
+-- Table and column descriptions for the admin text-to-SQL schema catalog
+-- Migration: 007_schema_comments
+
+-- backend/api/schema_catalog.py renders these comments into the SQL generation prompt
+COMMENT ON TABLE messages IS 'Сообщения диалогов (бот и веб-чат). Для данных за сегодня и произвольных условий';
+COMMENT ON COLUMN messages.user_id IS 'Telegram user ID';
+COMMENT ON COLUMN messages.chat_id IS 'Telegram chat ID (отрицательные - сессии веб-чата)';
+COMMENT ON COLUMN messages.role IS '''user'' или ''assistant''';
+COMMENT ON COLUMN messages.content IS 'Текст сообщения';
+COMMENT ON COLUMN messages.content_length IS 'Длина сообщения в символах';
+COMMENT ON COLUMN messages.username IS 'Имя пользователя';
+COMMENT ON COLUMN messages.created_at IS 'Время создания (UTC)';
+COMMENT ON COLUMN messages.is_deleted IS 'Флаг удаления: учитывай is_deleted = FALSE';
+COMMENT ON COLUMN messages.token_count IS 'Оценка токенов (NULL для старых сообщений)';
+
+COMMENT ON TABLE web_sessions IS 'Сессии веб-чата и их chat_id';
+
+COMMENT ON TABLE message_daily_rollup IS
+    'Сообщения по дням, диалогам и пользователям (только закрытые дни, включая удалённые)';
+COMMENT ON TABLE message_rollup_days IS 'Служебная: дни, уже агрегированные в rollup таблицы';
+
+COMMENT ON TABLE message_daily_stats IS
+    'Итоги по дням (только закрытые дни, включая удалённые): быстрее messages для периодов до вчера';
+COMMENT ON COLUMN message_daily_stats.active_users IS 'Уникальные пользователи дня';
+COMMENT ON COLUMN message_daily_stats.total_dialogs IS 'Уникальные пары (chat_id, user_id) дня';
+
+COMMENT ON TABLE message_hourly_stats IS
+    'Итоги по часам (только закрытые дни, включая удалённые): быстрее messages для почасовой активности';
+COMMENT ON COLUMN message_hourly_stats.hour IS 'Начало часа (UTC)';
+COMMENT ON COLUMN message_hourly_stats.active_users IS 'Уникальные пользователи часа';
@@ -0,0 +1,24 @@
+-- Read-only role for admin text-to-SQL queries
+-- Migration: 008_sql_reader_role
+
+-- backend/api/sql_sandbox.py runs generated SQL under this role (SET LOCAL ROLE):
+-- SELECT only on messages and the stats tables (SQLSandbox ALLOWED_TABLES), so
+-- web_sessions and other tables stay unreadable even through functions that run
+-- SQL. The sandbox login (SQL_SANDBOX_USER) should be a member of this role only.
+-- Skipped with a notice if the migrating user cannot create roles; the sandbox
+-- then falls back to its EXPLAIN table check.
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'aidd_sql_reader') THEN
+        CREATE ROLE aidd_sql_reader NOLOGIN;
+    END IF;
+    GRANT USAGE ON SCHEMA public TO aidd_sql_reader;
+    GRANT SELECT ON messages, message_daily_rollup, message_daily_stats, message_hourly_stats
+        TO aidd_sql_reader;
+    IF NOT pg_has_role(current_user, 'aidd_sql_reader', 'MEMBER') THEN
+        EXECUTE format('GRANT aidd_sql_reader TO %I', current_user);
+    END IF;
+EXCEPTION WHEN insufficient_privilege THEN
+    RAISE NOTICE 'Role aidd_sql_reader not configured: %', SQLERRM;
+END
+$$;
@@ -0,0 +1,12 @@
+-- Index on messages.created_at for dashboard statistics
+-- Migration: 009_messages_created_at_index
+
+-- Range scans of raw rows for today and period boundaries. Built CONCURRENTLY
+-- so the bot keeps writing messages while it is created on a large table.
+-- CONCURRENTLY cannot run inside a transaction block, so this file must stay a
+-- single statement (Database.init_db runs each file as one simple query).
+-- If the build is interrupted, PostgreSQL leaves an INVALID index that
+-- IF NOT EXISTS skips: drop it (DROP INDEX CONCURRENTLY idx_messages_created_at)
+-- and restart to rebuild.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_messages_created_at
+ON messages (created_at);
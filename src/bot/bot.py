@@ -1,10 +1,13 @@
 """Инициализация и запуск Telegram бота."""
 
+import asyncio
 import logging
 
 from aiogram import Bot, Dispatcher, Router
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 
 from src.config import Config
 
@@ -39,3 +42,65 @@ async def start_polling(bot: Bot, dp: Dispatcher) -> None:
     """
     logger.info("Starting bot polling...")
     await dp.start_polling(bot)
+
+
+def create_webhook_app(bot: Bot, dp: Dispatcher, path: str, secret_token: str) -> web.Application:
+    """Создает aiohttp приложение, принимающее обновления Telegram через webhook.
+
+    Запрос с неверным заголовком X-Telegram-Bot-Api-Secret-Token отклоняется
+    (401). На корректный запрос сразу возвращается 200, а обновление
+    обрабатывается диспетчером в фоновой задаче, чтобы Telegram не ждал ответа LLM.
+
+    Args:
+        bot: Экземпляр бота
+        dp: Экземпляр диспетчера
+        path: Путь webhook (например "/telegram/webhook")
+        secret_token: Секрет, переданный Telegram при setWebhook
+
+    Returns:
+        aiohttp приложение
+    """
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp, bot=bot, handle_in_background=True, secret_token=secret_token
+    ).register(app, path=path)
+    # Startup/shutdown диспетчера и закрытие сессии бота вместе с приложением
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def start_webhook(bot: Bot, dp: Dispatcher, config: Config) -> None:
+    """Запускает webhook режим бота: HTTP сервер и регистрация webhook в Telegram.
+
+    Args:
+        bot: Экземпляр бота
+        dp: Экземпляр диспетчера
+        config: Объект конфигурации (webhook_url, webhook_path, webhook_secret,
+            webhook_host, webhook_port)
+
+    Raises:
+        ValueError: Если не заданы webhook_url или webhook_secret
+    """
+    if not config.webhook_url or not config.webhook_secret:
+        raise ValueError("WEBHOOK_URL and WEBHOOK_SECRET are required in webhook mode")
+
+    app = create_webhook_app(bot, dp, config.webhook_path, config.webhook_secret)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=config.webhook_host, port=config.webhook_port)
+    await site.start()
+    logger.info(
+        f"Webhook server listening on {config.webhook_host}:{config.webhook_port}"
+        f"{config.webhook_path}"
+    )
+
+    try:
+        await bot.set_webhook(
+            url=config.webhook_url.rstrip("/") + config.webhook_path,
+            secret_token=config.webhook_secret,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logger.info("Webhook registered in Telegram, waiting for updates...")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,56 @@
+"""Фоновый индикатор "печатает..." на время подготовки ответа."""
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import AsyncIterator
+
+from aiogram import Bot
+from aiogram.enums import ChatAction
+
+logger = logging.getLogger(__name__)
+
+
+@contextlib.asynccontextmanager
+async def typing_heartbeat(bot: Bot | None, chat_id: int, interval: float) -> AsyncIterator[None]:
+    """Показывать индикатор "печатает..." в фоне, пока выполняется блок.
+
+    Telegram сбрасывает индикатор примерно через 5 секунд, поэтому он
+    обновляется каждые interval секунд. Запросы к Telegram выполняются в
+    фоновой задаче и не задерживают загрузку истории и запрос к LLM;
+    ошибки индикатора только логируются.
+
+    Args:
+        bot: Экземпляр бота (None - индикатор не показывается)
+        chat_id: ID чата
+        interval: Интервал обновления индикатора (секунды)
+    """
+    if bot is None:
+        yield
+        return
+
+    task = asyncio.create_task(_send_typing(bot, chat_id, interval))
+    # Даём задаче отправить первый запрос, не дожидаясь ответа Telegram
+    await asyncio.sleep(0)
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+async def _send_typing(bot: Bot, chat_id: int, interval: float) -> None:
+    """Периодическая отправка ChatAction.TYPING до отмены задачи.
+
+    Args:
+        bot: Экземпляр бота
+        chat_id: ID чата
+        interval: Интервал обновления индикатора (секунды)
+    """
+    while True:
+        try:
+            await bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
+        except Exception as e:
+            logger.debug(f"Typing indicator failed for chat_id={chat_id}: {e}")
+        await asyncio.sleep(interval)
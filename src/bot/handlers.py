@@ -1,19 +1,26 @@
 """Обработчики команд и сообщений бота."""
 
 import logging
+from dataclasses import dataclass, field
 
 from aiogram import Router
-from aiogram.enums import ChatAction
 from aiogram.filters import Command
 from aiogram.types import Message as TelegramMessage
 
+from src.bot.chat_action import typing_heartbeat
+from src.bot.streaming import StreamingReply
 from src.config import Config
+from src.llm.admission import LLMBusyError
 from src.llm.protocols import LLMClientProtocol
 from src.storage.models import Message
 from src.storage.protocols import DatabaseProtocol
 
 logger = logging.getLogger(__name__)
 
+PLACEHOLDER_TEXT = "💭 Думаю..."
+
+BUSY_TEXT = "⏳ Ой, сейчас очень много вопросов! Подожди минутку и спроси ещё раз 🙏"
+
 ROLE_TEXT = """👋 <b>Привет! Я Знайкин!</b>
 
 Я помогаю детям узнавать новое. 😊
@@ -34,6 +41,42 @@ ROLE_TEXT = """👋 <b>Привет! Я Знайкин!</b>
 Задавай любые вопросы! 🌟"""
 
 
+@dataclass
+class _DialogTurn:
+    """Состояние диалога с ответом в процессе.
+
+    Attributes:
+        pending: Сообщения, ожидающие следующего хода
+        busy: Идёт обработка хода
+    """
+
+    pending: list[TelegramMessage] = field(default_factory=list)
+    busy: bool = False
+
+
+def _user_message(message: TelegramMessage, chat_id: int, user_id: int, username: str) -> Message:
+    """Сообщение пользователя для сохранения в БД.
+
+    Args:
+        message: Входящее сообщение Telegram (с текстом)
+        chat_id: ID чата
+        user_id: ID пользователя
+        username: Имя пользователя
+
+    Returns:
+        Модель сообщения
+    """
+    text = message.text or ""
+    return Message(
+        user_id=user_id,
+        chat_id=chat_id,
+        role="user",
+        content=text,
+        content_length=len(text),
+        username=username,
+    )
+
+
 class BotHandlers:
     """Обработчики команд и сообщений бота с dependency injection.
 
@@ -58,6 +101,8 @@ class BotHandlers:
         self.database = database
         self.config = config
         self.router = Router()
+        # Состояние ходов по диалогам (chat_id, user_id), для которых идёт ответ
+        self._turns: dict[tuple[int, int], _DialogTurn] = {}
         self._register_handlers()
         logger.info("BotHandlers initialized with dependencies")
 
@@ -119,6 +164,10 @@ class BotHandlers:
     async def handle_message(self, message: TelegramMessage) -> None:
         """Обработчик текстовых сообщений.
 
+        Ходы диалога (chat_id, user_id) выполняются строго по очереди:
+        сообщения, пришедшие во время ответа, копятся и обрабатываются
+        одним следующим запросом к LLM в задаче текущего обработчика.
+
         Args:
             message: Входящее сообщение от пользователя
         """
@@ -128,57 +177,112 @@ class BotHandlers:
 
         user_id = message.from_user.id
         chat_id = message.chat.id
+        username = message.from_user.username or str(user_id)
 
         logger.info(
             f"Received message from user_id={user_id}, "
             f"chat_id={chat_id}, length={len(message.text)}"
         )
 
-        try:
-            # 1. Сохраняем сообщение пользователя
-            username = message.from_user.username or str(user_id)
-            
-            user_message = Message(
-                user_id=user_id,
-                chat_id=chat_id,
-                role="user",
-                content=message.text,
-                content_length=len(message.text),
-                username=username,
-            )
-            await self.database.save_message(user_message)
-
-            # 2. Загружаем историю диалога
-            history = await self.database.get_history(
-                chat_id=chat_id, user_id=user_id, limit=self.config.max_history_messages
+        key = (chat_id, user_id)
+        turn = self._turns.setdefault(key, _DialogTurn())
+        turn.pending.append(message)
+        if turn.busy:
+            # Ответ уже готовится - сообщение войдёт в следующий ход
+            logger.info(
+                f"Turn in flight for chat_id={chat_id}, coalescing (pending={len(turn.pending)})"
             )
+            return
 
-            # Показываем индикатор "печатает..."
-            if message.bot:
-                await message.bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
+        turn.busy = True
+        try:
+            while turn.pending:
+                batch, turn.pending = turn.pending, []
+                await self._process_turn(batch, chat_id, user_id, username)
+        finally:
+            turn.busy = False
+            if not turn.pending:
+                self._turns.pop(key, None)
+
+    async def _process_turn(
+        self, messages: list[TelegramMessage], chat_id: int, user_id: int, username: str
+    ) -> None:
+        """Один ход диалога: сохранить сообщения пользователя и ответить на них.
 
-            # 3. Получаем ответ от LLM с историей
-            response = await self.llm_client.get_response(
-                messages=history, system_prompt=self.config.system_prompt
-            )
+        Args:
+            messages: Сообщения пользователя, накопленные к началу хода (непустой список)
+            chat_id: ID чата
+            user_id: ID пользователя
+            username: Имя пользователя
+        """
+        message = messages[-1]
 
-            # 4. Сохраняем ответ ассистента
-            assistant_message = Message(
-                user_id=user_id,
-                chat_id=chat_id,
-                role="assistant",
-                content=response,
-                content_length=len(response),
-                username="bot",
-            )
-            await self.database.save_message(assistant_message)
+        if len(messages) > 1:
+            logger.info(f"Coalesced {len(messages)} messages into one turn for chat_id={chat_id}")
 
-            # 5. Отправляем ответ пользователю
-            await message.answer(response)
-            logger.info(f"Response sent to user_id={user_id}")
+        reply: StreamingReply | None = None
+        try:
+            # Индикатор "печатает..." в фоне - параллельно с БД и запросом к LLM
+            async with typing_heartbeat(
+                message.bot, chat_id, self.config.typing_heartbeat_interval
+            ):
+                # 1-2. Сохраняем сообщения пользователя и загружаем историю
+                # (последнее сообщение хода - одним round-trip с загрузкой истории)
+                for earlier in messages[:-1]:
+                    await self.database.save_message(
+                        _user_message(earlier, chat_id, user_id, username)
+                    )
+
+                user_message = _user_message(message, chat_id, user_id, username)
+                history = await self.database.append_and_get_history(
+                    user_message,
+                    limit=self.config.max_history_messages,
+                    max_tokens=self.config.history_token_budget,
+                )
+
+                # 3. Получаем ответ от LLM потоком и показываем его по мере генерации
+                placeholder = await message.answer(PLACEHOLDER_TEXT, parse_mode=None)
+                reply = StreamingReply(
+                    placeholder,
+                    min_interval=self.config.stream_edit_interval_ms / 1000,
+                    min_chars=self.config.stream_edit_min_chars,
+                )
+
+                stream = self.llm_client.stream_response(
+                    messages=history, system_prompt=self.config.system_prompt, chat_id=chat_id
+                )
+                async for _ in stream:
+                    await reply.update(stream.text)
+                response = stream.text
+
+                # 4. Сохраняем ответ ассистента (один раз, целиком)
+                assistant_message = Message(
+                    user_id=user_id,
+                    chat_id=chat_id,
+                    role="assistant",
+                    content=response,
+                    content_length=len(response),
+                    username="bot",
+                )
+                await self.database.save_message(assistant_message)
+
+                # 5. Показываем финальный ответ пользователю
+                await reply.finish(response)
+                logger.info(
+                    f"Response sent to user_id={user_id}, "
+                    f"ttft={stream.time_to_first_token:.3f}s, edits={reply.edits}"
+                )
+
+        except LLMBusyError:
+            logger.warning(f"LLM busy, rejected message from user_id={user_id}")
+            if reply is not None:
+                await reply.discard()
+            await message.answer(BUSY_TEXT, parse_mode=None)
 
         except Exception as e:
             logger.error(f"Error processing message: {e}")
+            if reply is not None:
+                await reply.discard()
             await message.answer(
                 "Упс! 😅 Что-то пошло не так. Попробуй еще раз, пожалуйста!"
             )
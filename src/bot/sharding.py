@@ -0,0 +1,445 @@
+"""Шардирование обновлений Telegram по процессам-воркерам по chat_id."""
+
+import asyncio
+import hmac
+import logging
+import multiprocessing
+import time
+from collections import deque
+from collections.abc import Callable
+from multiprocessing.process import BaseProcess
+from typing import Any, Protocol
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Update
+from aiohttp import web
+
+from src.bot.bot import create_bot
+from src.bot.handlers import BotHandlers
+from src.config import Config
+from src.llm.client import LLMClient
+from src.storage.database import Database
+from src.storage.history_cache import HistoryCache
+
+logger = logging.getLogger(__name__)
+
+# Сигнал воркеру о завершении
+_STOP = None
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class UpdateQueue(Protocol):
+    """Очередь обновлений между ingress и воркером (multiprocessing.Queue)."""
+
+    def put(self, item: str | None) -> None:
+        """Положить сериализованное обновление (None - завершение)."""
+        ...
+
+    def get(self) -> str | None:
+        """Дождаться следующего обновления."""
+        ...
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash (Lamping, Veach).
+
+    При увеличении числа воркеров с N до N+1 переезжает только ~1/(N+1) ключей.
+
+    Args:
+        key: Ключ (chat_id, может быть отрицательным)
+        buckets: Количество воркеров
+
+    Returns:
+        Номер воркера в диапазоне [0, buckets)
+    """
+    key &= 0xFFFFFFFFFFFFFFFF
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def update_chat_id(update: Update) -> int:
+    """Ключ шардирования обновления: ID чата (или пользователя, если чата нет).
+
+    Args:
+        update: Обновление Telegram
+
+    Returns:
+        chat_id (0 для обновлений без чата и пользователя)
+    """
+    try:
+        event = update.event
+    except Exception:
+        return 0
+
+    chat = getattr(event, "chat", None)
+    if chat is None:
+        message = getattr(event, "message", None)
+        chat = getattr(message, "chat", None)
+    if chat is not None:
+        return int(chat.id)
+
+    user = getattr(event, "from_user", None)
+    return int(user.id) if user is not None else 0
+
+
+class UpdateSharder:
+    """Распределение обновлений по очередям воркеров.
+
+    Все обновления одного чата попадают в одну очередь в порядке получения,
+    поэтому порядок сообщений чата сохраняется, а его состояние (ходы
+    диалога, кэш истории) живёт в памяти одного воркера.
+    """
+
+    def __init__(self, queues: list[UpdateQueue]):
+        """Инициализация распределителя.
+
+        Args:
+            queues: Очереди воркеров (индекс - номер воркера)
+        """
+        self.queues = queues
+
+    def dispatch(self, update: Update) -> int:
+        """Отправить обновление воркеру его чата.
+
+        Args:
+            update: Обновление Telegram
+
+        Returns:
+            Номер воркера
+        """
+        shard = jump_hash(update_chat_id(update), len(self.queues))
+        self.queues[shard].put(update.model_dump_json(exclude_unset=True))
+        return shard
+
+
+async def poll_updates(bot: Bot, sharder: UpdateSharder, allowed_updates: list[str]) -> None:
+    """Ingress в режиме long polling: getUpdates и раздача обновлений воркерам.
+
+    Args:
+        bot: Экземпляр бота
+        sharder: Распределитель обновлений
+        allowed_updates: Типы обновлений, которые обрабатывают воркеры
+    """
+    await bot.delete_webhook()
+    offset: int | None = None
+    logger.info("Sharded polling ingress started")
+    while True:
+        try:
+            updates = await bot.get_updates(
+                offset=offset, timeout=30, allowed_updates=allowed_updates
+            )
+        except Exception as e:
+            logger.error(f"getUpdates failed: {e}")
+            await asyncio.sleep(1)
+            continue
+
+        for update in updates:
+            sharder.dispatch(update)
+            offset = update.update_id + 1
+
+
+def create_ingress_app(sharder: UpdateSharder, path: str, secret_token: str) -> web.Application:
+    """Ingress в режиме webhook: aiohttp приложение, раздающее обновления воркерам.
+
+    Args:
+        sharder: Распределитель обновлений
+        path: Путь webhook
+        secret_token: Секрет X-Telegram-Bot-Api-Secret-Token
+
+    Returns:
+        aiohttp приложение
+    """
+
+    async def handle(request: web.Request) -> web.Response:
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret_token):
+            return web.Response(status=401, text="Unauthorized")
+        update = Update.model_validate(await request.json())
+        sharder.dispatch(update)
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_post(path, handle)
+    return app
+
+
+def resolve_allowed_updates(router: Router) -> list[str]:
+    """Типы обновлений, на которые подписаны handlers воркеров.
+
+    Ingress сам не обрабатывает обновления, поэтому типы берутся из
+    Dispatcher с тем же router, что и у воркеров: новый тип обновлений в
+    BotHandlers не теряется в режиме шардирования.
+
+    Args:
+        router: Router с зарегистрированными handlers
+
+    Returns:
+        Типы обновлений для getUpdates / setWebhook
+    """
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp.resolve_used_update_types()
+
+
+class WorkerSupervisor:
+    """Наблюдение за процессами-воркерами.
+
+    Упавший воркер (ошибка подключения к БД, необработанное исключение)
+    перезапускается на той же очереди, иначе обновления его чатов копились бы
+    в очереди без ответа. Если воркер падает больше max_restarts раз за
+    restart_window секунд, supervisor завершается с ошибкой, и процесс бота
+    перезапускает оркестратор.
+    """
+
+    def __init__(
+        self,
+        start_worker: Callable[[int], BaseProcess],
+        count: int,
+        max_restarts: int = 5,
+        restart_window: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Инициализация и запуск воркеров.
+
+        Args:
+            start_worker: Запуск воркера с номером (возвращает запущенный процесс)
+            count: Количество воркеров
+            max_restarts: Допустимое количество перезапусков воркера за restart_window
+            restart_window: Окно подсчёта перезапусков (секунды)
+            clock: Часы (для тестов)
+        """
+        self.start_worker = start_worker
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.clock = clock
+        self.workers = [start_worker(i) for i in range(count)]
+        self._restarts: list[deque[float]] = [deque() for _ in range(count)]
+
+    def check(self) -> list[int]:
+        """Перезапустить упавшие воркеры.
+
+        Returns:
+            Номера перезапущенных воркеров
+
+        Raises:
+            RuntimeError: Если воркер падает слишком часто
+        """
+        restarted = []
+        now = self.clock()
+        for index, worker in enumerate(self.workers):
+            if worker.is_alive():
+                continue
+
+            restarts = self._restarts[index]
+            while restarts and now - restarts[0] > self.restart_window:
+                restarts.popleft()
+            if len(restarts) >= self.max_restarts:
+                raise RuntimeError(
+                    f"Bot worker {index} crashed {len(restarts) + 1} times "
+                    f"in {self.restart_window:.0f}s (exit code {worker.exitcode})"
+                )
+
+            logger.error(f"Bot worker {index} died (exit code {worker.exitcode}), restarting")
+            restarts.append(now)
+            self.workers[index] = self.start_worker(index)
+            restarted.append(index)
+        return restarted
+
+    async def watch(self, interval: float = 1.0) -> None:
+        """Фоновая проверка воркеров.
+
+        Args:
+            interval: Интервал проверки (секунды)
+
+        Raises:
+            RuntimeError: Если воркер падает слишком часто
+        """
+        while True:
+            self.check()
+            await asyncio.sleep(interval)
+
+
+async def consume_updates(queue: UpdateQueue, bot: Bot, dp: Dispatcher) -> None:
+    """Цикл воркера: чтение обновлений из очереди и передача их диспетчеру.
+
+    Каждое обновление обрабатывается в отдельной задаче (чаты воркера не
+    ждут друг друга); задачи создаются в порядке очереди, поэтому сообщения
+    одного чата доходят до BotHandlers в порядке получения.
+
+    Args:
+        queue: Очередь воркера
+        bot: Экземпляр бота
+        dp: Экземпляр диспетчера
+    """
+    loop = asyncio.get_running_loop()
+    tasks: set[asyncio.Task[Any]] = set()
+    while True:
+        raw = await loop.run_in_executor(None, queue.get)
+        if raw is _STOP:
+            break
+        update = Update.model_validate_json(raw, context={"bot": bot})
+        task = asyncio.create_task(dp.feed_update(bot, update))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _create_database(config: Config) -> Database:
+    """Создание Database воркера (собственный пул соединений и кэш истории).
+
+    Args:
+        config: Объект конфигурации
+
+    Returns:
+        Неподключенный экземпляр Database
+    """
+    history_cache = (
+        HistoryCache(
+            max_dialogs=config.history_cache_dialogs,
+            max_messages=config.max_history_messages,
+        )
+        if config.history_cache_dialogs > 0
+        else None
+    )
+    return Database(
+        host=config.postgres_host,
+        port=config.postgres_port,
+        database=config.postgres_db,
+        user=config.postgres_user,
+        password=config.postgres_password,
+        write_behind=config.db_write_behind,
+        flush_batch_size=config.db_flush_batch_size,
+        flush_interval=config.db_flush_interval,
+        history_cache=history_cache,
+    )
+
+
+async def _worker_main(index: int, queue: UpdateQueue, config: Config) -> None:
+    """Воркер: собственные пул БД, LLM клиент и handlers.
+
+    Миграции применяются в процессе ingress до запуска воркеров,
+    поэтому воркер только подключается к БД.
+
+    Args:
+        index: Номер воркера
+        queue: Очередь обновлений воркера
+        config: Объект конфигурации
+    """
+    database = _create_database(config)
+    await database.connect()
+    try:
+        bot_handlers = BotHandlers(LLMClient(config), database, config)
+        bot, dp = create_bot(config, bot_handlers.router)
+        logger.info(f"Worker {index} ready")
+        try:
+            await consume_updates(queue, bot, dp)
+        finally:
+            await bot.session.close()
+    finally:
+        await database.close()
+    logger.info(f"Worker {index} stopped")
+
+
+def _run_worker(index: int, queue: UpdateQueue, config: Config) -> None:
+    """Точка входа процесса-воркера.
+
+    Args:
+        index: Номер воркера
+        queue: Очередь обновлений воркера
+        config: Объект конфигурации
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s - worker{index} - %(name)s - %(levelname)s - %(message)s",
+    )
+    asyncio.run(_worker_main(index, queue, config))
+
+
+async def run_sharded(config: Config) -> None:
+    """Запуск бота с шардированием: ingress в текущем процессе и bot_workers воркеров.
+
+    Ingress (polling или webhook, по config.bot_mode) получает обновления и
+    раздаёт их воркерам по consistent hash от chat_id через multiprocessing.Queue.
+    Упавшие воркеры перезапускает WorkerSupervisor.
+
+    Args:
+        config: Объект конфигурации
+
+    Raises:
+        ValueError: Если в режиме webhook не заданы webhook_url или webhook_secret
+        RuntimeError: Если воркер падает слишком часто (процесс нужно перезапустить)
+    """
+    if config.bot_mode == "webhook" and (not config.webhook_url or not config.webhook_secret):
+        raise ValueError("WEBHOOK_URL and WEBHOOK_SECRET are required in webhook mode")
+
+    # Миграции один раз до запуска воркеров (параллельный DDL из воркеров конфликтует)
+    async with _create_database(config):
+        logger.info("Database migrations applied")
+
+    ctx = multiprocessing.get_context("spawn")
+    queues = [ctx.Queue() for _ in range(config.bot_workers)]
+
+    def start_worker(index: int) -> BaseProcess:
+        worker = ctx.Process(
+            target=_run_worker,
+            args=(index, queues[index], config),
+            name=f"bot-worker-{index}",
+            daemon=True,
+        )
+        worker.start()
+        return worker
+
+    supervisor = WorkerSupervisor(start_worker, config.bot_workers)
+    logger.info(f"Started {len(supervisor.workers)} bot workers")
+
+    sharder = UpdateSharder(queues)  # type: ignore[arg-type]
+    # Ingress только получает обновления (getUpdates / setWebhook)
+    bot = Bot(token=config.telegram_bot_token)
+    # Типы обновлений - по тем же handlers, что у воркеров
+    allowed_updates = resolve_allowed_updates(
+        BotHandlers(LLMClient(config), _create_database(config), config).router
+    )
+
+    async def ingress() -> None:
+        if config.bot_mode == "webhook":
+            app = create_ingress_app(sharder, config.webhook_path, config.webhook_secret)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            await web.TCPSite(runner, host=config.webhook_host, port=config.webhook_port).start()
+            try:
+                await bot.set_webhook(
+                    url=config.webhook_url.rstrip("/") + config.webhook_path,
+                    secret_token=config.webhook_secret,
+                    allowed_updates=allowed_updates,
+                )
+                logger.info("Sharded webhook ingress started")
+                await asyncio.Event().wait()
+            finally:
+                await runner.cleanup()
+        else:
+            await poll_updates(bot, sharder, allowed_updates)
+
+    tasks = [asyncio.create_task(ingress()), asyncio.create_task(supervisor.watch())]
+    try:
+        # Ingress работает до остановки; supervisor завершается только с ошибкой
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for queue in queues:
+            queue.put(_STOP)
+        for worker in supervisor.workers:
+            await asyncio.to_thread(worker.join, 30)
+            if worker.is_alive():
+                worker.terminate()
+        await bot.session.close()
+        logger.info("All bot workers stopped")
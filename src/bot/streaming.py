@@ -0,0 +1,122 @@
+"""Прогрессивная доставка ответа в Telegram через редактирование сообщения."""
+
+import asyncio
+import logging
+import time
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message as TelegramMessage
+
+logger = logging.getLogger(__name__)
+
+# Максимальная длина текста сообщения в Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+class StreamingReply:
+    """Ответ, который дописывается по мере генерации.
+
+    Промежуточный текст показывается редактированием сообщения-заглушки
+    не чаще одного раза в min_interval секунд и только если добавилось
+    не меньше min_chars символов (первый фрагмент показывается сразу).
+    Промежуточные правки отправляются без parse_mode, чтобы незакрытые
+    HTML теги не ломали редактирование; финальная правка - с parse_mode бота.
+    При TelegramRetryAfter следующая правка откладывается на указанное время.
+    """
+
+    def __init__(self, placeholder: TelegramMessage, min_interval: float, min_chars: int):
+        """Инициализация ответа.
+
+        Args:
+            placeholder: Отправленное сообщение-заглушка, которое будет редактироваться
+            min_interval: Минимальный интервал между правками (секунды)
+            min_chars: Минимальный прирост текста для промежуточной правки
+        """
+        self.placeholder = placeholder
+        self.min_interval = min_interval
+        self.min_chars = min_chars
+        self.edits = 0
+        self._shown_length = 0
+        self._next_edit_at = 0.0
+
+    async def update(self, text: str) -> None:
+        """Показать накопленный текст, если позволяет throttling.
+
+        Args:
+            text: Весь текст ответа, накопленный к текущему моменту
+        """
+        now = time.monotonic()
+        if now < self._next_edit_at:
+            return
+        if self._shown_length and len(text) - self._shown_length < self.min_chars:
+            return
+
+        await self._edit(text[:TELEGRAM_MESSAGE_LIMIT], parse_mode=None)
+
+    async def finish(self, text: str) -> None:
+        """Показать финальный текст ответа.
+
+        Текст длиннее лимита Telegram дописывается отдельными сообщениями.
+
+        Args:
+            text: Полный текст ответа (непустой)
+        """
+        chunks = [
+            text[i : i + TELEGRAM_MESSAGE_LIMIT]
+            for i in range(0, len(text), TELEGRAM_MESSAGE_LIMIT)
+        ]
+
+        try:
+            await self._final_edit(chunks[0])
+        except TelegramBadRequest as e:
+            if "not modified" not in str(e):
+                # Ответ LLM может содержать невалидный HTML - показываем как текст
+                logger.warning(f"Final edit failed, retrying without parse_mode: {e}")
+                await self.placeholder.edit_text(chunks[0], parse_mode=None)
+
+        for chunk in chunks[1:]:
+            await self.placeholder.answer(chunk, parse_mode=None)
+
+        logger.info(f"Streaming reply finished: length={len(text)}, edits={self.edits + 1}")
+
+    async def _final_edit(self, text: str) -> None:
+        """Финальная правка с parse_mode бота; при rate limit дожидается разрешения.
+
+        Args:
+            text: Текст ответа
+        """
+        try:
+            await self.placeholder.edit_text(text)
+        except TelegramRetryAfter as e:
+            logger.warning(f"Telegram edit rate limit hit on final edit, waiting {e.retry_after}s")
+            await asyncio.sleep(e.retry_after)
+            await self.placeholder.edit_text(text)
+
+    async def discard(self) -> None:
+        """Удалить заглушку, если в ней ещё не было текста ответа (best-effort)."""
+        if self._shown_length:
+            return
+        try:
+            await self.placeholder.delete()
+        except Exception as e:
+            logger.warning(f"Failed to delete placeholder: {e}")
+
+    async def _edit(self, text: str, parse_mode: str | None) -> None:
+        """Редактирование заглушки с учётом ограничений Telegram.
+
+        Args:
+            text: Новый текст
+            parse_mode: Режим разметки (None - без разметки)
+        """
+        try:
+            await self.placeholder.edit_text(text, parse_mode=parse_mode)
+            self.edits += 1
+            self._shown_length = len(text)
+            self._next_edit_at = time.monotonic() + self.min_interval
+        except TelegramRetryAfter as e:
+            logger.warning(f"Telegram edit rate limit hit, retry after {e.retry_after}s")
+            self._next_edit_at = time.monotonic() + e.retry_after
+        except TelegramBadRequest as e:
+            # Например "message is not modified" - промежуточную правку просто пропускаем
+            logger.debug(f"Intermediate edit skipped: {e}")
+            self._next_edit_at = time.monotonic() + self.min_interval
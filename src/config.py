@@ -1,5 +1,7 @@
 """Конфигурация приложения."""
 
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,6 +13,17 @@ class Config(BaseSettings):
     # Telegram Bot
     telegram_bot_token: str
 
+    # Режим получения обновлений: "polling" или "webhook"
+    bot_mode: Literal["polling", "webhook"] = "polling"
+    webhook_url: str = ""  # публичный HTTPS адрес, например https://bot.example.com
+    webhook_path: str = "/telegram/webhook"
+    webhook_secret: str = ""  # X-Telegram-Bot-Api-Secret-Token (A-Z, a-z, 0-9, _, -)
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+
+    # Количество процессов-воркеров; > 1 - обновления шардируются по chat_id
+    bot_workers: int = 1
+
     # Openrouter
     openrouter_api_key: str
     openrouter_model: str = (
@@ -23,6 +36,30 @@ class Config(BaseSettings):
     llm_max_tokens: int = 1000
     llm_timeout: int = 60
 
+    # Hedged запросы: вторая модель запрашивается, если первая не прислала
+    # первый токен за p95 своей задержки (в пределах min/max, секунды)
+    llm_hedging: bool = True
+    llm_hedge_min_delay: float = 1.0
+    llm_hedge_max_delay: float = 10.0
+    llm_hedge_default_delay: float = 3.0  # пока по модели нет замеров
+
+    # Устойчивость к сбоям провайдера: общий бюджет времени на запрос с повторами
+    # и circuit breaker по каждой модели (доля ошибок / медленных ответов в окне)
+    llm_deadline: float = 30.0
+    llm_max_attempts: int = 3
+    llm_breaker_failure_rate: float = 0.5
+    llm_breaker_slow_call: float = 20.0  # секунды до первого токена
+    llm_breaker_open_duration: float = 30.0
+
+    # Ограничение одновременных запросов к LLM (общее для всех чатов)
+    llm_max_in_flight: int = 8
+    llm_queue_timeout: float = 10.0  # после - быстрый ответ "занято"
+
+    # Прогрессивная доставка ответа в Telegram (редактирование сообщения)
+    stream_edit_interval_ms: int = 1000  # не чаще 1 правки в секунду на чат
+    stream_edit_min_chars: int = 40
+    typing_heartbeat_interval: float = 4.0  # индикатор "печатает..." живёт ~5 секунд
+
     # System prompt
     system_prompt: str = (
         "🌟 ТВОЯ РОЛЬ: Ты дружелюбный помощник для детей 7-10 лет! 🌟\n\n"
@@ -102,8 +139,16 @@ class Config(BaseSettings):
     postgres_user: str = "postgres"
     postgres_password: str
 
+    # Write-behind запись сообщений (пакетный COPY в фоне)
+    db_write_behind: bool = False
+    db_flush_batch_size: int = 100
+    db_flush_interval: float = 0.5  # секунды
+
     # History
-    max_history_messages: int = 10
+    # Окно истории определяется бюджетом токенов, max_history_messages - верхняя граница
+    max_history_messages: int = 30
+    history_token_budget: int = 2000
+    history_cache_dialogs: int = 1000  # 0 - кэш истории отключён
 
     # Logging
     log_level: str = "INFO"
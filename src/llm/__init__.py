@@ -1,6 +1,20 @@
 """LLM layer для работы с языковыми моделями."""
 
+from src.llm.admission import AdmissionController, LLMBusyError
 from src.llm.client import LLMClient
 from src.llm.protocols import LLMClientProtocol
+from src.llm.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from src.llm.router import ModelRouter
+from src.llm.streaming import ResponseStream
 
-__all__ = ["LLMClient", "LLMClientProtocol"]
+__all__ = [
+    "AdmissionController",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "LLMBusyError",
+    "LLMClient",
+    "LLMClientProtocol",
+    "ModelRouter",
+    "ResponseStream",
+    "RetryPolicy",
+]
@@ -0,0 +1,129 @@
+"""Ограничение числа одновременных запросов к LLM со справедливой очередью."""
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Hashable
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBusyError(Exception):
+    """Запрос отклонён: очередь к LLM не освободилась за допустимое время."""
+
+
+class AdmissionController:
+    """Допуск запросов к LLM: не более max_in_flight одновременно.
+
+    Ожидающие запросы группируются по ключу (chat_id), освободившийся слот
+    передаётся по кругу между ключами (round-robin), поэтому чат, отправивший
+    много сообщений подряд, не задерживает остальные чаты. Если слот не
+    освободился за max_queue_wait секунд, запрос отклоняется с LLMBusyError,
+    чтобы пользователь быстро получил ответ "занято" вместо долгого ожидания.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue_wait: float):
+        """Инициализация контроллера.
+
+        Args:
+            max_in_flight: Максимальное количество одновременных запросов
+            max_queue_wait: Максимальное время ожидания в очереди (секунды)
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue_wait = max_queue_wait
+        self.in_flight = 0
+        self.rejected = 0
+        # Очереди ожидающих по ключу; порядок ключей - порядок обслуживания
+        self._queues: OrderedDict[Hashable, deque[asyncio.Future[None]]] = OrderedDict()
+        logger.info(
+            f"AdmissionController initialized: max_in_flight={max_in_flight}, "
+            f"max_queue_wait={max_queue_wait}s"
+        )
+
+    @property
+    def queued(self) -> int:
+        """Количество ожидающих запросов."""
+        return sum(len(q) for q in self._queues.values())
+
+    @asynccontextmanager
+    async def slot(self, key: Hashable) -> AsyncIterator[None]:
+        """Занять слот на время блока.
+
+        Args:
+            key: Ключ справедливости (обычно chat_id)
+
+        Raises:
+            LLMBusyError: Если слот не освободился за max_queue_wait
+        """
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, key: Hashable) -> None:
+        """Занять слот, при необходимости дождавшись своей очереди.
+
+        Args:
+            key: Ключ справедливости (обычно chat_id)
+
+        Raises:
+            LLMBusyError: Если слот не освободился за max_queue_wait
+        """
+        if self.in_flight < self.max_in_flight and not self._queues:
+            self.in_flight += 1
+            return
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_queue_wait)
+        except TimeoutError:
+            if waiter.done():
+                # Слот передан одновременно с истечением таймаута - используем его
+                return
+            self._remove(key, waiter)
+            self.rejected += 1
+            logger.warning(
+                f"LLM queue wait exceeded {self.max_queue_wait}s for key={key}, "
+                f"in_flight={self.in_flight}, queued={self.queued}"
+            )
+            raise LLMBusyError("LLM is busy, try again later") from None
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release()
+            else:
+                self._remove(key, waiter)
+            raise
+
+    def release(self) -> None:
+        """Освободить слот: передать его следующему ключу по кругу."""
+        while self._queues:
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            if not waiter.done():
+                # Слот переходит ожидающему, in_flight не меняется
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _remove(self, key: Hashable, waiter: asyncio.Future[None]) -> None:
+        """Удалить ожидающего из очереди ключа.
+
+        Args:
+            key: Ключ очереди
+            waiter: Future ожидающего
+        """
+        waiter.cancel()
+        queue = self._queues.get(key)
+        if queue is None:
+            return
+        if waiter in queue:
+            queue.remove(waiter)
+        if not queue:
+            del self._queues[key]
@@ -1,10 +1,16 @@
 """LLM клиент для работы с Openrouter API."""
 
 import logging
+from collections.abc import AsyncIterator
+from typing import Any
 
 from openai import AsyncOpenAI
 
 from src.config import Config
+from src.llm.admission import AdmissionController
+from src.llm.resilience import CircuitBreaker, RetryPolicy
+from src.llm.router import ModelRouter, parse_models
+from src.llm.streaming import ResponseStream
 from src.storage.models import Message
 
 logger = logging.getLogger(__name__)
@@ -23,53 +29,194 @@ class LLMClient:
             base_url="https://openrouter.ai/api/v1",
             api_key=config.openrouter_api_key,
             timeout=config.llm_timeout,
+            # Повторы выполняет RetryPolicy в пределах общего бюджета времени
+            max_retries=0,
+        )
+        self.models = parse_models(config.openrouter_model)
+        self.router = ModelRouter(
+            self.models,
+            hedging=config.llm_hedging,
+            hedge_min_delay=config.llm_hedge_min_delay,
+            hedge_max_delay=config.llm_hedge_max_delay,
+            hedge_default_delay=config.llm_hedge_default_delay,
+            breaker_factory=lambda model: CircuitBreaker(
+                model,
+                failure_rate_threshold=config.llm_breaker_failure_rate,
+                slow_call_threshold=config.llm_breaker_slow_call,
+                open_duration=config.llm_breaker_open_duration,
+            ),
+        )
+        self.retry = RetryPolicy(
+            max_attempts=config.llm_max_attempts,
+            deadline=config.llm_deadline,
+        )
+        self.admission = AdmissionController(
+            max_in_flight=config.llm_max_in_flight,
+            max_queue_wait=config.llm_queue_timeout,
         )
-        self.model = config.openrouter_model
         self.temperature = config.llm_temperature
         self.max_tokens = config.llm_max_tokens
 
-        logger.info(f"LLMClient initialized with model: {self.model}")
+        logger.info(f"LLMClient initialized with models: {self.models}")
 
-    async def get_response(self, messages: list[Message], system_prompt: str) -> str:
+    async def get_response(
+        self, messages: list[Message], system_prompt: str, chat_id: int | None = None
+    ) -> str:
         """Получает ответ от LLM с учетом истории.
 
         Args:
             messages: История сообщений
             system_prompt: Системный промпт
+            chat_id: ID чата для справедливой очереди запросов (None - общая очередь)
 
         Returns:
             Ответ от LLM
 
         Raises:
+            LLMBusyError: Если очередь к LLM не освободилась вовремя
             Exception: При ошибке API
         """
         logger.info(f"Sending request to LLM: history_length={len(messages)}")
         logger.debug(f"Messages: {[{'role': m.role, 'content': m.content[:50]} for m in messages]}")
 
         try:
-            # Формируем список сообщений для API
-            api_messages = [{"role": "system", "content": system_prompt}]
+            api_messages = self._build_api_messages(messages, system_prompt)
+
+            async def complete(model: str) -> str:
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=api_messages,  # type: ignore[arg-type]
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                )
+                answer = response.choices[0].message.content
+                if answer is None:
+                    raise ValueError("LLM returned empty response")
+                return answer
+
+            # Без потока нет первого токена: только failover по порядку моделей
+            async with self.admission.slot(chat_id):
+                model, answer = await self.retry.call(
+                    lambda: self.router.race(complete, hedge=False)
+                )
+
+            logger.info(f"Received response from LLM: model={model}, length={len(answer)}")
+            logger.debug(f"LLM response: {answer}")
 
-            # Добавляем историю диалога
-            for msg in messages:
-                api_messages.append({"role": msg.role, "content": msg.content})
+            return answer
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=api_messages,  # type: ignore[arg-type]
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
+        except Exception as e:
+            logger.error(f"LLM API error: {e}")
+            raise
 
-            answer = response.choices[0].message.content
-            if answer is None:
-                raise ValueError("LLM returned empty response")
+    def stream_response(
+        self, messages: list[Message], system_prompt: str, chat_id: int | None = None
+    ) -> ResponseStream:
+        """Получает ответ от LLM потоком фрагментов.
 
-            logger.info(f"Received response from LLM: length={len(answer)}")
-            logger.debug(f"LLM response: {answer}")
+        Запрос отправляется при начале итерации по потоку; слот очереди
+        запросов занят до конца потока.
 
-            return answer
+        Args:
+            messages: История сообщений
+            system_prompt: Системный промпт
+            chat_id: ID чата для справедливой очереди запросов (None - общая очередь)
+
+        Returns:
+            Поток фрагментов ответа (полный текст доступен в ResponseStream.text);
+            итерация выбрасывает LLMBusyError, если очередь не освободилась вовремя
+        """
+        logger.info(f"Sending streaming request to LLM: history_length={len(messages)}")
+
+        api_messages = self._build_api_messages(messages, system_prompt)
+        return ResponseStream(self._stream_deltas(api_messages, chat_id))
+
+    async def _stream_deltas(
+        self, api_messages: list[dict[str, Any]], chat_id: int | None
+    ) -> AsyncIterator[str]:
+        """Открывает потоковый запрос к API и возвращает фрагменты текста.
+
+        Модель выбирается роутером: если основная модель не прислала первый
+        токен вовремя, параллельно запрашивается следующая, и дальше читается
+        поток той модели, что ответила первой. Ожидание первого токена
+        (вместе с повторами) ограничено бюджетом llm_deadline.
+
+        Args:
+            api_messages: Сообщения в формате API
+            chat_id: ID чата для справедливой очереди запросов
+
+        Yields:
+            Фрагменты текста ответа
+
+        Raises:
+            Exception: При ошибке API
+        """
+        try:
+
+            async def open_stream(model: str) -> tuple[Any, AsyncIterator[Any], str]:
+                stream = await self.client.chat.completions.create(
+                    model=model,
+                    messages=api_messages,  # type: ignore[arg-type]
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    stream=True,
+                )
+                chunks = stream.__aiter__()  # type: ignore[union-attr]
+                try:
+                    async for chunk in chunks:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            return stream, chunks, chunk.choices[0].delta.content
+                except BaseException:
+                    await _close_stream(stream)
+                    raise
+                return stream, chunks, ""
+
+            async def discard(opened: tuple[Any, AsyncIterator[Any], str]) -> None:
+                await _close_stream(opened[0])
+
+            async with self.admission.slot(chat_id):
+                model, (stream, chunks, first) = await self.retry.call(
+                    lambda: self.router.race(open_stream, discard)
+                )
+                logger.info(f"Streaming response from model: {model}")
+
+                try:
+                    if first:
+                        yield first
+                    async for chunk in chunks:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+                finally:
+                    await _close_stream(stream)
 
         except Exception as e:
-            logger.error(f"LLM API error: {e}")
+            logger.error(f"LLM API streaming error: {e}")
             raise
+
+    def _build_api_messages(
+        self, messages: list[Message], system_prompt: str
+    ) -> list[dict[str, Any]]:
+        """Формирует список сообщений для API: системный промпт и история диалога.
+
+        Args:
+            messages: История сообщений
+            system_prompt: Системный промпт
+
+        Returns:
+            Список сообщений в формате API
+        """
+        api_messages: list[dict[str, Any]] = [{"role": "system", "content": system_prompt}]
+        for msg in messages:
+            api_messages.append({"role": msg.role, "content": msg.content})
+        return api_messages
+
+
+async def _close_stream(stream: Any) -> None:
+    """Закрывает потоковый ответ API (освобождает HTTP соединение).
+
+    Args:
+        stream: Поток ответа (AsyncStream или асинхронный генератор)
+    """
+    close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+    if close is not None:
+        await close()
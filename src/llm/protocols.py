@@ -2,6 +2,7 @@
 
 from typing import Protocol
 
+from src.llm.streaming import ResponseStream
 from src.storage.models import Message
 
 
@@ -12,14 +13,32 @@ class LLMClientProtocol(Protocol):
     Используется для dependency injection и тестирования.
     """
 
-    async def get_response(self, messages: list[Message], system_prompt: str) -> str:
+    async def get_response(
+        self, messages: list[Message], system_prompt: str, chat_id: int | None = None
+    ) -> str:
         """Получает ответ от LLM с учетом истории.
 
         Args:
             messages: История сообщений диалога
             system_prompt: Системный промпт для LLM
+            chat_id: ID чата для справедливой очереди запросов
 
         Returns:
             Ответ от LLM
         """
         ...
+
+    def stream_response(
+        self, messages: list[Message], system_prompt: str, chat_id: int | None = None
+    ) -> ResponseStream:
+        """Получает ответ от LLM потоком фрагментов.
+
+        Args:
+            messages: История сообщений диалога
+            system_prompt: Системный промпт для LLM
+            chat_id: ID чата для справедливой очереди запросов
+
+        Returns:
+            Поток фрагментов ответа (полный текст доступен в ResponseStream.text)
+        """
+        ...
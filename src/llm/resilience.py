@@ -0,0 +1,240 @@
+"""Circuit breaker и повторы с бюджетом времени для запросов к LLM."""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from enum import StrEnum
+from typing import TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitState(StrEnum):
+    """Состояние circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Запрос отклонён: circuit breaker всех доступных моделей разомкнут."""
+
+
+class CircuitBreaker:
+    """Circuit breaker одной модели по доле ошибок и медленных ответов.
+
+    CLOSED - запросы проходят, исходы копятся в скользящем окне. Если в окне
+    не меньше min_calls исходов и доля ошибок или медленных ответов достигает
+    порога, breaker переходит в OPEN.
+    OPEN - запросы сразу отклоняются (роутер переключается на другую модель).
+    Через open_duration секунд breaker переходит в HALF_OPEN.
+    HALF_OPEN - пропускается half_open_max_calls пробных запросов: быстрый
+    успешный ответ замыкает breaker, ошибка или медленный ответ снова размыкает.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_threshold: float = 20.0,
+        slow_call_rate_threshold: float = 0.8,
+        window: int = 20,
+        min_calls: int = 5,
+        open_duration: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        """Инициализация circuit breaker.
+
+        Args:
+            name: Имя защищаемого ресурса (модели) для логов
+            failure_rate_threshold: Доля ошибок в окне для размыкания
+            slow_call_threshold: Задержка (секунды), после которой ответ считается медленным
+            slow_call_rate_threshold: Доля медленных ответов в окне для размыкания
+            window: Размер скользящего окна исходов
+            min_calls: Минимум исходов в окне для принятия решения
+            open_duration: Время в OPEN до пробных запросов (секунды)
+            half_open_max_calls: Количество одновременных пробных запросов
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        # Исходы: (ошибка, медленный ответ)
+        self._outcomes: deque[tuple[bool, bool]] = deque(maxlen=window)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._trial_calls = 0
+
+    @property
+    def state(self) -> CircuitState:
+        """Текущее состояние (OPEN переходит в HALF_OPEN по истечении open_duration)."""
+        if (
+            self._state == CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= self.open_duration
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._trial_calls = 0
+            logger.info(f"Circuit {self.name}: half-open, allowing trial requests")
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Проверка, можно ли отправить запрос (в HALF_OPEN занимает пробный слот).
+
+        Returns:
+            True если запрос разрешён
+        """
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN and self._trial_calls < self.half_open_max_calls:
+            self._trial_calls += 1
+            return True
+        return False
+
+    def record_success(self, latency: float | None = None) -> None:
+        """Учесть успешный ответ.
+
+        Args:
+            latency: Задержка ответа в секундах (None - не учитывать скорость)
+        """
+        slow = latency is not None and latency >= self.slow_call_threshold
+        self._record(failed=False, slow=slow)
+
+    def record_failure(self) -> None:
+        """Учесть ошибку запроса."""
+        self._record(failed=True, slow=False)
+
+    def record_cancelled(self, elapsed: float) -> None:
+        """Учесть отменённый запрос (проиграл hedging или истёк бюджет времени).
+
+        Отменённый запрос считается медленным, только если успел превысить
+        slow_call_threshold; иначе он лишь освобождает пробный слот.
+
+        Args:
+            elapsed: Время от начала запроса до отмены в секундах
+        """
+        if elapsed >= self.slow_call_threshold:
+            self._record(failed=False, slow=True)
+        elif self._state == CircuitState.HALF_OPEN:
+            self._trial_calls = max(0, self._trial_calls - 1)
+
+    def _record(self, failed: bool, slow: bool) -> None:
+        """Учесть исход запроса и при необходимости сменить состояние.
+
+        Args:
+            failed: Запрос завершился ошибкой
+            slow: Ответ был медленным
+        """
+        if self._state == CircuitState.HALF_OPEN:
+            self._trial_calls = max(0, self._trial_calls - 1)
+            if failed or slow:
+                self._open()
+            else:
+                self._outcomes.clear()
+                self._state = CircuitState.CLOSED
+                logger.info(f"Circuit {self.name}: closed after successful trial")
+            return
+
+        self._outcomes.append((failed, slow))
+        if self._state == CircuitState.CLOSED and len(self._outcomes) >= self.min_calls:
+            failures = sum(1 for f, _ in self._outcomes if f) / len(self._outcomes)
+            slow_calls = sum(1 for _, s in self._outcomes if s) / len(self._outcomes)
+            if (
+                failures >= self.failure_rate_threshold
+                or slow_calls >= self.slow_call_rate_threshold
+            ):
+                self._open()
+
+    def _open(self) -> None:
+        """Разомкнуть breaker."""
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._trial_calls = 0
+        self._outcomes.clear()
+        logger.warning(f"Circuit {self.name}: open for {self.open_duration}s")
+
+
+class RetryPolicy:
+    """Повторы с экспоненциальным backoff (full jitter) в пределах общего бюджета времени.
+
+    Бюджет deadline ограничивает всю операцию вместе с повторами: попытка
+    прерывается по его истечении, и повтор не запускается, если пауза
+    перед ним не укладывается в оставшееся время.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 4.0,
+        deadline: float = 30.0,
+    ):
+        """Инициализация политики повторов.
+
+        Args:
+            max_attempts: Максимальное количество попыток
+            base_delay: Базовая пауза backoff (секунды)
+            max_delay: Максимальная пауза backoff (секунды)
+            deadline: Общий бюджет времени на операцию (секунды)
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt: int) -> float:
+        """Пауза перед повтором (full jitter).
+
+        Args:
+            attempt: Номер неудачной попытки (с 1)
+
+        Returns:
+            Пауза в секундах
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def call(self, operation: Callable[[], Awaitable[T]]) -> T:
+        """Выполнить операцию с повторами.
+
+        CircuitOpenError не повторяется: все модели недоступны, и ожидание
+        только увеличит задержку ответа пользователю.
+
+        Args:
+            operation: Фабрика попытки (вызывается заново для каждой попытки)
+
+        Returns:
+            Результат успешной попытки
+
+        Raises:
+            TimeoutError: Если исчерпан бюджет времени
+            Exception: Ошибка последней попытки
+        """
+        deadline_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = deadline_at - time.monotonic()
+            try:
+                return await asyncio.wait_for(operation(), timeout=remaining)
+            except TimeoutError as e:
+                raise TimeoutError(f"LLM request deadline of {self.deadline}s exceeded") from e
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                delay = self.backoff(attempt)
+                if attempt >= self.max_attempts or time.monotonic() + delay >= deadline_at:
+                    raise
+                logger.warning(
+                    f"LLM attempt {attempt}/{self.max_attempts} failed: {e}; "
+                    f"retrying in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
@@ -0,0 +1,259 @@
+"""Маршрутизация запросов между моделями Openrouter с hedging."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from src.llm.resilience import CircuitBreaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def parse_models(spec: str) -> list[str]:
+    """Разбор списка моделей из конфигурации.
+
+    Args:
+        spec: Модели через запятую (например "a/model:free,b/model:free")
+
+    Returns:
+        Список моделей без пустых элементов и дубликатов (порядок сохраняется)
+
+    Raises:
+        ValueError: Если список пуст
+    """
+    models = list(dict.fromkeys(m.strip() for m in spec.split(",") if m.strip()))
+    if not models:
+        raise ValueError("No LLM models configured")
+    return models
+
+
+class ModelStats:
+    """Статистика задержки первого токена для одной модели.
+
+    Хранит EWMA (для выбора порядка моделей) и окно последних замеров
+    (для p95, по которому считается deadline hedging).
+    """
+
+    def __init__(self, alpha: float, window: int):
+        """Инициализация статистики.
+
+        Args:
+            alpha: Коэффициент сглаживания EWMA (0..1)
+            window: Размер окна замеров для p95
+        """
+        self.alpha = alpha
+        self.ewma: float | None = None
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float) -> None:
+        """Добавить замер задержки.
+
+        Args:
+            latency: Задержка в секундах
+        """
+        self.samples.append(latency)
+        if self.ewma is None:
+            self.ewma = latency
+        else:
+            self.ewma = self.alpha * latency + (1 - self.alpha) * self.ewma
+
+    def p95(self) -> float | None:
+        """95-й перцентиль задержки по окну замеров (None если замеров нет)."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(0.95 * len(ordered)))
+        return ordered[index]
+
+
+class ModelRouter:
+    """Выбор модели и hedged запросы по списку моделей.
+
+    Модели упорядочиваются по EWMA задержки первого токена (модели без
+    замеров идут первыми в порядке конфигурации, чтобы быть опробованными).
+    Если основная модель не ответила за p95 своей задержки (в пределах
+    [hedge_min_delay, hedge_max_delay]), параллельно запускается запрос
+    ко второй модели; побеждает первая ответившая, остальные отменяются.
+    Ошибка основной модели до deadline сразу переключает на следующую.
+    Модели с разомкнутым circuit breaker пропускаются без ожидания.
+    """
+
+    def __init__(
+        self,
+        models: list[str],
+        hedging: bool = True,
+        hedge_min_delay: float = 1.0,
+        hedge_max_delay: float = 10.0,
+        hedge_default_delay: float = 3.0,
+        ewma_alpha: float = 0.2,
+        window: int = 50,
+        breaker_factory: Callable[[str], CircuitBreaker] | None = None,
+    ):
+        """Инициализация роутера.
+
+        Args:
+            models: Список моделей в порядке предпочтения из конфигурации
+            hedging: Включить hedged запросы ко второй модели
+            hedge_min_delay: Минимальный deadline перед hedge (секунды)
+            hedge_max_delay: Максимальный deadline перед hedge (секунды)
+            hedge_default_delay: Deadline для модели без замеров (секунды)
+            ewma_alpha: Коэффициент сглаживания EWMA
+            window: Размер окна замеров для p95
+            breaker_factory: Создание circuit breaker для модели
+                (по умолчанию CircuitBreaker с параметрами по умолчанию)
+        """
+        self.models = models
+        self.hedging = hedging
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.stats = {model: ModelStats(ewma_alpha, window) for model in models}
+        factory = breaker_factory or CircuitBreaker
+        self.breakers = {model: factory(model) for model in models}
+        logger.info(f"ModelRouter initialized: models={models}, hedging={hedging}")
+
+    def ordered_models(self) -> list[str]:
+        """Модели в порядке предпочтения (по EWMA задержки)."""
+        return sorted(self.models, key=lambda m: self.stats[m].ewma or 0.0)
+
+    def hedge_delay(self, model: str) -> float:
+        """Deadline ожидания первого токена перед hedged запросом.
+
+        Args:
+            model: Модель основного запроса
+
+        Returns:
+            Задержка в секундах
+        """
+        p95 = self.stats[model].p95()
+        if p95 is None:
+            return self.hedge_default_delay
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, p95))
+
+    def record(self, model: str, latency: float) -> None:
+        """Добавить замер задержки модели.
+
+        Args:
+            model: Модель
+            latency: Задержка первого токена в секундах
+        """
+        self.stats[model].record(latency)
+
+    async def race(
+        self,
+        start: Callable[[str], Awaitable[T]],
+        discard: Callable[[T], Awaitable[None]] | None = None,
+        models: list[str] | None = None,
+        hedge: bool = True,
+    ) -> tuple[str, T]:
+        """Выполнить запрос с hedging по списку моделей.
+
+        Args:
+            start: Функция запуска запроса к модели; завершается, когда
+                получен первый токен (результат передается победителю)
+            discard: Освобождение результата проигравшего запроса,
+                завершившегося одновременно с победителем
+            models: Кандидаты по порядку (по умолчанию ordered_models())
+            hedge: False - только переключение на следующую модель при ошибке,
+                без hedging и без замеров задержки (для запросов без потока,
+                где полное время ответа несравнимо с задержкой первого токена)
+
+        Returns:
+            Кортеж (модель-победитель, результат start)
+
+        Raises:
+            CircuitOpenError: Если circuit breaker всех моделей разомкнут
+            Exception: Ошибка последней модели, если ни одна не ответила
+        """
+        candidates = list(models if models is not None else self.ordered_models())
+
+        pending: dict[asyncio.Task[T], tuple[str, float]] = {}
+        last_error: BaseException | None = None
+
+        def launch() -> bool:
+            # Следующая модель, чей circuit breaker пропускает запрос
+            while candidates:
+                model = candidates.pop(0)
+                if not self.breakers[model].allow_request():
+                    logger.info(f"Circuit open for {model}, skipping")
+                    continue
+                task = asyncio.ensure_future(start(model))
+                pending[task] = (model, time.monotonic())
+                return True
+            return False
+
+        if not launch():
+            raise CircuitOpenError("All LLM model circuits are open")
+        try:
+            while pending:
+                # Пока есть запасные модели, ждем не дольше deadline основной
+                timeout = None
+                if candidates and hedge and self.hedging and len(pending) == 1:
+                    (model, started_at) = next(iter(pending.values()))
+                    timeout = max(0.0, started_at + self.hedge_delay(model) - time.monotonic())
+
+                done, _ = await asyncio.wait(
+                    pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    if launch():
+                        logger.info("Hedging: no first token within deadline, adding next model")
+                    continue
+
+                for task in done:
+                    model, started_at = pending.pop(task)
+                    if task.exception() is None:
+                        latency = time.monotonic() - started_at
+                        if hedge:
+                            self.record(model, latency)
+                        self.breakers[model].record_success(latency if hedge else None)
+                        await self._cancel_losers(pending, discard)
+                        return model, task.result()
+
+                    last_error = task.exception()
+                    self.breakers[model].record_failure()
+                    logger.warning(f"Model {model} failed: {last_error}")
+
+                # Основная модель упала - сразу переключаемся на следующую
+                if not pending:
+                    launch()
+        finally:
+            await self._cancel_losers(pending, discard)
+
+        assert last_error is not None
+        raise last_error
+
+    async def _cancel_losers(
+        self,
+        pending: dict[asyncio.Task[T], tuple[str, float]],
+        discard: Callable[[T], Awaitable[None]] | None,
+    ) -> None:
+        """Отмена незавершенных запросов и освобождение лишних результатов.
+
+        Проигравшей модели засчитывается прошедшее время как нижняя оценка
+        задержки, чтобы медленные модели уходили вниз в порядке предпочтения;
+        circuit breaker учитывает отмену как медленный ответ, если она
+        произошла позже порога медленного ответа.
+
+        Args:
+            pending: Незавершенные запросы
+            discard: Освобождение результата, если запрос успел завершиться
+        """
+        for task, (model, started_at) in list(pending.items()):
+            if not task.done():
+                task.cancel()
+                elapsed = time.monotonic() - started_at
+                self.record(model, elapsed)
+                self.breakers[model].record_cancelled(elapsed)
+        if pending:
+            await asyncio.gather(*pending.keys(), return_exceptions=True)
+        for task in pending:
+            if discard and not task.cancelled() and task.exception() is None:
+                await discard(task.result())
+        pending.clear()
@@ -0,0 +1,71 @@
+"""Потоковая выдача ответов LLM."""
+
+import logging
+import time
+from collections.abc import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseStream:
+    """Асинхронный поток дельт ответа LLM.
+
+    Итерация возвращает фрагменты текста по мере генерации,
+    полный текст накапливается в text (для сохранения в БД).
+    Время до первого токена отсчитывается от создания потока.
+    """
+
+    def __init__(self, deltas: AsyncIterator[str]):
+        """Инициализация потока.
+
+        Args:
+            deltas: Асинхронный итератор фрагментов текста
+        """
+        self._deltas = deltas
+        self._parts: list[str] = []
+        self._started_at = time.monotonic()
+        self.time_to_first_token: float | None = None
+        self.total_time: float | None = None
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        """Итерация по фрагментам ответа."""
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[str]:
+        """Чтение фрагментов с накоплением текста и замером времени.
+
+        Raises:
+            ValueError: Если LLM не вернула ни одного фрагмента
+        """
+        async for delta in self._deltas:
+            if not delta:
+                continue
+            if self.time_to_first_token is None:
+                self.time_to_first_token = time.monotonic() - self._started_at
+                logger.info(f"LLM first token received: ttft={self.time_to_first_token:.3f}s")
+            self._parts.append(delta)
+            yield delta
+
+        self.total_time = time.monotonic() - self._started_at
+        if not self._parts:
+            raise ValueError("LLM returned empty response")
+
+        logger.info(
+            f"LLM stream finished: length={len(self.text)}, "
+            f"ttft={self.time_to_first_token:.3f}s, total={self.total_time:.3f}s"
+        )
+
+    @property
+    def text(self) -> str:
+        """Текст, накопленный к текущему моменту."""
+        return "".join(self._parts)
+
+    async def read_all(self) -> str:
+        """Дочитать поток до конца.
+
+        Returns:
+            Полный текст ответа
+        """
+        async for _ in self:
+            pass
+        return self.text
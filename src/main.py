@@ -3,11 +3,13 @@
 import asyncio
 import logging
 
-from src.bot.bot import create_bot, start_polling
+from src.bot.bot import create_bot, start_polling, start_webhook
 from src.bot.handlers import BotHandlers
+from src.bot.sharding import run_sharded
 from src.config import Config
 from src.llm.client import LLMClient
 from src.storage.database import Database
+from src.storage.history_cache import HistoryCache
 
 
 async def main() -> None:
@@ -25,6 +27,22 @@ async def main() -> None:
         config = Config()  # type: ignore[call-arg]
         logger.info("Configuration loaded successfully")
 
+        # Несколько процессов-воркеров: ingress здесь, БД и handlers - в воркерах
+        if config.bot_workers > 1:
+            logger.info(f"Starting sharded bot with {config.bot_workers} workers...")
+            await run_sharded(config)
+            return
+
+        # Кэш истории диалогов (ring buffer на max_history_messages сообщений)
+        history_cache = (
+            HistoryCache(
+                max_dialogs=config.history_cache_dialogs,
+                max_messages=config.max_history_messages,
+            )
+            if config.history_cache_dialogs > 0
+            else None
+        )
+
         # Инициализация Database с context manager (graceful shutdown)
         async with Database(
             host=config.postgres_host,
@@ -32,6 +50,10 @@ async def main() -> None:
             database=config.postgres_db,
             user=config.postgres_user,
             password=config.postgres_password,
+            write_behind=config.db_write_behind,
+            flush_batch_size=config.db_flush_batch_size,
+            flush_interval=config.db_flush_interval,
+            history_cache=history_cache,
         ) as database:
             # Создание LLM клиента
             llm_client = LLMClient(config)
@@ -42,9 +64,13 @@ async def main() -> None:
             # Создание бота с router от handlers
             bot, dp = create_bot(config, bot_handlers.router)
 
-            # Запуск polling
-            logger.info("Bot is ready. Starting polling...")
-            await start_polling(bot, dp)
+            # Запуск в выбранном режиме получения обновлений
+            if config.bot_mode == "webhook":
+                logger.info("Bot is ready. Starting webhook server...")
+                await start_webhook(bot, dp, config)
+            else:
+                logger.info("Bot is ready. Starting polling...")
+                await start_polling(bot, dp)
 
         # Database connection автоматически закрывается при выходе из context manager
         logger.info("Bot stopped. Database connection closed.")
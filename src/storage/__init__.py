@@ -1,7 +1,8 @@
 """Storage layer для работы с данными."""
 
 from src.storage.database import Database
+from src.storage.history_cache import CacheStats, HistoryCache
 from src.storage.models import Message
 from src.storage.protocols import DatabaseProtocol
 
-__all__ = ["Database", "Message", "DatabaseProtocol"]
+__all__ = ["Database", "Message", "DatabaseProtocol", "HistoryCache", "CacheStats"]
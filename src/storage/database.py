@@ -1,21 +1,38 @@
 """Работа с PostgreSQL базой данных."""
 
+import asyncio
+import contextlib
 import logging
+from dataclasses import replace
+from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any
 
 import asyncpg  # type: ignore[import-untyped]
 
+from src.storage.history_cache import HistoryCache
 from src.storage.models import Message
+from src.storage.tokens import estimate_tokens, fit_token_budget
 
 logger = logging.getLogger(__name__)
 
+# Ключ advisory lock применения миграций (общий для бота и API)
+MIGRATIONS_LOCK_SQL = "hashtext('migrations')"
+
 
 class Database:
     """Класс для работы с PostgreSQL базой данных.
 
     Использует connection pool для эффективной работы с соединениями.
     Поддерживает async context manager и автоматическое применение миграций.
+
+    В режиме write-behind save_message только ставит сообщение в очередь,
+    а фоновый flusher записывает накопленные сообщения одним COPY
+    (по достижении flush_batch_size или раз в flush_interval секунд).
+    Сообщения из очереди видны в get_history (read-your-writes).
+
+    Если передан history_cache, get_history сначала обращается к нему,
+    а save_message/clear_history поддерживают кэш в актуальном состоянии.
     """
 
     def __init__(
@@ -25,6 +42,10 @@ class Database:
         database: str,
         user: str,
         password: str,
+        write_behind: bool = False,
+        flush_batch_size: int = 100,
+        flush_interval: float = 0.5,
+        history_cache: HistoryCache | None = None,
     ):
         """Инициализация Database.
 
@@ -34,14 +55,26 @@ class Database:
             database: Имя базы данных
             user: Имя пользователя
             password: Пароль
+            write_behind: Включить отложенную пакетную запись сообщений
+            flush_batch_size: Размер очереди, при котором запускается flush
+            flush_interval: Максимальное время (сек) между flush
+            history_cache: Кэш истории диалогов (None - без кэша)
         """
         self.host = host
         self.port = port
         self.database = database
         self.user = user
         self.password = password
+        self.write_behind = write_behind
+        self.flush_batch_size = flush_batch_size
+        self.flush_interval = flush_interval
+        self.history_cache = history_cache
         self._pool: asyncpg.Pool | None = None
-        logger.info(f"Database initialized: {host}:{port}/{database}")
+        self._pending: list[Message] = []
+        self._flush_event = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher_task: asyncio.Task[None] | None = None
+        logger.info(f"Database initialized: {host}:{port}/{database}, write_behind={write_behind}")
 
     def _ensure_connected(self) -> None:
         """Проверка что connection pool создан (fail-fast).
@@ -68,16 +101,63 @@ class Database:
             password=self.password,
             min_size=2,
             max_size=10,
+            # created_at - naive TIMESTAMP в UTC: DEFAULT CURRENT_TIMESTAMP и
+            # сравнения с naive UTC границами из Python не зависят от timezone БД
+            server_settings={"timezone": "UTC"},
         )
         logger.info(f"Database connection pool created: {self.host}:{self.port}/{self.database}")
 
+        if self.write_behind:
+            self._flusher_task = asyncio.create_task(self._flush_loop())
+            logger.info(
+                f"Write-behind flusher started: batch_size={self.flush_batch_size}, "
+                f"interval={self.flush_interval}s"
+            )
+
+    @property
+    def pool(self) -> asyncpg.Pool:
+        """Connection pool (для компонентов, выполняющих собственные запросы).
+
+        Raises:
+            RuntimeError: Если connection pool не создан
+        """
+        self._ensure_connected()
+        assert self._pool is not None
+        return self._pool
+
     async def close(self) -> None:
-        """Закрытие connection pool."""
+        """Закрытие connection pool.
+
+        В режиме write-behind перед закрытием останавливает flusher
+        и записывает все сообщения, оставшиеся в очереди. Если есть кэш
+        истории, в лог пишется его статистика за время работы процесса.
+        """
+        if self._flusher_task is not None:
+            self._flusher_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flusher_task
+            self._flusher_task = None
+
         if self._pool:
+            if self._pending:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(
+                        f"Failed to flush {len(self._pending)} pending messages on close: {e}"
+                    )
             await self._pool.close()
             self._pool = None
             logger.info("Database connection pool closed")
 
+            if self.history_cache is not None:
+                stats = self.history_cache.stats
+                logger.info(
+                    f"History cache stats: hits={stats.hits}, misses={stats.misses}, "
+                    f"hit_rate={stats.hit_rate:.1%}, evictions={stats.evictions}, "
+                    f"invalidations={stats.invalidations}, size={stats.size}"
+                )
+
     async def __aenter__(self) -> "Database":
         """Вход в async context manager."""
         await self.connect()
@@ -89,7 +169,12 @@ class Database:
         await self.close()
 
     async def init_db(self) -> None:
-        """Применение миграций из папки migrations/."""
+        """Применение миграций из папки migrations/.
+
+        Миграции применяются при каждом старте бота и API. Чтобы процессы,
+        стартующие одновременно, не сталкивались на CREATE ... IF NOT EXISTS,
+        применение сериализуется advisory lock.
+        """
         self._ensure_connected()
         assert self._pool is not None
 
@@ -105,32 +190,46 @@ class Database:
             return
 
         async with self._pool.acquire() as conn:
-            for migration_file in migration_files:
-                logger.info(f"Applying migration: {migration_file.name}")
-                sql = migration_file.read_text(encoding="utf-8")
-                await conn.execute(sql)
-                logger.info(f"Migration applied: {migration_file.name}")
+            await conn.execute(f"SELECT pg_advisory_lock({MIGRATIONS_LOCK_SQL})")
+            try:
+                for migration_file in migration_files:
+                    logger.info(f"Applying migration: {migration_file.name}")
+                    sql = migration_file.read_text(encoding="utf-8")
+                    await conn.execute(sql)
+                    logger.info(f"Migration applied: {migration_file.name}")
+            finally:
+                await conn.execute(f"SELECT pg_advisory_unlock({MIGRATIONS_LOCK_SQL})")
 
         logger.info("Database initialized successfully")
 
     async def save_message(self, message: Message) -> None:
         """Сохранение сообщения в БД.
 
+        В режиме write-behind сообщение ставится в очередь и записывается
+        фоновым flusher'ом.
+
         Args:
             message: Сообщение для сохранения
         """
         self._ensure_connected()
         assert self._pool is not None
 
+        if self.write_behind:
+            await self._enqueue(message)
+            return
+
         try:
-            # Автоматически вычисляем content_length
+            # Автоматически вычисляем content_length и token_count
             content_length = len(message.content)
+            token_count = estimate_tokens(message.content)
 
             async with self._pool.acquire() as conn:
-                await conn.execute(
+                row = await conn.fetchrow(
                     """
-                    INSERT INTO messages (user_id, chat_id, role, content, content_length, username)
-                    VALUES ($1, $2, $3, $4, $5, $6)
+                    INSERT INTO messages
+                        (user_id, chat_id, role, content, content_length, username, token_count)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7)
+                    RETURNING id, created_at
                     """,
                     message.user_id,
                     message.chat_id,
@@ -138,6 +237,18 @@ class Database:
                     message.content,
                     content_length,
                     message.username,
+                    token_count,
+                )
+
+            if self.history_cache is not None:
+                self.history_cache.append(
+                    replace(
+                        message,
+                        id=row["id"],
+                        created_at=row["created_at"],
+                        content_length=content_length,
+                        token_count=token_count,
+                    )
                 )
 
             logger.info(
@@ -150,13 +261,123 @@ class Database:
             logger.error(f"Database error while saving message: {e}")
             raise
 
-    async def get_history(self, chat_id: int, user_id: int, limit: int) -> list[Message]:
+    async def _enqueue(self, message: Message) -> None:
+        """Постановка сообщения в очередь write-behind.
+
+        created_at фиксируется в момент постановки в очередь и записывается
+        в БД как есть, чтобы порядок истории не зависел от момента flush.
+        Если очередь переполнена (flush не успевает или БД недоступна),
+        запись выполняется синхронно.
+
+        Args:
+            message: Сообщение для сохранения
+        """
+        message.content_length = len(message.content)
+        message.token_count = estimate_tokens(message.content)
+        if message.created_at is None:
+            message.created_at = datetime.now(UTC).replace(tzinfo=None)
+
+        self._pending.append(message)
+        if self.history_cache is not None:
+            self.history_cache.append(message)
+        logger.info(
+            f"Message queued: user_id={message.user_id}, "
+            f"chat_id={message.chat_id}, role={message.role}, pending={len(self._pending)}"
+        )
+
+        if len(self._pending) >= self.flush_batch_size * 10:
+            logger.warning(f"Write-behind queue overflow ({len(self._pending)}), flushing inline")
+            await self.flush()
+        elif len(self._pending) >= self.flush_batch_size:
+            self._flush_event.set()
+
+    async def _flush_loop(self) -> None:
+        """Фоновая задача: flush очереди по размеру или по таймеру."""
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            self._flush_event.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                # Сообщения остаются в очереди и будут записаны при следующей попытке
+                logger.error(f"Write-behind flush failed, will retry: {e}")
+
+    async def flush(self) -> None:
+        """Запись всех сообщений из очереди write-behind одним COPY.
+
+        Сообщения удаляются из очереди только после успешной записи,
+        поэтому при ошибке они будут записаны при следующем flush.
+        """
+        self._ensure_connected()
+        assert self._pool is not None
+
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            batch = list(self._pending)
+            records = [
+                (
+                    m.user_id,
+                    m.chat_id,
+                    m.role,
+                    m.content,
+                    m.content_length,
+                    m.username,
+                    m.token_count,
+                    m.created_at,
+                )
+                for m in batch
+            ]
+
+            try:
+                async with self._pool.acquire() as conn:
+                    await conn.copy_records_to_table(
+                        "messages",
+                        records=records,
+                        columns=[
+                            "user_id",
+                            "chat_id",
+                            "role",
+                            "content",
+                            "content_length",
+                            "username",
+                            "token_count",
+                            "created_at",
+                        ],
+                    )
+            except Exception as e:
+                logger.error(f"Database error while flushing {len(batch)} messages: {e}")
+                raise
+
+            del self._pending[: len(batch)]
+            logger.info(f"Flushed {len(batch)} messages, pending={len(self._pending)}")
+
+    def _pending_for(self, chat_id: int, user_id: int) -> list[Message]:
+        """Сообщения диалога, ещё не записанные в БД.
+
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+
+        Returns:
+            Список сообщений из очереди write-behind (от старых к новым)
+        """
+        return [m for m in self._pending if m.chat_id == chat_id and m.user_id == user_id]
+
+    async def get_history(
+        self, chat_id: int, user_id: int, limit: int, max_tokens: int | None = None
+    ) -> list[Message]:
         """Получение последних N активных сообщений из истории.
 
         Args:
             chat_id: ID чата
             user_id: ID пользователя
             limit: Максимальное количество сообщений
+            max_tokens: Бюджет токенов на историю (None - без ограничения);
+                из последних limit сообщений выбираются самые новые, помещающиеся в бюджет
 
         Returns:
             Список сообщений (от старых к новым)
@@ -164,12 +385,27 @@ class Database:
         self._ensure_connected()
         assert self._pool is not None
 
+        cache = self.history_cache
+        if cache is not None:
+            cached = cache.get(chat_id, user_id, limit)
+            if cached is not None:
+                logger.info(
+                    f"Retrieved {len(cached)} messages from history cache: "
+                    f"chat_id={chat_id}, user_id={user_id}"
+                )
+                return self._apply_token_budget(cached, max_tokens)
+            # Загружаем полное окно буфера, чтобы следующие запросы попадали в кэш
+            cache.begin_fill(chat_id, user_id)
+            fetch_limit = max(limit, cache.max_messages)
+        else:
+            fetch_limit = limit
+
         try:
             async with self._pool.acquire() as conn:
                 rows = await conn.fetch(
                     """
-                    SELECT id, user_id, chat_id, role, content, content_length, username,
-                           created_at, is_deleted
+                    SELECT id, user_id, chat_id, role, content, content_length, token_count,
+                           username, created_at, is_deleted
                     FROM messages
                     WHERE chat_id = $1 AND user_id = $2 AND is_deleted = FALSE
                     ORDER BY created_at DESC, id DESC
@@ -177,36 +413,194 @@ class Database:
                     """,
                     chat_id,
                     user_id,
-                    limit,
+                    fetch_limit,
                 )
 
                 # Преобразуем в список Message и разворачиваем (от старых к новым)
-                messages = [
-                    Message(
-                        id=row["id"],
-                        user_id=row["user_id"],
-                        chat_id=row["chat_id"],
-                        role=row["role"],
-                        content=row["content"],
-                        content_length=row["content_length"],
-                        username=row["username"],
-                        created_at=row["created_at"],
-                        is_deleted=row["is_deleted"],
-                    )
-                    for row in reversed(rows)
-                ]
+                messages = [self._row_to_message(row) for row in reversed(rows)]
+
+                if self.write_behind:
+                    messages = self._merge_pending(messages, chat_id, user_id, fetch_limit)
+
+                if cache is not None:
+                    cache.fill(chat_id, user_id, messages)
+                    messages = messages[-limit:] if limit > 0 else []
 
                 logger.info(
                     f"Retrieved {len(messages)} messages from history: "
                     f"chat_id={chat_id}, user_id={user_id}"
                 )
 
-                return messages
+                return self._apply_token_budget(messages, max_tokens)
 
         except Exception as e:
+            if cache is not None:
+                cache.cancel_fill(chat_id, user_id)
             logger.error(f"Database error while getting history: {e}")
             raise
 
+    async def append_and_get_history(
+        self, message: Message, limit: int, max_tokens: int | None = None
+    ) -> list[Message]:
+        """Сохранение сообщения и получение обновлённой истории за один round-trip.
+
+        INSERT и выборка последних сообщений выполняются одним запросом (CTE),
+        история уже включает только что сохранённое сообщение.
+        Если история диалога есть в кэше или включён write-behind,
+        выполняется только запись, а история берётся из памяти.
+
+        Args:
+            message: Сообщение для сохранения
+            limit: Максимальное количество сообщений в истории
+            max_tokens: Бюджет токенов на историю (None - без ограничения)
+
+        Returns:
+            Список сообщений (от старых к новым), последнее - сохранённое
+        """
+        self._ensure_connected()
+        assert self._pool is not None
+
+        cache = self.history_cache
+        cached = cache is not None and cache.covers(message.chat_id, message.user_id, limit)
+        if self.write_behind or cached:
+            await self.save_message(message)
+            return await self.get_history(
+                chat_id=message.chat_id,
+                user_id=message.user_id,
+                limit=limit,
+                max_tokens=max_tokens,
+            )
+
+        fetch_limit = max(limit, cache.max_messages) if cache is not None else limit
+        if cache is not None:
+            cache.begin_fill(message.chat_id, message.user_id)
+
+        try:
+            content_length = len(message.content)
+            token_count = estimate_tokens(message.content)
+
+            async with self._pool.acquire() as conn:
+                # Вставленная строка не видна в messages внутри того же запроса,
+                # поэтому она добавляется к выборке через UNION ALL
+                rows = await conn.fetch(
+                    """
+                    WITH inserted AS (
+                        INSERT INTO messages
+                            (user_id, chat_id, role, content, content_length, username,
+                             token_count)
+                        VALUES ($1, $2, $3, $4, $5, $6, $7)
+                        RETURNING id, user_id, chat_id, role, content, content_length,
+                                  token_count, username, created_at, is_deleted
+                    )
+                    SELECT * FROM inserted
+                    UNION ALL
+                    (
+                        SELECT id, user_id, chat_id, role, content, content_length,
+                               token_count, username, created_at, is_deleted
+                        FROM messages
+                        WHERE chat_id = $2 AND user_id = $1 AND is_deleted = FALSE
+                        ORDER BY created_at DESC, id DESC
+                        LIMIT $8
+                    )
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT $8
+                    """,
+                    message.user_id,
+                    message.chat_id,
+                    message.role,
+                    message.content,
+                    content_length,
+                    message.username,
+                    token_count,
+                    fetch_limit,
+                )
+
+            messages = [self._row_to_message(row) for row in reversed(rows)]
+
+            if cache is not None:
+                cache.fill(message.chat_id, message.user_id, messages)
+                messages = messages[-limit:] if limit > 0 else []
+
+            logger.info(
+                f"Message saved with history: user_id={message.user_id}, "
+                f"chat_id={message.chat_id}, role={message.role}, "
+                f"content_length={content_length}, history_length={len(messages)}"
+            )
+
+            return self._apply_token_budget(messages, max_tokens)
+
+        except Exception as e:
+            if cache is not None:
+                cache.cancel_fill(message.chat_id, message.user_id)
+            logger.error(f"Database error while saving message with history: {e}")
+            raise
+
+    @staticmethod
+    def _apply_token_budget(messages: list[Message], max_tokens: int | None) -> list[Message]:
+        """Обрезка истории по бюджету токенов.
+
+        Args:
+            messages: История (от старых к новым)
+            max_tokens: Бюджет токенов (None - без ограничения)
+
+        Returns:
+            Самые новые сообщения, помещающиеся в бюджет
+        """
+        if max_tokens is None:
+            return messages
+        return fit_token_budget(messages, max_tokens)
+
+    @staticmethod
+    def _row_to_message(row: Any) -> Message:
+        """Преобразование строки таблицы messages в Message.
+
+        Args:
+            row: Строка результата запроса (asyncpg.Record)
+
+        Returns:
+            Сообщение
+        """
+        return Message(
+            id=row["id"],
+            user_id=row["user_id"],
+            chat_id=row["chat_id"],
+            role=row["role"],
+            content=row["content"],
+            content_length=row["content_length"],
+            token_count=row["token_count"],
+            username=row["username"],
+            created_at=row["created_at"],
+            is_deleted=row["is_deleted"],
+        )
+
+    def _merge_pending(
+        self, messages: list[Message], chat_id: int, user_id: int, limit: int
+    ) -> list[Message]:
+        """Дополнение истории из БД сообщениями из очереди write-behind.
+
+        Сообщение может одновременно оказаться и в выборке, и в очереди,
+        если flush завершился во время чтения, поэтому дубликаты
+        отбрасываются по (created_at, role, content).
+
+        Args:
+            messages: История из БД (от старых к новым)
+            chat_id: ID чата
+            user_id: ID пользователя
+            limit: Максимальное количество сообщений
+
+        Returns:
+            Объединённая история (от старых к новым)
+        """
+        pending = self._pending_for(chat_id, user_id)
+        if not pending:
+            return messages
+
+        stored = {(m.created_at, m.role, m.content) for m in messages}
+        merged = messages + [m for m in pending if (m.created_at, m.role, m.content) not in stored]
+        # created_at в БД - naive TIMESTAMP (UTC)
+        merged.sort(key=lambda m: m.created_at or datetime.min)  # noqa: DTZ901
+        return merged[-limit:] if limit > 0 else []
+
     async def clear_history(self, chat_id: int, user_id: int) -> None:
         """Очистка истории для пользователя (soft delete).
 
@@ -217,6 +611,10 @@ class Database:
         self._ensure_connected()
         assert self._pool is not None
 
+        if self.write_behind:
+            # Сообщения из очереди тоже должны попасть под soft delete
+            await self.flush()
+
         try:
             async with self._pool.acquire() as conn:
                 await conn.execute(
@@ -229,6 +627,9 @@ class Database:
                     user_id,
                 )
 
+            if self.history_cache is not None:
+                self.history_cache.invalidate(chat_id, user_id)
+
             logger.info(f"History cleared (soft delete): chat_id={chat_id}, user_id={user_id}")
 
         except Exception as e:
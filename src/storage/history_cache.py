@@ -0,0 +1,199 @@
+"""In-process кэш истории диалогов."""
+
+import logging
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+
+from src.storage.models import Message
+
+logger = logging.getLogger(__name__)
+
+DialogKey = tuple[int, int]
+
+
+@dataclass
+class CacheStats:
+    """Счётчики работы кэша истории.
+
+    Attributes:
+        hits: Запросы истории, обслуженные из кэша
+        misses: Запросы истории, ушедшие в БД
+        evictions: Диалоги, вытесненные из кэша по LRU
+        invalidations: Диалоги, удалённые из кэша явно (clear_history)
+        size: Текущее количество диалогов в кэше
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля попаданий среди всех запросов (0.0 если запросов не было)."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class _DialogEntry:
+    """Кольцевой буфер последних сообщений одного диалога.
+
+    complete=True означает, что буфер содержит всю активную историю диалога
+    (при загрузке из БД пришло меньше сообщений, чем вмещает буфер).
+    """
+
+    __slots__ = ("messages", "complete")
+
+    def __init__(self, messages: list[Message], max_messages: int, complete: bool):
+        self.messages: deque[Message] = deque(messages, maxlen=max_messages)
+        self.complete = complete
+
+
+class HistoryCache:
+    """Ограниченный LRU кэш последних сообщений по (chat_id, user_id).
+
+    Для каждого диалога хранится кольцевой буфер из max_messages сообщений.
+    Кэш рассчитан на одного писателя: все записи в диалог должны проходить
+    через тот же процесс (Database.save_message / clear_history).
+    """
+
+    def __init__(self, max_dialogs: int, max_messages: int):
+        """Инициализация кэша.
+
+        Args:
+            max_dialogs: Максимальное количество диалогов в кэше
+            max_messages: Размер кольцевого буфера на диалог
+        """
+        self.max_dialogs = max_dialogs
+        self.max_messages = max_messages
+        self._entries: OrderedDict[DialogKey, _DialogEntry] = OrderedDict()
+        # Диалоги, для которых идёт загрузка из БД: True - во время загрузки была запись
+        self._loading: dict[DialogKey, bool] = {}
+        self._stats = CacheStats()
+        logger.info(
+            f"HistoryCache initialized: max_dialogs={max_dialogs}, max_messages={max_messages}"
+        )
+
+    @property
+    def stats(self) -> CacheStats:
+        """Снимок счётчиков кэша."""
+        return CacheStats(
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            evictions=self._stats.evictions,
+            invalidations=self._stats.invalidations,
+            size=len(self._entries),
+        )
+
+    def get(self, chat_id: int, user_id: int, limit: int) -> list[Message] | None:
+        """Получение последних limit сообщений диалога из кэша.
+
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+            limit: Максимальное количество сообщений
+
+        Returns:
+            Список сообщений (от старых к новым) или None при промахе
+        """
+        key = (chat_id, user_id)
+        if not self.covers(chat_id, user_id, limit):
+            self._stats.misses += 1
+            return None
+
+        entry = self._entries[key]
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+        messages = list(entry.messages)
+        return messages[-limit:] if limit > 0 else []
+
+    def covers(self, chat_id: int, user_id: int, limit: int) -> bool:
+        """Проверка, будет ли запрос истории обслужен из кэша (без учёта в stats).
+
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+            limit: Максимальное количество сообщений
+
+        Returns:
+            True если get() с такими параметрами вернёт историю из кэша
+        """
+        entry = self._entries.get((chat_id, user_id))
+        return entry is not None and (limit <= len(entry.messages) or entry.complete)
+
+    def begin_fill(self, chat_id: int, user_id: int) -> None:
+        """Отметка о начале загрузки истории диалога из БД.
+
+        Записи в диалог во время загрузки делают результат устаревшим,
+        и последующий fill() будет отклонён.
+
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+        """
+        self._loading.setdefault((chat_id, user_id), False)
+
+    def fill(self, chat_id: int, user_id: int, messages: list[Message]) -> None:
+        """Заполнение кэша историей, загруженной из БД.
+
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+            messages: Последние сообщения диалога (от старых к новым),
+                загруженные с limit >= max_messages
+        """
+        key = (chat_id, user_id)
+        if self._loading.pop(key, True):
+            # Во время загрузки диалог изменился (или fill без begin_fill)
+            return
+
+        self._entries[key] = _DialogEntry(
+            messages, self.max_messages, complete=len(messages) < self.max_messages
+        )
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_dialogs:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    def cancel_fill(self, chat_id: int, user_id: int) -> None:
+        """Отмена загрузки истории (например, при ошибке БД).
+
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+        """
+        self._loading.pop((chat_id, user_id), None)
+
+    def append(self, message: Message) -> None:
+        """Добавление нового сообщения в буфер диалога, если он закэширован.
+
+        Args:
+            message: Сохранённое сообщение
+        """
+        key = (message.chat_id, message.user_id)
+        if key in self._loading:
+            self._loading[key] = True
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+
+        if len(entry.messages) == self.max_messages:
+            entry.complete = False
+        entry.messages.append(message)
+
+    def invalidate(self, chat_id: int, user_id: int) -> None:
+        """Удаление диалога из кэша.
+
+        Args:
+            chat_id: ID чата
+            user_id: ID пользователя
+        """
+        key = (chat_id, user_id)
+        if key in self._loading:
+            self._loading[key] = True
+
+        if self._entries.pop(key, None) is not None:
+            self._stats.invalidations += 1
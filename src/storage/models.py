@@ -16,6 +16,7 @@ class Message:
         content: Текст сообщения
         content_length: Длина контента в символах (вычисляется автоматически)
         username: Telegram username пользователя (или user_id как строка, если username отсутствует)
+        token_count: Оценка количества токенов контента (вычисляется автоматически)
         id: ID сообщения в БД (опционально)
         created_at: Время создания (опционально)
         is_deleted: Флаг мягкого удаления (False - активное, True - удалённое)
@@ -27,6 +28,7 @@ class Message:
     content: str
     content_length: int
     username: str
+    token_count: int | None = None
     id: int | None = None
     created_at: datetime | None = None
     is_deleted: bool = False
@@ -24,19 +24,37 @@ class DatabaseProtocol(Protocol):
         """
         ...
 
-    async def get_history(self, chat_id: int, user_id: int, limit: int) -> list[Message]:
+    async def get_history(
+        self, chat_id: int, user_id: int, limit: int, max_tokens: int | None = None
+    ) -> list[Message]:
         """Получение истории сообщений.
 
         Args:
             chat_id: ID чата
             user_id: ID пользователя
             limit: Максимальное количество сообщений
+            max_tokens: Бюджет токенов на историю (None - без ограничения)
 
         Returns:
             Список сообщений (от старых к новым)
         """
         ...
 
+    async def append_and_get_history(
+        self, message: Message, limit: int, max_tokens: int | None = None
+    ) -> list[Message]:
+        """Сохранение сообщения и получение обновлённой истории за один round-trip.
+
+        Args:
+            message: Сообщение для сохранения
+            limit: Максимальное количество сообщений в истории
+            max_tokens: Бюджет токенов на историю (None - без ограничения)
+
+        Returns:
+            Список сообщений (от старых к новым), включая сохранённое
+        """
+        ...
+
     async def clear_history(self, chat_id: int, user_id: int) -> None:
         """Очистка истории для пользователя.
 
@@ -0,0 +1,76 @@
+"""Оценка количества токенов и выбор истории по бюджету токенов."""
+
+import math
+import re
+
+from src.storage.models import Message
+
+# Слова (буквы/цифры) и отдельные прочие непробельные символы (пунктуация, эмодзи)
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Средняя длина токена в символах для BPE токенизаторов:
+# латиница кодируется плотнее, кириллица и прочие алфавиты - хуже
+_ASCII_CHARS_PER_TOKEN = 4
+_NON_ASCII_CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Быстрая локальная оценка количества токенов в тексте.
+
+    Не требует загрузки токенизатора модели: слова делятся на токены
+    по средней длине токена (отдельно для ASCII и остальных алфавитов),
+    каждый знак пунктуации и эмодзи считается отдельным токеном.
+
+    Args:
+        text: Текст сообщения
+
+    Returns:
+        Оценка количества токенов (>= 1 для непустого текста)
+    """
+    tokens = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        if len(piece) == 1:
+            tokens += 1
+        elif piece.isascii():
+            tokens += math.ceil(len(piece) / _ASCII_CHARS_PER_TOKEN)
+        else:
+            tokens += math.ceil(len(piece) / _NON_ASCII_CHARS_PER_TOKEN)
+    return tokens
+
+
+def message_tokens(message: Message) -> int:
+    """Количество токенов сообщения с кэшированием в message.token_count.
+
+    Args:
+        message: Сообщение (token_count может быть не заполнен для старых записей)
+
+    Returns:
+        Количество токенов
+    """
+    if message.token_count is None:
+        message.token_count = estimate_tokens(message.content)
+    return message.token_count
+
+
+def fit_token_budget(messages: list[Message], max_tokens: int) -> list[Message]:
+    """Выбор самых новых сообщений, помещающихся в бюджет токенов.
+
+    Самое новое сообщение включается всегда, даже если оно больше бюджета,
+    чтобы в запрос к LLM попал текущий вопрос пользователя.
+
+    Args:
+        messages: История (от старых к новым)
+        max_tokens: Бюджет токенов на историю
+
+    Returns:
+        Суффикс истории (от старых к новым), укладывающийся в бюджет
+    """
+    total = 0
+    start = len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        tokens = message_tokens(messages[i])
+        if start < len(messages) and total + tokens > max_tokens:
+            break
+        total += tokens
+        start = i
+    return messages[start:]
@@ -1,13 +1,16 @@
 """Тесты для Real API статистики с PostgreSQL."""
 
-from datetime import UTC, datetime, timedelta
+from datetime import UTC, date, datetime, timedelta
 
 import asyncpg  # type: ignore[import-untyped]
 import pytest
 
 from backend.api.collectors import RealStatCollector
 from backend.api.config import APIConfig
-from backend.api.models import PeriodEnum, TrendEnum
+from backend.api.hll import HyperLogLog
+from backend.api.models import GranularityEnum, PeriodEnum, TrendEnum
+from backend.api.rollup import RollupRefresher
+from src.storage.database import Database
 
 
 @pytest.fixture
@@ -28,9 +31,21 @@ async def db_pool() -> asyncpg.Pool:
         max_size=2,
     )
     
-    # Очищаем таблицу перед тестами
+    # Применяем миграции (таблицы rollup) и очищаем таблицы перед тестами
+    async with Database(
+        host=config.postgres_host,
+        port=config.postgres_port,
+        database=config.postgres_db,
+        user=config.postgres_user,
+        password=config.postgres_password,
+    ):
+        pass
     async with pool.acquire() as conn:
         await conn.execute("DELETE FROM messages")
+        await conn.execute("DELETE FROM message_daily_rollup")
+        await conn.execute("DELETE FROM message_rollup_days")
+        await conn.execute("DELETE FROM message_daily_stats")
+        await conn.execute("DELETE FROM message_hourly_stats")
     
     yield pool
     
@@ -140,6 +155,18 @@ class TestRealStatCollector:
         assert stats.metrics.total_messages.change > 0
         assert stats.metrics.total_messages.value == 70.0
 
+    @pytest.mark.asyncio
+    async def test_previous_period_metrics(self, populated_db: asyncpg.Pool) -> None:
+        """Тест: метрики предыдущего периода из того же запроса, что и текущего."""
+        collector = RealStatCollector(populated_db)
+        stats = await collector.get_stats(PeriodEnum.SEVEN_DAYS)
+        
+        # Предыдущий период [now-14d, now-7d) - дни 8-13: 48 сообщений (70 vs 48),
+        # пользователи и диалоги: 10 vs 8 (+25%)
+        assert stats.metrics.total_messages.change == 45.8
+        assert stats.metrics.active_users.change == 25.0
+        assert stats.metrics.total_dialogs.change == 25.0
+
     @pytest.mark.asyncio
     async def test_trend_calculation(self, populated_db: asyncpg.Pool) -> None:
         """Тест определения тренда."""
@@ -302,3 +329,204 @@ class TestRealStatCollector:
         assert stats.metrics.total_messages.trend == TrendEnum.DOWN
         assert stats.metrics.total_messages.change < -5.0
 
+
+
+class TestStatsRollup:
+    """Тесты дневного rollup для статистики."""
+
+    def test_split_range(self) -> None:
+        """Тест: из rollup берутся только целые агрегированные дни."""
+        start = datetime(2024, 1, 1, 12, 0)
+        end = datetime(2024, 1, 5, 8, 0)
+        rolled = {date(2024, 1, 2), date(2024, 1, 4), date(2024, 1, 5)}
+
+        days, ranges = RealStatCollector._split_range(start, end, rolled)
+
+        # 5 января неполный (до 08:00), 3 января не агрегирован
+        assert days == [date(2024, 1, 2), date(2024, 1, 4)]
+        assert ranges == [
+            (datetime(2024, 1, 1, 12, 0), datetime(2024, 1, 2)),
+            (datetime(2024, 1, 3), datetime(2024, 1, 4)),
+            (datetime(2024, 1, 5), datetime(2024, 1, 5, 8, 0)),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stats_same_with_rollup(self, populated_db: asyncpg.Pool) -> None:
+        """Тест: статистика по rollup совпадает со статистикой по сырым строкам."""
+        collector = RealStatCollector(populated_db)
+        raw = await collector.get_stats(PeriodEnum.SEVEN_DAYS)
+
+        assert await RollupRefresher(populated_db).refresh() > 0
+        rolled = await collector.get_stats(PeriodEnum.SEVEN_DAYS)
+
+        assert rolled.metrics == raw.metrics
+        assert rolled.timeline == raw.timeline
+
+    @pytest.mark.asyncio
+    async def test_refresh_is_incremental(self, populated_db: asyncpg.Pool) -> None:
+        """Тест: повторное обновление пересчитывает только последние lookback_days дней."""
+        refresher = RollupRefresher(populated_db, lookback_days=2)
+        today = datetime.now(UTC).date()
+
+        async def rolled_today() -> int:
+            async with populated_db.acquire() as conn:
+                return await conn.fetchval(
+                    "SELECT COUNT(*) FROM message_daily_rollup WHERE day = $1", today
+                )
+
+        # Первое обновление агрегирует все закрытые дни (сообщения за 14 дней)
+        assert await refresher.refresh(today) == 14
+        assert await refresher.refresh(today) == 2
+        assert await rolled_today() == 0
+
+        # На следующий день сегодняшний день закрывается и попадает в rollup
+        assert await refresher.refresh(today + timedelta(days=1)) == 2
+        assert await rolled_today() == 10
+
+    @pytest.mark.asyncio
+    async def test_closed_days_read_from_rollup(self, db_pool: asyncpg.Pool) -> None:
+        """Тест: закрытые дни читаются из rollup, сегодняшний день - из messages."""
+        now = datetime.now(UTC).replace(tzinfo=None)
+        closed_day = (now - timedelta(days=3)).date()
+        async with db_pool.acquire() as conn:
+            # Закрытый день есть только в rollup (сырые строки уже удалены)
+            await conn.execute(
+                "INSERT INTO message_daily_rollup (day, chat_id, user_id, messages) "
+                "VALUES ($1, 1, 1, 5), ($1, 2, 2, 3)",
+                closed_day,
+            )
+            await conn.execute("INSERT INTO message_rollup_days (day) VALUES ($1)", closed_day)
+            await conn.execute(
+                "INSERT INTO message_daily_stats (day, messages, active_users, total_dialogs, "
+                "users_hll, dialogs_hll) VALUES ($1, 8, 2, 2, $2, $2)",
+                closed_day,
+                HyperLogLog().to_bytes(),
+            )
+            await conn.execute(
+                """
+                INSERT INTO messages (user_id, chat_id, role, content, content_length, username, created_at)
+                VALUES (1, 1, 'user', 'today', 5, 'user1', $1)
+                """,
+                now - timedelta(seconds=1),
+            )
+
+        collector = RealStatCollector(db_pool)
+        stats = await collector.get_stats(PeriodEnum.SEVEN_DAYS)
+
+        assert stats.metrics.total_messages.value == 9.0
+        assert stats.metrics.active_users.value == 2.0
+        assert stats.metrics.total_dialogs.value == 2.0
+        points = {point.date: point.total_messages for point in stats.timeline}
+        assert points[closed_day.strftime("%Y-%m-%d")] == 8
+        assert points[now.strftime("%Y-%m-%d")] == 1
+
+    @pytest.mark.asyncio
+    async def test_approximate_mode(self, populated_db: asyncpg.Pool) -> None:
+        """Тест: приближённый режим по HLL скетчам близок к точному."""
+        await RollupRefresher(populated_db).refresh()
+
+        exact = await RealStatCollector(populated_db).get_stats(PeriodEnum.SEVEN_DAYS)
+        approx = await RealStatCollector(populated_db, approximate=True).get_stats(
+            PeriodEnum.SEVEN_DAYS
+        )
+
+        assert approx.approximate is True
+        assert exact.approximate is False
+        # Сообщения и timeline точные, на малых множествах оценка HLL тоже точна
+        assert approx.metrics == exact.metrics
+        assert approx.timeline == exact.timeline
+
+    @pytest.mark.asyncio
+    async def test_refresh_builds_daily_stats(self, populated_db: asyncpg.Pool) -> None:
+        """Тест: обновление rollup заполняет дневные итоги и скетчи."""
+        await RollupRefresher(populated_db).refresh()
+
+        async with populated_db.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT messages, active_users, total_dialogs, users_hll FROM message_daily_stats"
+            )
+
+        # Дни 1-6 по 10 пользователей, дни 8-14 по 8 (день 7 без сообщений)
+        assert len(rows) == 13
+        assert {(r["messages"], r["active_users"], r["total_dialogs"]) for r in rows} == {
+            (10, 10, 10),
+            (8, 8, 8),
+        }
+        assert all(HyperLogLog(registers=r["users_hll"]).count() in (8, 10) for r in rows)
+
+
+class TestTimelineGranularity:
+    """Тесты timeline по часам и произвольного диапазона."""
+
+    @pytest.mark.asyncio
+    async def test_hourly_timeline(self, populated_db: asyncpg.Pool) -> None:
+        """Тест: 24h по умолчанию по часам, пустые часы заполнены нулями."""
+        collector = RealStatCollector(populated_db)
+        stats = await collector.get_stats(PeriodEnum.TWENTY_FOUR_HOURS)
+
+        assert stats.granularity == GranularityEnum.HOUR
+        # Первый час неполный, поэтому точек 24 или 25
+        assert len(stats.timeline) in (24, 25)
+        for point in stats.timeline:
+            datetime.strptime(point.date, "%Y-%m-%dT%H:00")
+        assert [point.date for point in stats.timeline] == sorted(
+            {point.date for point in stats.timeline}
+        )
+
+        # Сообщения только за последний час (10 пользователей)
+        assert stats.metrics.total_messages.value == 10.0
+        assert sum(point.total_messages for point in stats.timeline) == 10
+        assert stats.timeline[-1].total_messages == 10
+        assert stats.timeline[-1].active_users == 10
+        assert all(point.total_messages == 0 for point in stats.timeline[:-1])
+
+    @pytest.mark.asyncio
+    async def test_hourly_same_with_rollup(self, populated_db: asyncpg.Pool) -> None:
+        """Тест: часы закрытых дней из message_hourly_stats совпадают с сырыми."""
+        collector = RealStatCollector(populated_db)
+        raw = await collector.get_stats(PeriodEnum.FORTY_EIGHT_HOURS)
+
+        await RollupRefresher(populated_db).refresh()
+        async with populated_db.acquire() as conn:
+            hours = await conn.fetchval("SELECT COUNT(*) FROM message_hourly_stats")
+        rolled = await collector.get_stats(PeriodEnum.FORTY_EIGHT_HOURS)
+
+        # Закрытые дни с сообщениями: 1-6 и 8-14 дней назад, по одному часу в день
+        assert hours == 13
+        assert rolled.metrics == raw.metrics
+        assert rolled.timeline == raw.timeline
+        assert sum(point.total_messages for point in rolled.timeline) == 20
+
+    @pytest.mark.asyncio
+    async def test_custom_range(self, populated_db: asyncpg.Pool) -> None:
+        """Тест: произвольный диапазон и сравнение с предыдущим диапазоном той же длины."""
+        today = datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = today - timedelta(days=3)
+        end = today - timedelta(days=1)
+        collector = RealStatCollector(populated_db)
+
+        daily = await collector.get_stats(PeriodEnum.CUSTOM, start=start, end=end)
+        hourly = await collector.get_stats(
+            PeriodEnum.CUSTOM, GranularityEnum.HOUR, start=start, end=end
+        )
+
+        assert daily.period == PeriodEnum.CUSTOM
+        assert [point.date for point in daily.timeline] == [
+            start.strftime("%Y-%m-%d"),
+            (start + timedelta(days=1)).strftime("%Y-%m-%d"),
+        ]
+        assert daily.metrics.total_messages.value == 20.0
+        assert len(hourly.timeline) == 48
+        assert hourly.metrics == daily.metrics
+        assert sum(point.total_messages for point in hourly.timeline) == 20
+
+    @pytest.mark.asyncio
+    async def test_custom_range_validation(self, db_pool: asyncpg.Pool) -> None:
+        """Тест: custom без начала и пустой диапазон отклоняются."""
+        collector = RealStatCollector(db_pool)
+        now = datetime.now(UTC)
+
+        with pytest.raises(ValueError):
+            await collector.get_stats(PeriodEnum.CUSTOM)
+        with pytest.raises(ValueError):
+            await collector.get_stats(PeriodEnum.CUSTOM, start=now, end=now - timedelta(hours=1))
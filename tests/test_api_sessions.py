@@ -0,0 +1,87 @@
+"""Тесты для SessionMapper (session_id веб-чата -> chat_id) с PostgreSQL."""
+
+import asyncio
+
+import pytest
+
+from backend.api.sessions import SessionMapper
+from src.storage.database import Database
+
+
+@pytest.fixture
+async def pool():
+    """Фикстура: pool тестовой БД с применёнными миграциями и пустой web_sessions."""
+    database = Database(
+        host="localhost",
+        port=5432,
+        database="systech_aidd",
+        user="postgres",
+        password="postgres",
+    )
+    async with database:
+        async with database.pool.acquire() as conn:
+            await conn.execute("TRUNCATE TABLE web_sessions")
+        yield database.pool
+
+
+@pytest.mark.asyncio
+async def test_same_session_same_chat_id_across_mappers(pool):
+    """Тест: chat_id сессии одинаков для разных процессов (разных SessionMapper)."""
+    first = await SessionMapper(pool).get_chat_id("session-a")
+    second = await SessionMapper(pool).get_chat_id("session-a")
+
+    assert first == second
+
+
+@pytest.mark.asyncio
+async def test_chat_id_in_web_range(pool):
+    """Тест: chat_id веб-сессий отрицательные и вне диапазона Telegram."""
+    mapper = SessionMapper(pool)
+    a = await mapper.get_chat_id("session-a")
+    b = await mapper.get_chat_id("session-b")
+
+    assert a != b
+    assert a < -(2**52) and b < -(2**52)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_access(pool):
+    """Тест: параллельное первое обращение к одной сессии даёт один chat_id."""
+    mappers = [SessionMapper(pool) for _ in range(5)]
+
+    chat_ids = await asyncio.gather(*(m.get_chat_id("racy") for m in mappers))
+
+    assert len(set(chat_ids)) == 1
+    async with pool.acquire() as conn:
+        assert await conn.fetchval("SELECT COUNT(*) FROM web_sessions") == 1
+
+
+@pytest.mark.asyncio
+async def test_find_chat_id_does_not_create(pool):
+    """Тест: find_chat_id не создаёт сессию, но находит существующую."""
+    mapper = SessionMapper(pool)
+
+    assert await mapper.find_chat_id("unknown") is None
+    created = await mapper.get_chat_id("known")
+    assert await SessionMapper(pool).find_chat_id("known") == created
+
+    async with pool.acquire() as conn:
+        assert await conn.fetchval("SELECT COUNT(*) FROM web_sessions") == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_repeated_lookups(pool):
+    """Тест: повторные обращения обслуживаются из LRU кэша, старые сессии вытесняются."""
+    mapper = SessionMapper(pool, max_cached=2)
+    a = await mapper.get_chat_id("a")
+    await mapper.get_chat_id("b")
+    await mapper.get_chat_id("a")
+    await mapper.get_chat_id("c")
+
+    # "b" вытеснена как давно не использованная
+    assert list(mapper._cache) == ["a", "c"]
+
+    async with pool.acquire() as conn:
+        await conn.execute("TRUNCATE TABLE web_sessions")
+    # Кэш отвечает без обращения к БД
+    assert await mapper.get_chat_id("a") == a
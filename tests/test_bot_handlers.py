@@ -1,20 +1,35 @@
 """Тесты для BotHandlers класса."""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from aiogram.types import Chat, User
 from aiogram.types import Message as TelegramMessage
 
-from src.bot.handlers import BotHandlers
+from src.bot.handlers import BUSY_TEXT, BotHandlers
+from src.llm.admission import LLMBusyError
+from src.llm.streaming import ResponseStream
 from src.storage.models import Message
 
 
+async def async_iter(items):
+    """Хелпер: асинхронный итератор по списку."""
+    for item in items:
+        yield item
+
+
+def stream_of(*deltas: str):
+    """Хелпер: side_effect для stream_response, возвращающий поток из дельт."""
+    return lambda **kwargs: ResponseStream(async_iter(list(deltas)))
+
+
 @pytest.fixture
 def mock_llm_client():
     """Фикстура для мокового LLMClient."""
     client = AsyncMock()
     client.get_response = AsyncMock(return_value="LLM response")
+    client.stream_response = MagicMock(side_effect=stream_of("LLM ", "response"))
     return client
 
 
@@ -23,6 +38,7 @@ def mock_database():
     """Фикстура для моковой Database."""
     db = AsyncMock()
     db.save_message = AsyncMock()
+    db.append_and_get_history = AsyncMock(return_value=[])
     db.get_history = AsyncMock(return_value=[])
     db.clear_history = AsyncMock()
     return db
@@ -34,6 +50,10 @@ def mock_config():
     config = MagicMock()
     config.system_prompt = "Test system prompt"
     config.max_history_messages = 10
+    config.history_token_budget = 2000
+    config.stream_edit_interval_ms = 1000
+    config.stream_edit_min_chars = 40
+    config.typing_heartbeat_interval = 4.0
     return config
 
 
@@ -52,7 +72,11 @@ def create_mock_message(text: str, user_id: int = 123, chat_id: int = 123):
     msg.from_user.username = "test_user"
     msg.chat = MagicMock(spec=Chat)
     msg.chat.id = chat_id
-    msg.answer = AsyncMock()
+    msg.placeholder = MagicMock()
+    msg.placeholder.edit_text = AsyncMock()
+    msg.placeholder.answer = AsyncMock()
+    msg.placeholder.delete = AsyncMock()
+    msg.answer = AsyncMock(return_value=msg.placeholder)
     msg.bot = MagicMock()
     msg.bot.send_chat_action = AsyncMock()
     return msg
@@ -80,9 +104,9 @@ async def test_handle_message_saves_user_message(handlers, mock_database):
 
     await handlers.handle_message(msg)
 
-    # Проверяем что save_message вызван для user сообщения
-    assert mock_database.save_message.call_count == 2  # user + assistant
-    first_call = mock_database.save_message.call_args_list[0][0][0]
+    # Проверяем что user сообщение сохранено вместе с загрузкой истории
+    mock_database.append_and_get_history.assert_called_once()
+    first_call = mock_database.append_and_get_history.call_args[0][0]
     assert first_call.role == "user"
     assert first_call.content == "Hello bot"
     assert first_call.user_id == 100
@@ -96,10 +120,12 @@ async def test_handle_message_loads_history(handlers, mock_database, mock_config
 
     await handlers.handle_message(msg)
 
-    # Проверяем что get_history вызван с правильными параметрами
-    mock_database.get_history.assert_called_once_with(
-        chat_id=123, user_id=123, limit=mock_config.max_history_messages
-    )
+    # Проверяем что история загружена одним запросом вместе с сохранением
+    mock_database.append_and_get_history.assert_called_once()
+    call_kwargs = mock_database.append_and_get_history.call_args.kwargs
+    assert call_kwargs["limit"] == mock_config.max_history_messages
+    assert call_kwargs["max_tokens"] == mock_config.history_token_budget
+    mock_database.get_history.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -118,13 +144,13 @@ async def test_handle_message_calls_llm(handlers, mock_llm_client, mock_database
             username="test_user",
         )
     ]
-    mock_database.get_history.return_value = history
+    mock_database.append_and_get_history.return_value = history
 
     await handlers.handle_message(msg)
 
     # Проверяем что LLM вызван
-    mock_llm_client.get_response.assert_called_once_with(
-        messages=history, system_prompt=mock_config.system_prompt
+    mock_llm_client.stream_response.assert_called_once_with(
+        messages=history, system_prompt=mock_config.system_prompt, chat_id=123
     )
 
 
@@ -132,13 +158,13 @@ async def test_handle_message_calls_llm(handlers, mock_llm_client, mock_database
 async def test_handle_message_saves_assistant_response(handlers, mock_database, mock_llm_client):
     """Тест что ответ ассистента сохраняется в БД."""
     msg = create_mock_message("Question")
-    mock_llm_client.get_response.return_value = "Answer from LLM"
+    mock_llm_client.stream_response.side_effect = stream_of("Answer ", "from ", "LLM")
 
     await handlers.handle_message(msg)
 
     # Проверяем что save_message вызван для assistant сообщения
-    assert mock_database.save_message.call_count == 2
-    second_call = mock_database.save_message.call_args_list[1][0][0]
+    assert mock_database.save_message.call_count == 1
+    second_call = mock_database.save_message.call_args_list[0][0][0]
     assert second_call.role == "assistant"
     assert second_call.content == "Answer from LLM"
 
@@ -147,12 +173,40 @@ async def test_handle_message_saves_assistant_response(handlers, mock_database,
 async def test_handle_message_sends_response_to_user(handlers, mock_llm_client):
     """Тест что ответ отправляется пользователю."""
     msg = create_mock_message("Test")
-    mock_llm_client.get_response.return_value = "Bot response"
+    mock_llm_client.stream_response.side_effect = stream_of("Bot ", "response")
+
+    await handlers.handle_message(msg)
+
+    # Проверяем что отправлена заглушка, а финальная правка содержит ответ LLM
+    msg.answer.assert_called_once()
+    msg.placeholder.edit_text.assert_called_with("Bot response")
+
+
+@pytest.mark.asyncio
+async def test_handle_message_streams_progressively(handlers, mock_llm_client):
+    """Тест что первый фрагмент показывается сразу, а правки throttled."""
+    msg = create_mock_message("Test")
+    mock_llm_client.stream_response.side_effect = stream_of("Hi", "!", " there")
+
+    await handlers.handle_message(msg)
+
+    edits = [c.args[0] for c in msg.placeholder.edit_text.call_args_list]
+    # Первый токен сразу (без parse_mode), остальные - в пределах интервала пропущены,
+    # в конце - финальная правка с полным текстом
+    assert edits == ["Hi", "Hi! there"]
+    assert msg.placeholder.edit_text.call_args_list[0].kwargs["parse_mode"] is None
+
+
+@pytest.mark.asyncio
+async def test_handle_message_long_response_split(handlers, mock_llm_client):
+    """Тест что ответ длиннее лимита Telegram дописывается отдельным сообщением."""
+    msg = create_mock_message("Test")
+    mock_llm_client.stream_response.side_effect = stream_of("a" * 5000)
 
     await handlers.handle_message(msg)
 
-    # Проверяем что answer вызван с ответом LLM
-    msg.answer.assert_called_once_with("Bot response")
+    msg.placeholder.edit_text.assert_called_with("a" * 4096)
+    msg.placeholder.answer.assert_called_once_with("a" * 904, parse_mode=None)
 
 
 @pytest.mark.asyncio
@@ -166,6 +220,48 @@ async def test_handle_message_shows_typing_action(handlers):
     msg.bot.send_chat_action.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_handle_message_typing_not_on_critical_path(handlers, mock_llm_client):
+    """Тест что медленный send_chat_action не задерживает запрос к LLM и ответ."""
+    msg = create_mock_message("Test")
+    typing_started = asyncio.Event()
+
+    async def slow_chat_action(**kwargs):
+        typing_started.set()
+        await asyncio.sleep(10)
+
+    msg.bot.send_chat_action = AsyncMock(side_effect=slow_chat_action)
+
+    await asyncio.wait_for(handlers.handle_message(msg), timeout=1.0)
+
+    assert typing_started.is_set()
+    mock_llm_client.stream_response.assert_called_once()
+    msg.placeholder.edit_text.assert_called()
+
+
+@pytest.mark.asyncio
+async def test_handle_message_refreshes_typing_during_long_reply(
+    handlers, mock_llm_client, mock_config
+):
+    """Тест что индикатор 'печатает' обновляется, пока генерируется длинный ответ."""
+    mock_config.typing_heartbeat_interval = 0.01
+    msg = create_mock_message("Test")
+
+    async def slow_deltas():
+        await asyncio.sleep(0.1)
+        yield "Long answer"
+
+    mock_llm_client.stream_response.side_effect = lambda **kwargs: ResponseStream(slow_deltas())
+
+    await handlers.handle_message(msg)
+    calls_after_reply = msg.bot.send_chat_action.call_count
+    await asyncio.sleep(0.05)
+
+    assert calls_after_reply >= 3
+    # После ответа индикатор больше не обновляется
+    assert msg.bot.send_chat_action.call_count == calls_after_reply
+
+
 @pytest.mark.asyncio
 async def test_handle_message_without_text_ignores(handlers, mock_database):
     """Тест что сообщения без текста игнорируются."""
@@ -176,13 +272,14 @@ async def test_handle_message_without_text_ignores(handlers, mock_database):
 
     # Проверяем что ничего не вызвано
     mock_database.save_message.assert_not_called()
+    mock_database.append_and_get_history.assert_not_called()
 
 
 @pytest.mark.asyncio
 async def test_handle_message_error_sends_error_message(handlers, mock_llm_client):
     """Тест обработки ошибки при работе с LLM."""
     msg = create_mock_message("Test")
-    mock_llm_client.get_response.side_effect = Exception("LLM Error")
+    mock_llm_client.stream_response.side_effect = Exception("LLM Error")
 
     await handlers.handle_message(msg)
 
@@ -192,6 +289,89 @@ async def test_handle_message_error_sends_error_message(handlers, mock_llm_clien
     assert "ошибка" in error_msg.lower()
 
 
+@pytest.mark.asyncio
+async def test_handle_message_busy_sends_busy_message(handlers, mock_llm_client):
+    """Тест быстрого ответа "занято" при переполненной очереди к LLM."""
+    msg = create_mock_message("Test")
+
+    async def busy():
+        raise LLMBusyError("LLM is busy")
+        yield  # pragma: no cover
+
+    mock_llm_client.stream_response.side_effect = lambda **kwargs: ResponseStream(busy())
+
+    await handlers.handle_message(msg)
+
+    # Заглушка удалена, пользователь получил ответ "занято"
+    msg.placeholder.delete.assert_called_once()
+    assert msg.answer.call_args[0][0] == BUSY_TEXT
+
+
+@pytest.mark.asyncio
+async def test_handle_message_coalesces_burst(handlers, mock_llm_client, mock_database):
+    """Тест: сообщения, пришедшие во время ответа, обрабатываются одним следующим ходом."""
+    release = asyncio.Event()
+
+    async def slow_deltas():
+        await release.wait()
+        yield "Answer"
+
+    mock_llm_client.stream_response.side_effect = [
+        ResponseStream(slow_deltas()),
+        ResponseStream(async_iter(["Follow-up"])),
+    ]
+
+    first = asyncio.create_task(handlers.handle_message(create_mock_message("Привет")))
+    await asyncio.sleep(0.01)
+
+    # Пока готовится первый ответ, приходят ещё два сообщения
+    await handlers.handle_message(create_mock_message("Как дела?"))
+    await handlers.handle_message(create_mock_message("Что такое радуга?"))
+    assert mock_llm_client.stream_response.call_count == 1
+
+    release.set()
+    await first
+
+    # Два запроса к LLM вместо трёх, сообщения сохранены по порядку
+    assert mock_llm_client.stream_response.call_count == 2
+    appended = [c.args[0].content for c in mock_database.append_and_get_history.call_args_list]
+    assert appended == ["Привет", "Что такое радуга?"]
+    saved = [c.args[0] for c in mock_database.save_message.call_args_list]
+    assert [(m.role, m.content) for m in saved] == [
+        ("assistant", "Answer"),
+        ("user", "Как дела?"),
+        ("assistant", "Follow-up"),
+    ]
+    assert handlers._turns == {}
+
+
+@pytest.mark.asyncio
+async def test_handle_message_other_chats_not_blocked(handlers, mock_llm_client):
+    """Тест: ход одного чата не задерживает сообщения других чатов."""
+    release = asyncio.Event()
+
+    async def slow_deltas():
+        await release.wait()
+        yield "Slow"
+
+    mock_llm_client.stream_response.side_effect = [
+        ResponseStream(slow_deltas()),
+        ResponseStream(async_iter(["Fast"])),
+    ]
+
+    first = asyncio.create_task(handlers.handle_message(create_mock_message("A", chat_id=1)))
+    await asyncio.sleep(0.01)
+
+    other = create_mock_message("B", user_id=2, chat_id=2)
+    await handlers.handle_message(other)
+
+    other.placeholder.edit_text.assert_called()
+    assert mock_llm_client.stream_response.call_count == 2
+
+    release.set()
+    await first
+
+
 @pytest.mark.asyncio
 async def test_cmd_reset(handlers, mock_database):
     """Тест команды /reset."""
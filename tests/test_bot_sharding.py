@@ -0,0 +1,220 @@
+"""Тесты шардирования обновлений по воркерам."""
+
+import asyncio
+import queue
+from unittest.mock import MagicMock
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import CallbackQuery, Update
+from aiogram.types import Message as TelegramMessage
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.bot.handlers import BotHandlers
+from src.bot.sharding import (
+    SECRET_HEADER,
+    UpdateSharder,
+    WorkerSupervisor,
+    consume_updates,
+    create_ingress_app,
+    jump_hash,
+    resolve_allowed_updates,
+    update_chat_id,
+)
+
+SECRET = "test-secret"
+
+
+def make_update(update_id: int, chat_id: int, text: str = "hi") -> Update:
+    """Хелпер: обновление с текстовым сообщением."""
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1700000000,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": abs(chat_id), "is_bot": False, "first_name": "Kid"},
+                "text": text,
+            },
+        }
+    )
+
+
+class FakeQueue:
+    """Очередь-список вместо multiprocessing.Queue."""
+
+    def __init__(self):
+        self.items: list[str | None] = []
+
+    def put(self, item: str | None) -> None:
+        self.items.append(item)
+
+    def get(self) -> str | None:
+        return self.items.pop(0)
+
+
+def test_jump_hash_in_range_and_deterministic():
+    """Тест: номер воркера в диапазоне и одинаков для одного ключа."""
+    for key in [0, 1, 42, -1001234567890, 2**40]:
+        shard = jump_hash(key, 4)
+        assert 0 <= shard < 4
+        assert jump_hash(key, 4) == shard
+
+
+def test_jump_hash_single_bucket():
+    """Тест: при одном воркере все ключи попадают в него."""
+    assert {jump_hash(key, 1) for key in range(100)} == {0}
+
+
+def test_jump_hash_balanced_and_minimal_movement():
+    """Тест: ключи распределены равномерно, при добавлении воркера переезжает ~1/N."""
+    keys = range(10000)
+    before = [jump_hash(k, 4) for k in keys]
+    after = [jump_hash(k, 5) for k in keys]
+
+    counts = [before.count(b) for b in range(4)]
+    assert min(counts) > 2000
+
+    moved = [(b, a) for b, a in zip(before, after, strict=True) if b != a]
+    # Переезжают только ключи в новый воркер, примерно 1/5 от всех
+    assert all(a == 4 for _, a in moved)
+    assert 1500 < len(moved) < 2500
+
+
+def test_update_chat_id():
+    """Тест: ключ шардирования - ID чата сообщения."""
+    assert update_chat_id(make_update(1, -100500)) == -100500
+
+
+def test_sharder_keeps_chat_on_one_queue_in_order():
+    """Тест: обновления одного чата попадают в одну очередь в порядке получения."""
+    queues = [FakeQueue() for _ in range(3)]
+    sharder = UpdateSharder(queues)
+
+    shards = {sharder.dispatch(make_update(i, chat_id=7, text=f"m{i}")) for i in range(5)}
+
+    assert len(shards) == 1
+    texts = [Update.model_validate_json(raw).message.text for raw in queues[shards.pop()].items]
+    assert texts == ["m0", "m1", "m2", "m3", "m4"]
+
+
+@pytest.mark.asyncio
+async def test_ingress_app_checks_secret_and_dispatches():
+    """Тест: webhook ingress проверяет секрет и раздаёт обновления воркерам."""
+    queues = [FakeQueue(), FakeQueue()]
+    app = create_ingress_app(UpdateSharder(queues), "/hook", SECRET)
+    payload = make_update(1, chat_id=5).model_dump(mode="json", exclude_unset=True)
+
+    async with TestClient(TestServer(app)) as client:
+        rejected = await client.post("/hook", json=payload, headers={SECRET_HEADER: "bad"})
+        accepted = await client.post("/hook", json=payload, headers={SECRET_HEADER: SECRET})
+
+    assert rejected.status == 401
+    assert accepted.status == 200
+    assert sum(len(q.items) for q in queues) == 1
+    assert len(queues[jump_hash(5, 2)].items) == 1
+
+
+@pytest.mark.asyncio
+async def test_consume_updates_feeds_dispatcher_in_order():
+    """Тест: воркер передаёт обновления диспетчеру в порядке очереди и завершается по сигналу."""
+    received: list[str] = []
+    router = Router()
+
+    @router.message()
+    async def on_message(message: TelegramMessage) -> None:
+        received.append(message.text or "")
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    bot = Bot(token="123456:TEST-TOKEN")
+
+    updates: queue.Queue[str | None] = queue.Queue()
+    for i in range(3):
+        updates.put(make_update(i, chat_id=1, text=f"m{i}").model_dump_json(exclude_unset=True))
+    updates.put(None)
+
+    await asyncio.wait_for(consume_updates(updates, bot, dp), timeout=5.0)
+    await bot.session.close()
+
+    assert received == ["m0", "m1", "m2"]
+
+
+def test_allowed_updates_follow_handlers():
+    """Тест: типы обновлений ingress берутся из зарегистрированных handlers."""
+    handlers = BotHandlers(MagicMock(), MagicMock(), MagicMock())
+    assert resolve_allowed_updates(handlers.router) == ["message"]
+
+    router = Router()
+
+    @router.callback_query()
+    async def on_callback(callback: CallbackQuery) -> None:
+        pass
+
+    router.include_router(BotHandlers(MagicMock(), MagicMock(), MagicMock()).router)
+    assert sorted(resolve_allowed_updates(router)) == ["callback_query", "message"]
+
+
+class FakeProcess:
+    """Процесс воркера: жив, пока не "упал"."""
+
+    def __init__(self):
+        self.alive = True
+        self.exitcode: int | None = None
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def crash(self) -> None:
+        self.alive = False
+        self.exitcode = 1
+
+
+class FakeClock:
+    """Управляемые часы для окна перезапусков."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_supervisor_restarts_dead_worker():
+    """Тест: упавший воркер перезапускается с тем же номером (на той же очереди)."""
+    started: list[int] = []
+
+    def start_worker(index: int) -> FakeProcess:
+        started.append(index)
+        return FakeProcess()
+
+    supervisor = WorkerSupervisor(start_worker, 3)
+    assert supervisor.check() == []
+
+    supervisor.workers[1].crash()
+    assert supervisor.check() == [1]
+    assert started == [0, 1, 2, 1]
+    assert all(worker.is_alive() for worker in supervisor.workers)
+
+
+def test_supervisor_gives_up_on_crash_loop():
+    """Тест: воркер, падающий слишком часто, останавливает supervisor; старые падения забываются."""
+    clock = FakeClock()
+    supervisor = WorkerSupervisor(
+        lambda _index: FakeProcess(), 1, max_restarts=2, restart_window=60, clock=clock
+    )
+
+    for _ in range(2):
+        supervisor.workers[0].crash()
+        supervisor.check()
+
+    clock.now += 61
+    supervisor.workers[0].crash()
+    assert supervisor.check() == [0]
+
+    supervisor.workers[0].crash()
+    supervisor.check()
+    supervisor.workers[0].crash()
+    with pytest.raises(RuntimeError, match="crashed"):
+        supervisor.check()
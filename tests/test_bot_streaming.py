@@ -0,0 +1,81 @@
+"""Тесты для StreamingReply."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from src.bot.streaming import StreamingReply
+
+
+@pytest.fixture
+def placeholder():
+    """Фикстура для сообщения-заглушки."""
+    msg = MagicMock()
+    msg.edit_text = AsyncMock()
+    msg.answer = AsyncMock()
+    msg.delete = AsyncMock()
+    return msg
+
+
+@pytest.mark.asyncio
+async def test_update_respects_min_chars(placeholder):
+    """Тест что правка без паузы выполняется только при достаточном приросте текста."""
+    reply = StreamingReply(placeholder, min_interval=0, min_chars=10)
+
+    await reply.update("Hello")
+    await reply.update("Hello, w")
+    await reply.update("Hello, world and more")
+
+    edits = [c.args[0] for c in placeholder.edit_text.call_args_list]
+    assert edits == ["Hello", "Hello, world and more"]
+
+
+@pytest.mark.asyncio
+async def test_update_deferred_after_retry_after(placeholder):
+    """Тест что после TelegramRetryAfter правки откладываются."""
+    placeholder.edit_text.side_effect = TelegramRetryAfter(
+        method=MagicMock(), message="Too Many Requests", retry_after=30
+    )
+    reply = StreamingReply(placeholder, min_interval=0, min_chars=0)
+
+    await reply.update("Hello")
+    await reply.update("Hello, world")
+
+    assert placeholder.edit_text.call_count == 1
+    assert reply.edits == 0
+
+
+@pytest.mark.asyncio
+async def test_finish_falls_back_to_plain_text(placeholder):
+    """Тест что при невалидном HTML финальный текст отправляется без разметки."""
+    placeholder.edit_text.side_effect = [
+        TelegramBadRequest(method=MagicMock(), message="can't parse entities"),
+        None,
+    ]
+    reply = StreamingReply(placeholder, min_interval=1, min_chars=10)
+
+    await reply.finish("<b>broken")
+
+    placeholder.edit_text.assert_called_with("<b>broken", parse_mode=None)
+
+
+@pytest.mark.asyncio
+async def test_discard_deletes_empty_placeholder(placeholder):
+    """Тест что заглушка без текста ответа удаляется."""
+    reply = StreamingReply(placeholder, min_interval=1, min_chars=10)
+
+    await reply.discard()
+
+    placeholder.delete.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_discard_keeps_partial_answer(placeholder):
+    """Тест что заглушка с частью ответа не удаляется."""
+    reply = StreamingReply(placeholder, min_interval=1, min_chars=10)
+    await reply.update("Partial")
+
+    await reply.discard()
+
+    placeholder.delete.assert_not_called()
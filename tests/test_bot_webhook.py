@@ -0,0 +1,126 @@
+"""Тесты webhook режима бота (локальный "Telegram" отправляет обновления POST запросами)."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message as TelegramMessage
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.bot.bot import create_webhook_app, start_webhook
+
+SECRET = "test-secret_123"
+PATH = "/telegram/webhook"
+
+
+def make_update(update_id: int, text: str) -> dict:
+    """Хелпер: JSON обновления с текстовым сообщением, как его отправляет Telegram."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": 42, "type": "private"},
+            "from": {"id": 42, "is_bot": False, "first_name": "Kid"},
+            "text": text,
+        },
+    }
+
+
+@pytest.fixture
+def received():
+    """Фикстура: очередь сообщений, дошедших до handler."""
+    return asyncio.Queue()
+
+
+@pytest.fixture
+def webhook_app(received):
+    """Фикстура: webhook приложение с handler, записывающим входящие сообщения."""
+    router = Router()
+
+    @router.message()
+    async def on_message(message: TelegramMessage) -> None:
+        await received.put(message.text)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    bot = Bot(token="123456:TEST-TOKEN")
+    return create_webhook_app(bot, dp, PATH, SECRET)
+
+
+@pytest.mark.asyncio
+async def test_webhook_feeds_update_to_dispatcher(webhook_app, received):
+    """Тест: обновление с верным секретом принимается и доходит до handler."""
+    async with TestClient(TestServer(webhook_app)) as client:
+        response = await client.post(
+            PATH,
+            json=make_update(1, "Привет!"),
+            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+        )
+
+        assert response.status == 200
+        assert await asyncio.wait_for(received.get(), timeout=1.0) == "Привет!"
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_wrong_secret(webhook_app, received):
+    """Тест: запрос без верного секрета отклоняется и не обрабатывается."""
+    async with TestClient(TestServer(webhook_app)) as client:
+        wrong = await client.post(
+            PATH,
+            json=make_update(2, "Взлом"),
+            headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"},
+        )
+        missing = await client.post(PATH, json=make_update(3, "Взлом"))
+
+        assert wrong.status == 401
+        assert missing.status == 401
+        await asyncio.sleep(0.05)
+        assert received.empty()
+
+
+@pytest.mark.asyncio
+async def test_webhook_answers_before_handler_finishes(received):
+    """Тест: 200 возвращается сразу, долгая обработка идёт в фоне."""
+    release = asyncio.Event()
+    router = Router()
+
+    @router.message()
+    async def slow_handler(message: TelegramMessage) -> None:
+        await release.wait()
+        await received.put(message.text)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    app = create_webhook_app(Bot(token="123456:TEST-TOKEN"), dp, PATH, SECRET)
+
+    async with TestClient(TestServer(app)) as client:
+        response = await asyncio.wait_for(
+            client.post(
+                PATH,
+                json=make_update(4, "Долгий вопрос"),
+                headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+            ),
+            timeout=1.0,
+        )
+        assert response.status == 200
+        assert received.empty()
+
+        release.set()
+        assert await asyncio.wait_for(received.get(), timeout=1.0) == "Долгий вопрос"
+
+
+@pytest.mark.asyncio
+async def test_start_webhook_requires_secret():
+    """Тест: webhook режим не запускается без секрета."""
+    config = MagicMock()
+    config.webhook_url = "https://bot.example.com"
+    config.webhook_secret = ""
+    bot = MagicMock()
+    bot.set_webhook = AsyncMock()
+
+    with pytest.raises(ValueError, match="WEBHOOK_SECRET"):
+        await start_webhook(bot, Dispatcher(), config)
+
+    bot.set_webhook.assert_not_called()
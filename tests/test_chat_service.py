@@ -0,0 +1,227 @@
+"""Тесты для ChatService и потокового endpoint чата."""
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.api.chat_service import ChatService
+from backend.api.models import ChatMode, ChatRequest
+from backend.api.result_summary import ResultSummary
+from backend.api.server import app
+from backend.api.sql_cache import SQLCache
+from backend.api.sql_templates import SQLTemplateMatcher
+from src.llm.streaming import ResponseStream
+from src.storage.models import Message
+
+
+async def async_iter(items):
+    """Хелпер: асинхронный итератор по списку."""
+    for item in items:
+        yield item
+
+
+def stream_of(*deltas: str):
+    """Хелпер: side_effect, возвращающий поток из дельт."""
+    return lambda **kwargs: ResponseStream(async_iter(list(deltas)))
+
+
+@pytest.fixture
+def llm_client():
+    """Фикстура для мокового LLMClient."""
+    client = MagicMock()
+    client.stream_response = MagicMock(side_effect=stream_of("Hel", "lo"))
+    client.get_response = AsyncMock(return_value="SELECT 1")
+    return client
+
+
+# Сводка результата "SELECT COUNT(*) FROM messages"
+COUNT_SUMMARY = ResultSummary.from_rows([{"count": 42}])
+
+
+@pytest.fixture
+def chat_service(llm_client):
+    """Фикстура для ChatService с замоканным SQL генератором."""
+    service = ChatService(llm_client, db_pool=MagicMock())
+    service.sql_generator.generate_sql = AsyncMock(return_value="SELECT COUNT(*) FROM messages")
+    service.sql_generator.summarize_sql = AsyncMock(return_value=COUNT_SUMMARY)
+    return service
+
+
+def make_pool(version: int = 1) -> MagicMock:
+    """Хелпер: pool, возвращающий версию данных для кэша SQL."""
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=version)
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+    return pool
+
+
+def make_cached_service(llm_client, pool: MagicMock) -> ChatService:
+    """Хелпер: ChatService с кэшем SQL и замоканным SQL генератором."""
+    service = ChatService(llm_client, db_pool=pool, sql_cache=SQLCache())
+    service.sql_generator.generate_sql = AsyncMock(return_value="SELECT COUNT(*) FROM messages")
+    service.sql_generator.summarize_sql = AsyncMock(return_value=COUNT_SUMMARY)
+    service.sql_generator.interpret_results = AsyncMock(return_value="42 сообщения")
+    return service
+
+
+async def collect(events):
+    """Хелпер: сбор событий потока в список."""
+    return [event async for event in events]
+
+
+@pytest.mark.asyncio
+async def test_stream_normal_mode(chat_service, llm_client):
+    """Тест потока в обычном режиме: токены, затем done с полным текстом."""
+    request = ChatRequest(message="Hi", mode=ChatMode.NORMAL, session_id="s1")
+
+    events = await collect(chat_service.stream_message(request, history=[]))
+
+    assert [e.event for e in events] == ["token", "token", "done"]
+    assert events[-1].data["message"] == "Hello"
+    # Текущее сообщение добавлено к истории
+    sent = llm_client.stream_response.call_args.kwargs["messages"]
+    assert sent[-1].content == "Hi"
+
+
+@pytest.mark.asyncio
+async def test_stream_normal_mode_error(chat_service, llm_client):
+    """Тест события error при ошибке LLM в обычном режиме."""
+    llm_client.stream_response.side_effect = Exception("LLM down")
+    request = ChatRequest(message="Hi", mode=ChatMode.NORMAL, session_id="s1")
+
+    events = await collect(chat_service.stream_message(request, history=[]))
+
+    assert [e.event for e in events] == ["error"]
+    assert "LLM down" in events[0].data["message"]
+
+
+@pytest.mark.asyncio
+async def test_stream_admin_mode_stages(chat_service):
+    """Тест потока в admin режиме: этапы pipeline, токены интерпретации, done."""
+    request = ChatRequest(message="Сколько сообщений?", mode=ChatMode.ADMIN, session_id="s1")
+
+    events = await collect(chat_service.stream_message(request, history=[]))
+
+    assert [e.event for e in events] == ["stage", "stage", "token", "token", "done"]
+    assert events[0].data == {"stage": "sql_generated", "sql": "SELECT COUNT(*) FROM messages"}
+    assert events[1].data == {"stage": "rows_fetched", "rows": 1}
+    assert events[-1].data["sql_query"] == "SELECT COUNT(*) FROM messages"
+    assert events[-1].data["message"] == "Hello"
+
+
+@pytest.mark.asyncio
+async def test_admin_repeat_question_uses_cache(llm_client):
+    """Тест: повторный вопрос не генерирует SQL и не выполняет его, пока данные не менялись."""
+    pool = make_pool(version=100)
+    service = make_cached_service(llm_client, pool)
+
+    first = await service.process_message(
+        ChatRequest(message="Сколько сообщений?", mode=ChatMode.ADMIN, session_id="s1"), []
+    )
+    second = await service.process_message(
+        ChatRequest(message="сколько сообщений", mode=ChatMode.ADMIN, session_id="s2"), []
+    )
+
+    assert first.sql_query == second.sql_query == "SELECT COUNT(*) FROM messages"
+    assert service.sql_generator.generate_sql.await_count == 1
+    assert service.sql_generator.summarize_sql.await_count == 1
+    service.sql_generator.interpret_results.assert_awaited_with(
+        "сколько сообщений", "SELECT COUNT(*) FROM messages", COUNT_SUMMARY
+    )
+
+    # Новые сообщения: SQL из кэша, но запрос выполняется заново
+    pool.acquire.return_value.__aenter__.return_value.fetchval.return_value = 101
+    events = await collect(
+        service.stream_message(
+            ChatRequest(message="Сколько сообщений?", mode=ChatMode.ADMIN, session_id="s1"), []
+        )
+    )
+
+    assert events[-1].data["sql_query"] == "SELECT COUNT(*) FROM messages"
+    assert service.sql_generator.generate_sql.await_count == 1
+    assert service.sql_generator.summarize_sql.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_admin_failed_sql_not_cached(llm_client):
+    """Тест: SQL, который не выполнился, не запоминается для вопроса."""
+    service = make_cached_service(llm_client, make_pool())
+    service.sql_generator.summarize_sql.side_effect = [Exception("syntax error"), COUNT_SUMMARY]
+    request = ChatRequest(message="Сколько сообщений?", mode=ChatMode.ADMIN, session_id="s1")
+
+    failed = await service.process_message(request, [])
+    retried = await service.process_message(request, [])
+
+    assert failed.sql_query is None
+    assert retried.sql_query == "SELECT COUNT(*) FROM messages"
+    assert service.sql_generator.generate_sql.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_admin_template_question_skips_llm(llm_client):
+    """Тест: частый вопрос отвечается по шаблону без генерации SQL и интерпретации."""
+    service = ChatService(llm_client, db_pool=MagicMock(), templates=SQLTemplateMatcher())
+    service.sql_generator.generate_sql = AsyncMock()
+    service.sql_generator.execute_sql = AsyncMock(return_value=[{"messages": 3}])
+    request = ChatRequest(
+        message="Сколько сообщений сегодня?", mode=ChatMode.ADMIN, session_id="s1"
+    )
+
+    response = await service.process_message(request, [])
+    events = await collect(service.stream_message(request, history=[]))
+
+    assert response.message == "Сегодня: 3 сообщения."
+    assert "COUNT(*)" in response.sql_query
+    assert [e.event for e in events] == ["stage", "stage", "token", "done"]
+    assert events[-1].data["message"] == "Сегодня: 3 сообщения."
+    service.sql_generator.generate_sql.assert_not_awaited()
+    llm_client.get_response.assert_not_awaited()
+    llm_client.stream_response.assert_not_called()
+    # Период передаётся параметрами запроса
+    sql, _pool, start, end = service.sql_generator.execute_sql.await_args.args
+    assert sql == response.sql_query
+    assert start < end
+    assert service.templates.stats.hits["message_count"] == 2
+
+
+def test_chat_stream_endpoint_persists_after_stream(llm_client):
+    """Тест SSE endpoint: события в формате SSE, ответ сохраняется после потока."""
+    database = MagicMock()
+    history = [
+        Message(user_id=0, chat_id=-1, role="user", content="Hi", content_length=2, username="web_user")
+    ]
+    database.append_and_get_history = AsyncMock(return_value=history)
+    database.save_message = AsyncMock()
+    app.state.database = database
+    app.state.db_pool = MagicMock()
+    app.state.llm_client = llm_client
+    app.state.history_token_budget = 2000
+    app.state.sessions = MagicMock()
+    app.state.sessions.get_chat_id = AsyncMock(return_value=-(2**60))
+    app.state.sql_cache = SQLCache()
+    app.state.sql_templates = SQLTemplateMatcher()
+    app.state.sql_sandbox = None
+    app.state.schema_catalog = None
+
+    client = TestClient(app)
+    response = client.post(
+        "/api/chat/stream", json={"message": "Hi", "mode": "normal", "session_id": "s1"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    blocks = [b for b in response.text.split("\n\n") if b]
+    events = [b.split("\n")[0].removeprefix("event: ") for b in blocks]
+    assert events == ["token", "token", "done"]
+    done = json.loads(blocks[-1].split("\n")[1].removeprefix("data: "))
+    assert done["message"] == "Hello"
+
+    database.save_message.assert_called_once()
+    saved = database.save_message.call_args[0][0]
+    assert saved.chat_id == -(2**60)
+    assert saved.role == "assistant"
+    assert saved.content == "Hello"
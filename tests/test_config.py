@@ -13,6 +13,7 @@ def env_vars():
     return {
         "TELEGRAM_BOT_TOKEN": "test_bot_token",
         "OPENROUTER_API_KEY": "test_api_key",
+        "POSTGRES_PASSWORD": "test_password",
     }
 
 
@@ -33,10 +34,19 @@ def test_config_uses_defaults(env_vars):
         assert config.llm_max_tokens == 1000
         assert config.llm_timeout == 30
         assert config.database_path == "./data/messages.db"
-        assert config.max_history_messages == 10
+        assert config.max_history_messages == 30
+        assert config.history_token_budget == 2000
         assert config.log_level == "INFO"
 
 
+def test_config_history_defaults(env_vars):
+    """Тест значений по умолчанию окна истории (без .env)."""
+    with patch.dict("os.environ", env_vars, clear=True):
+        config = Config(_env_file=None)
+        assert config.max_history_messages == 30
+        assert config.history_token_budget == 2000
+
+
 def test_config_custom_values(env_vars):
     """Тест кастомных значений из env."""
     env_vars.update(
@@ -0,0 +1,133 @@
+"""Тесты для HistoryCache."""
+
+import pytest
+
+from src.storage.history_cache import HistoryCache
+from src.storage.models import Message
+
+
+def make_message(content: str, chat_id: int = 1, user_id: int = 1) -> Message:
+    """Хелпер для создания сообщения."""
+    return Message(
+        user_id=user_id,
+        chat_id=chat_id,
+        role="user",
+        content=content,
+        content_length=len(content),
+        username="test_user",
+    )
+
+
+def fill(cache: HistoryCache, messages: list[Message], chat_id: int = 1, user_id: int = 1) -> None:
+    """Хелпер: заполнение кэша как после загрузки из БД."""
+    cache.begin_fill(chat_id, user_id)
+    cache.fill(chat_id, user_id, messages)
+
+
+def test_miss_then_hit():
+    """Тест промаха для пустого кэша и попадания после заполнения."""
+    cache = HistoryCache(max_dialogs=10, max_messages=3)
+
+    assert cache.get(1, 1, limit=3) is None
+
+    fill(cache, [make_message("a"), make_message("b")])
+    history = cache.get(1, 1, limit=3)
+
+    assert history is not None
+    assert [m.content for m in history] == ["a", "b"]
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_append_keeps_ring_buffer_size():
+    """Тест что буфер хранит только последние max_messages сообщений."""
+    cache = HistoryCache(max_dialogs=10, max_messages=3)
+    fill(cache, [make_message("a"), make_message("b"), make_message("c")])
+
+    cache.append(make_message("d"))
+
+    history = cache.get(1, 1, limit=3)
+    assert history is not None
+    assert [m.content for m in history] == ["b", "c", "d"]
+
+
+def test_limit_above_buffer_is_miss_for_incomplete_history():
+    """Тест что запрос больше буфера уходит в БД, если история не полная."""
+    cache = HistoryCache(max_dialogs=10, max_messages=2)
+    fill(cache, [make_message("a"), make_message("b")])
+
+    assert cache.get(1, 1, limit=5) is None
+
+
+def test_limit_above_buffer_is_hit_for_complete_history():
+    """Тест что короткая история отдаётся из кэша при любом limit."""
+    cache = HistoryCache(max_dialogs=10, max_messages=5)
+    fill(cache, [make_message("a")])
+
+    history = cache.get(1, 1, limit=20)
+    assert history is not None
+    assert [m.content for m in history] == ["a"]
+
+
+def test_append_ignored_for_uncached_dialog():
+    """Тест что append не создаёт неполную запись в кэше."""
+    cache = HistoryCache(max_dialogs=10, max_messages=3)
+
+    cache.append(make_message("a"))
+
+    assert cache.get(1, 1, limit=3) is None
+
+
+def test_lru_eviction():
+    """Тест вытеснения наименее используемого диалога."""
+    cache = HistoryCache(max_dialogs=2, max_messages=3)
+    fill(cache, [make_message("1")], chat_id=1)
+    fill(cache, [make_message("2")], chat_id=2)
+
+    # Диалог 1 становится самым свежим
+    assert cache.get(1, 1, limit=3) is not None
+
+    fill(cache, [make_message("3")], chat_id=3)
+
+    assert cache.get(2, 1, limit=3) is None
+    assert cache.get(1, 1, limit=3) is not None
+    assert cache.stats.evictions == 1
+    assert cache.stats.size == 2
+
+
+def test_invalidate():
+    """Тест удаления диалога из кэша."""
+    cache = HistoryCache(max_dialogs=10, max_messages=3)
+    fill(cache, [make_message("a")])
+
+    cache.invalidate(1, 1)
+
+    assert cache.get(1, 1, limit=3) is None
+    assert cache.stats.invalidations == 1
+
+
+@pytest.mark.parametrize("write", ["append", "invalidate"])
+def test_fill_rejected_after_concurrent_write(write):
+    """Тест что устаревший результат загрузки не попадает в кэш."""
+    cache = HistoryCache(max_dialogs=10, max_messages=3)
+
+    cache.begin_fill(1, 1)
+    if write == "append":
+        cache.append(make_message("new"))
+    else:
+        cache.invalidate(1, 1)
+    cache.fill(1, 1, [make_message("stale")])
+
+    assert cache.get(1, 1, limit=3) is None
+
+
+def test_hit_rate():
+    """Тест расчёта доли попаданий."""
+    cache = HistoryCache(max_dialogs=10, max_messages=3)
+    assert cache.stats.hit_rate == 0.0
+
+    cache.get(1, 1, limit=3)
+    fill(cache, [make_message("a")])
+    cache.get(1, 1, limit=3)
+
+    assert cache.stats.hit_rate == 0.5
@@ -0,0 +1,68 @@
+"""Тесты для HyperLogLog скетчей."""
+
+import pytest
+
+from backend.api.hll import HyperLogLog, hash_key
+
+
+def make_sketch(values: range) -> HyperLogLog:
+    """Хелпер: скетч из диапазона user_id."""
+    sketch = HyperLogLog()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def test_hash_key_is_stable():
+    """Тест: хеш ключа детерминирован (не зависит от процесса) и различает части."""
+    assert hash_key(42) == hash_key(42)
+    assert hash_key(1, 2) != hash_key(2, 1)
+    assert 0 <= hash_key(-100500) < 2**64
+
+
+@pytest.mark.parametrize("n", [0, 1, 100, 5000, 200000])
+def test_count_within_error_bound(n):
+    """Тест: оценка в пределах ~3 стандартных ошибок (1.6% для precision=12)."""
+    estimate = make_sketch(range(n)).count()
+
+    assert abs(estimate - n) <= max(2, 0.05 * n)
+
+
+def test_duplicates_not_counted():
+    """Тест: повторные значения не увеличивают оценку."""
+    sketch = make_sketch(range(1000))
+    before = sketch.count()
+
+    for value in range(1000):
+        sketch.add(value)
+
+    assert sketch.count() == before
+
+
+def test_merge_equals_union():
+    """Тест: объединение скетчей совпадает со скетчем объединения множеств."""
+    days = [make_sketch(range(day * 500, day * 500 + 2000)) for day in range(30)]
+
+    merged = HyperLogLog.merge(sketch.to_bytes() for sketch in days)
+
+    assert merged.to_bytes() == make_sketch(range(0, 29 * 500 + 2000)).to_bytes()
+    assert merged.to_bytes() == bytes(map(max, *(sketch.to_bytes() for sketch in days)))
+
+
+def test_merge_empty_and_roundtrip():
+    """Тест: пустое объединение и восстановление скетча из байтов."""
+    assert HyperLogLog.merge([]).count() == 0
+
+    sketch = make_sketch(range(300))
+    restored = HyperLogLog(registers=sketch.to_bytes())
+    assert restored.count() == sketch.count()
+
+
+def test_invalid_registers():
+    """Тест: регистры неверного размера и недопустимая точность отклоняются."""
+    with pytest.raises(ValueError):
+        HyperLogLog(registers=b"\x00" * 10)
+    with pytest.raises(ValueError):
+        HyperLogLog.merge([b"\x00" * 10])
+    with pytest.raises(ValueError):
+        HyperLogLog(precision=20)
@@ -0,0 +1,109 @@
+"""Тесты для AdmissionController (ограничение одновременных запросов к LLM)."""
+
+import asyncio
+
+import pytest
+
+from src.llm.admission import AdmissionController, LLMBusyError
+
+
+@pytest.mark.asyncio
+async def test_admits_up_to_max_in_flight():
+    """Тест: до max_in_flight запросов проходят без ожидания."""
+    admission = AdmissionController(max_in_flight=2, max_queue_wait=1.0)
+
+    await admission.acquire(1)
+    await admission.acquire(2)
+
+    assert admission.in_flight == 2
+    assert admission.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_release_hands_slot_to_waiter():
+    """Тест: освободившийся слот передаётся ожидающему."""
+    admission = AdmissionController(max_in_flight=1, max_queue_wait=1.0)
+    await admission.acquire(1)
+
+    waiter = asyncio.create_task(admission.acquire(2))
+    await asyncio.sleep(0)
+    assert admission.queued == 1
+
+    admission.release()
+    await waiter
+
+    assert admission.in_flight == 1
+    assert admission.queued == 0
+
+    admission.release()
+    assert admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_round_robin_across_chats():
+    """Тест: чат с большой очередью не задерживает остальные чаты."""
+    admission = AdmissionController(max_in_flight=1, max_queue_wait=5.0)
+    await admission.acquire("busy")
+    order: list[str] = []
+
+    async def request(key: str, name: str) -> None:
+        async with admission.slot(key):
+            order.append(name)
+
+    tasks = [asyncio.create_task(request("spam", f"spam-{i}")) for i in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(request("quiet", "quiet")))
+    await asyncio.sleep(0)
+
+    admission.release()
+    await asyncio.gather(*tasks)
+
+    # Второй чат обслужен сразу после первого запроса спамящего чата
+    assert order == ["spam-0", "quiet", "spam-1", "spam-2"]
+    assert admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_sheds_load_after_queue_timeout():
+    """Тест: если слот не освободился вовремя, запрос отклоняется с LLMBusyError."""
+    admission = AdmissionController(max_in_flight=1, max_queue_wait=0.05)
+    await admission.acquire(1)
+
+    with pytest.raises(LLMBusyError):
+        await admission.acquire(2)
+
+    assert admission.rejected == 1
+    assert admission.queued == 0
+
+    # Отклонённый запрос не занимает слот
+    admission.release()
+    assert admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_queue():
+    """Тест: отменённый ожидающий удаляется из очереди."""
+    admission = AdmissionController(max_in_flight=1, max_queue_wait=5.0)
+    await admission.acquire(1)
+
+    waiter = asyncio.create_task(admission.acquire(2))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert admission.queued == 0
+    admission.release()
+    assert admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_slot_released_on_error():
+    """Тест: слот освобождается при ошибке внутри блока."""
+    admission = AdmissionController(max_in_flight=1, max_queue_wait=1.0)
+
+    with pytest.raises(RuntimeError):
+        async with admission.slot(1):
+            raise RuntimeError("LLM error")
+
+    assert admission.in_flight == 0
@@ -1,5 +1,6 @@
 """Тесты для LLMClient класса."""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -18,6 +19,17 @@ def mock_config():
     config.llm_temperature = 0.7
     config.llm_max_tokens = 1000
     config.llm_timeout = 30
+    config.llm_hedging = True
+    config.llm_hedge_min_delay = 1.0
+    config.llm_hedge_max_delay = 10.0
+    config.llm_hedge_default_delay = 3.0
+    config.llm_deadline = 5.0
+    config.llm_max_attempts = 2
+    config.llm_breaker_failure_rate = 0.5
+    config.llm_breaker_slow_call = 20.0
+    config.llm_breaker_open_duration = 30.0
+    config.llm_max_in_flight = 4
+    config.llm_queue_timeout = 1.0
     return config
 
 
@@ -153,3 +165,132 @@ async def test_get_response_empty_history(llm_client):
         assert api_messages[0]["role"] == "system"
 
     assert result == "Hello"
+
+
+def make_chunk(content: str | None) -> MagicMock:
+    """Хелпер для создания chunk потокового ответа."""
+    chunk = MagicMock()
+    chunk.choices = [MagicMock()]
+    chunk.choices[0].delta.content = content
+    return chunk
+
+
+async def async_iter(items):
+    """Хелпер: асинхронный итератор по списку."""
+    for item in items:
+        yield item
+
+
+@pytest.mark.asyncio
+async def test_stream_response_yields_deltas(llm_client):
+    """Тест потокового ответа: дельты, накопленный текст и время до первого токена."""
+    messages = [Message(user_id=1, chat_id=1, role="user", content="Hi", content_length=2, username="test_user")]
+    chunks = [make_chunk("Hel"), make_chunk(None), make_chunk("lo"), make_chunk("!")]
+
+    with patch.object(
+        llm_client.client.chat.completions,
+        "create",
+        new_callable=AsyncMock,
+        return_value=async_iter(chunks),
+    ) as mock_create:
+        stream = llm_client.stream_response(messages, "Test prompt")
+        deltas = [delta async for delta in stream]
+
+        assert mock_create.call_args.kwargs["stream"] is True
+        assert len(mock_create.call_args.kwargs["messages"]) == 2
+
+    assert deltas == ["Hel", "lo", "!"]
+    assert stream.text == "Hello!"
+    assert stream.time_to_first_token is not None
+    assert stream.total_time is not None
+    assert stream.total_time >= stream.time_to_first_token
+
+
+@pytest.mark.asyncio
+async def test_stream_response_read_all(llm_client):
+    """Тест чтения потока целиком."""
+    with patch.object(
+        llm_client.client.chat.completions,
+        "create",
+        new_callable=AsyncMock,
+        return_value=async_iter([make_chunk("4"), make_chunk("2")]),
+    ):
+        text = await llm_client.stream_response([], "Test prompt").read_all()
+
+    assert text == "42"
+
+
+@pytest.mark.asyncio
+async def test_stream_response_empty_raises(llm_client):
+    """Тест что пустой поток считается ошибкой."""
+    with (
+        patch.object(
+            llm_client.client.chat.completions,
+            "create",
+            new_callable=AsyncMock,
+            return_value=async_iter([make_chunk(None)]),
+        ),
+        pytest.raises(ValueError, match="empty response"),
+    ):
+        await llm_client.stream_response([], "Test prompt").read_all()
+
+
+@pytest.mark.asyncio
+async def test_stream_response_api_error(llm_client):
+    """Тест ошибки API при потоковом запросе."""
+    with (
+        patch.object(
+            llm_client.client.chat.completions,
+            "create",
+            new_callable=AsyncMock,
+            side_effect=Exception("API Error"),
+        ),
+        pytest.raises(Exception, match="API Error"),
+    ):
+        await llm_client.stream_response([], "Test prompt").read_all()
+
+
+@pytest.mark.asyncio
+async def test_stream_response_hedges_to_second_model(mock_config):
+    """Тест: основная модель не прислала первый токен вовремя - отвечает вторая."""
+    mock_config.openrouter_model = "slow/model,fast/model"
+    mock_config.llm_hedge_default_delay = 0.05
+    client = LLMClient(mock_config)
+
+    async def slow_stream():
+        await asyncio.sleep(10)
+        yield make_chunk("slow")
+
+    async def create(**kwargs):
+        if kwargs["model"] == "slow/model":
+            return slow_stream()
+        return async_iter([make_chunk("fa"), make_chunk("st")])
+
+    with patch.object(client.client.chat.completions, "create", side_effect=create) as mock_create:
+        text = await client.stream_response([], "Test prompt").read_all()
+
+    assert text == "fast"
+    assert [c.kwargs["model"] for c in mock_create.call_args_list] == ["slow/model", "fast/model"]
+    assert client.router.ordered_models() == ["fast/model", "slow/model"]
+
+
+@pytest.mark.asyncio
+async def test_get_response_fails_over_to_next_model(mock_config):
+    """Тест: при ошибке первой модели запрос без потока уходит к следующей."""
+    mock_config.openrouter_model = "broken/model,ok/model"
+    client = LLMClient(mock_config)
+
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "ok"
+
+    with patch.object(
+        client.client.chat.completions,
+        "create",
+        new_callable=AsyncMock,
+        side_effect=[Exception("Provider error"), mock_response],
+    ) as mock_create:
+        response = await client.get_response([], "Test prompt")
+
+    assert response == "ok"
+    assert mock_create.call_args_list[1].kwargs["model"] == "ok/model"
@@ -0,0 +1,201 @@
+"""Тесты для circuit breaker и политики повторов."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.llm.resilience import CircuitBreaker, CircuitOpenError, CircuitState, RetryPolicy
+from src.llm.router import ModelRouter
+
+
+def make_breaker(name: str = "test/model", **kwargs) -> CircuitBreaker:
+    """Хелпер: breaker с маленьким окном для тестов."""
+    params = {"min_calls": 4, "window": 4, "open_duration": 30.0, "slow_call_threshold": 1.0}
+    params.update(kwargs)
+    return CircuitBreaker(name, **params)
+
+
+def test_breaker_opens_on_error_rate():
+    """Тест: доля ошибок в окне достигла порога - breaker размыкается."""
+    breaker = make_breaker()
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.allow_request() is False
+
+
+def test_breaker_opens_on_slow_calls():
+    """Тест: медленные ответы размыкают breaker так же, как ошибки."""
+    breaker = make_breaker(slow_call_rate_threshold=0.75)
+    breaker.record_success(0.1)
+    for _ in range(3):
+        breaker.record_success(5.0)
+
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_breaker_needs_min_calls():
+    """Тест: до min_calls исходов breaker не размыкается."""
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_breaker_half_open_trial_closes():
+    """Тест: после open_duration пропускается один пробный запрос, успех замыкает breaker."""
+    breaker = make_breaker(open_duration=0.0)
+    for _ in range(4):
+        breaker.record_failure()
+
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+
+    breaker.record_success(0.1)
+
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request() is True
+
+
+def test_breaker_half_open_trial_failure_reopens():
+    """Тест: ошибка пробного запроса снова размыкает breaker."""
+    breaker = make_breaker(open_duration=0.0)
+    for _ in range(4):
+        breaker.record_failure()
+    breaker.open_duration = 30.0
+    breaker._opened_at = 0.0
+    assert breaker.allow_request() is True
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_breaker_cancelled_trial_releases_slot():
+    """Тест: отменённый быстрый пробный запрос освобождает слот без смены состояния."""
+    breaker = make_breaker(open_duration=0.0)
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.allow_request() is True
+
+    breaker.record_cancelled(0.1)
+
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request() is True
+
+
+def test_retry_backoff_bounded():
+    """Тест: пауза backoff с jitter не превышает экспоненты и max_delay."""
+    policy = RetryPolicy(base_delay=0.5, max_delay=2.0)
+    for attempt in range(1, 6):
+        assert 0 <= policy.backoff(attempt) <= min(2.0, 0.5 * 2 ** (attempt - 1))
+
+
+@pytest.mark.asyncio
+async def test_retry_succeeds_after_failure():
+    """Тест: повтор после ошибки возвращает результат успешной попытки."""
+    policy = RetryPolicy(max_attempts=3, base_delay=0.0)
+    operation = AsyncMock(side_effect=[RuntimeError("boom"), "ok"])
+
+    assert await policy.call(operation) == "ok"
+    assert operation.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_retry_gives_up_after_max_attempts():
+    """Тест: после max_attempts пробрасывается ошибка последней попытки."""
+    policy = RetryPolicy(max_attempts=2, base_delay=0.0)
+    operation = AsyncMock(side_effect=RuntimeError("boom"))
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await policy.call(operation)
+    assert operation.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_retry_respects_deadline():
+    """Тест: попытка прерывается по исчерпании общего бюджета времени."""
+    policy = RetryPolicy(max_attempts=5, deadline=0.05)
+
+    async def hang() -> str:
+        await asyncio.sleep(10)
+        return "late"
+
+    with pytest.raises(TimeoutError, match="deadline"):
+        await policy.call(hang)
+
+
+@pytest.mark.asyncio
+async def test_retry_skips_backoff_beyond_deadline():
+    """Тест: повтор не запускается, если пауза не укладывается в бюджет."""
+    policy = RetryPolicy(max_attempts=5, base_delay=10.0, max_delay=10.0, deadline=1.0)
+    operation = AsyncMock(side_effect=RuntimeError("boom"))
+
+    with patch("src.llm.resilience.random.uniform", return_value=5.0), pytest.raises(RuntimeError):
+        await policy.call(operation)
+    assert operation.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_does_not_retry_open_circuit():
+    """Тест: CircuitOpenError не повторяется."""
+    policy = RetryPolicy(max_attempts=3, base_delay=0.0)
+    operation = AsyncMock(side_effect=CircuitOpenError("all open"))
+
+    with pytest.raises(CircuitOpenError):
+        await policy.call(operation)
+    assert operation.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_router_skips_open_circuit():
+    """Тест: модель с разомкнутым breaker пропускается без запроса."""
+    router = ModelRouter(["broken", "ok"], breaker_factory=make_breaker)
+    for _ in range(4):
+        router.breakers["broken"].record_failure()
+    started: list[str] = []
+
+    async def start(model: str) -> str:
+        started.append(model)
+        return model
+
+    model, _ = await router.race(start, models=["broken", "ok"])
+
+    assert model == "ok"
+    assert started == ["ok"]
+
+
+@pytest.mark.asyncio
+async def test_router_all_circuits_open():
+    """Тест: если все breaker разомкнуты, запрос отклоняется сразу."""
+    router = ModelRouter(["a"], breaker_factory=make_breaker)
+    for _ in range(4):
+        router.breakers["a"].record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        await router.race(AsyncMock())
+
+
+@pytest.mark.asyncio
+async def test_router_records_failures_in_breaker():
+    """Тест: ошибки модели учитываются в её breaker."""
+    router = ModelRouter(["a", "b"], breaker_factory=make_breaker)
+
+    async def start(model: str) -> str:
+        if model == "a":
+            raise RuntimeError("down")
+        return model
+
+    for _ in range(4):
+        await router.race(start, models=["a", "b"])
+
+    assert router.breakers["a"].state == CircuitState.OPEN
+    assert router.breakers["b"].state == CircuitState.CLOSED
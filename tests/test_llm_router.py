@@ -0,0 +1,167 @@
+"""Тесты для ModelRouter (выбор модели и hedged запросы)."""
+
+import asyncio
+
+import pytest
+
+from src.llm.router import ModelRouter, ModelStats, parse_models
+
+
+def test_parse_models():
+    """Тест разбора списка моделей из конфигурации."""
+    assert parse_models(" a/one:free, b/two:free,,a/one:free ") == ["a/one:free", "b/two:free"]
+
+
+def test_parse_models_empty():
+    """Тест пустого списка моделей."""
+    with pytest.raises(ValueError):
+        parse_models(" , ")
+
+
+def test_model_stats_ewma_and_p95():
+    """Тест EWMA и p95 по окну замеров."""
+    stats = ModelStats(alpha=0.5, window=20)
+    assert stats.p95() is None
+
+    stats.record(1.0)
+    stats.record(3.0)
+    assert stats.ewma == 2.0
+
+    for _ in range(18):
+        stats.record(1.0)
+    stats.record(10.0)
+    # Окно 20: самый старый замер (1.0) вытеснен, p95 попадает на выброс
+    assert len(stats.samples) == 20
+    assert stats.p95() == 10.0
+
+
+def test_ordered_models_by_ewma():
+    """Тест: модели без замеров идут первыми, остальные - по EWMA."""
+    router = ModelRouter(["slow", "fast", "new"])
+    router.record("slow", 5.0)
+    router.record("fast", 1.0)
+
+    assert router.ordered_models() == ["new", "fast", "slow"]
+
+
+def test_hedge_delay_clamped():
+    """Тест: deadline hedging - p95 в пределах [min, max]."""
+    router = ModelRouter(["a"], hedge_min_delay=1.0, hedge_max_delay=5.0, hedge_default_delay=3.0)
+    assert router.hedge_delay("a") == 3.0
+
+    router.record("a", 0.1)
+    assert router.hedge_delay("a") == 1.0
+
+    router.record("a", 60.0)
+    assert router.hedge_delay("a") == 5.0
+
+
+@pytest.mark.asyncio
+async def test_race_primary_answers_in_time():
+    """Тест: основная модель ответила до deadline - вторая не запрашивается."""
+    router = ModelRouter(["a", "b"], hedge_default_delay=0.5)
+    started: list[str] = []
+
+    async def start(model: str) -> str:
+        started.append(model)
+        return f"answer from {model}"
+
+    model, result = await router.race(start)
+
+    assert model == "a"
+    assert result == "answer from a"
+    assert started == ["a"]
+    assert router.stats["a"].ewma is not None
+
+
+@pytest.mark.asyncio
+async def test_race_hedges_slow_primary_and_cancels_loser():
+    """Тест: основная модель молчит дольше deadline - побеждает вторая, первая отменяется."""
+    router = ModelRouter(["slow", "fast"], hedge_default_delay=0.05)
+    cancelled: list[str] = []
+
+    async def start(model: str) -> str:
+        try:
+            await asyncio.sleep(10 if model == "slow" else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        return model
+
+    model, result = await router.race(start)
+
+    assert model == "fast"
+    assert result == "fast"
+    assert cancelled == ["slow"]
+    # Проигравшей модели засчитана нижняя оценка задержки - она уходит вниз
+    assert router.ordered_models() == ["fast", "slow"]
+
+
+@pytest.mark.asyncio
+async def test_race_failover_on_primary_error():
+    """Тест: ошибка основной модели сразу переключает на следующую."""
+    router = ModelRouter(["broken", "ok"], hedge_default_delay=10.0)
+
+    async def start(model: str) -> str:
+        if model == "broken":
+            raise RuntimeError("model unavailable")
+        return model
+
+    model, _ = await asyncio.wait_for(router.race(start), timeout=1.0)
+
+    assert model == "ok"
+
+
+@pytest.mark.asyncio
+async def test_race_all_models_fail():
+    """Тест: если все модели упали, пробрасывается последняя ошибка."""
+    router = ModelRouter(["a", "b"])
+
+    async def start(model: str) -> str:
+        raise RuntimeError(f"{model} failed")
+
+    with pytest.raises(RuntimeError, match="b failed"):
+        await router.race(start)
+
+
+@pytest.mark.asyncio
+async def test_race_without_hedging():
+    """Тест: при hedging=False вторая модель запрашивается только после ошибки."""
+    router = ModelRouter(["slow", "fast"], hedging=False, hedge_default_delay=0.01)
+    started: list[str] = []
+
+    async def start(model: str) -> str:
+        started.append(model)
+        await asyncio.sleep(0.05)
+        return model
+
+    model, _ = await router.race(start)
+
+    assert model == "slow"
+    assert started == ["slow"]
+
+
+@pytest.mark.asyncio
+async def test_race_discards_simultaneous_loser():
+    """Тест: результат проигравшего запроса, завершившегося одновременно, освобождается."""
+    router = ModelRouter(["a", "b"], hedge_default_delay=0.0)
+    release = asyncio.Event()
+    discarded: list[str] = []
+
+    async def start(model: str) -> str:
+        await release.wait()
+        return model
+
+    async def discard(result: str) -> None:
+        discarded.append(result)
+
+    async def open_gate() -> None:
+        await asyncio.sleep(0.02)
+        release.set()
+
+    gate = asyncio.create_task(open_gate())
+    model, _ = await router.race(start, discard)
+    await gate
+
+    assert model in ("a", "b")
+    assert discarded == [{"a": "b", "b": "a"}[model]]
@@ -0,0 +1,93 @@
+"""Тесты для сводки результатов SQL запроса."""
+
+from datetime import datetime
+from decimal import Decimal
+
+from backend.api.result_summary import MAX_VALUE_LENGTH, ResultSummary
+
+
+def test_small_result_passed_as_is():
+    """Тест: небольшой результат передаётся в промпт целиком, без сводки."""
+    summary = ResultSummary.from_rows(
+        [{"user_id": 1, "messages": 10}, {"user_id": 2, "messages": 5}]
+    )
+
+    prompt = summary.to_prompt()
+
+    assert summary.complete
+    assert prompt.splitlines() == [
+        "Строк: 2",
+        '{"user_id": 1, "messages": 10}',
+        '{"user_id": 2, "messages": 5}',
+    ]
+
+
+def test_empty_result():
+    """Тест: пустой результат."""
+    assert ResultSummary.from_rows([]).to_prompt() == "Строк: 0"
+
+
+def test_numeric_column_stats():
+    """Тест: min, max, mean и квантили числовой колонки (Decimal тоже число)."""
+    summary = ResultSummary.from_rows([{"n": Decimal(i)} for i in range(1, 101)])
+    column = summary.columns["n"]
+
+    assert column.min == 1
+    assert column.max == 100
+    assert column.total / column.numbers == 50.5
+    quantiles = column.quantiles()
+    assert quantiles[0.5] in (50, 51)
+    assert 89 <= quantiles[0.9] <= 91
+    assert "min=1, max=100, mean=50.5" in summary.to_prompt()
+
+
+def test_frequent_values_and_nulls():
+    """Тест: частые значения текстовой колонки и количество NULL."""
+    rows = [{"role": "user"}] * 30 + [{"role": "assistant"}] * 20 + [{"role": None}] * 5
+    summary = ResultSummary.from_rows(rows)
+
+    assert summary.columns["role"].top(2) == [("user", 30), ("assistant", 20)]
+    assert summary.columns["role"].nulls == 5
+    assert '"user" (30), "assistant" (20)' in summary.to_prompt()
+
+
+def test_dates_min_max():
+    """Тест: для дат в сводке диапазон."""
+    rows = [{"day": datetime(2025, 1, d)} for d in range(1, 31)]  # noqa: DTZ001
+
+    prompt = ResultSummary.from_rows(rows).to_prompt()
+
+    assert "min=2025-01-01 00:00:00, max=2025-01-30 00:00:00" in prompt
+
+
+def test_prompt_size_does_not_depend_on_rows():
+    """Тест: размер промпта и выборки одинаков для 1 000 и 100 000 строк."""
+
+    def make(count: int) -> ResultSummary:
+        return ResultSummary.from_rows(
+            [{"user_id": i, "username": f"user{i % 500}", "messages": i % 97} for i in range(count)]
+        )
+
+    small, large = make(1_000), make(100_000)
+
+    assert large.row_count == 100_000
+    assert len(large.sample) == len(small.sample)
+    assert len(large.columns["messages"].reservoir) == large.reservoir_size
+    assert abs(len(large.to_prompt()) - len(small.to_prompt())) < 100
+
+
+def test_long_values_truncated():
+    """Тест: длинные тексты обрезаются в выборке и сводке."""
+    rows = [{"content": "x" * 10_000} for _ in range(50)]
+
+    prompt = ResultSummary.from_rows(rows).to_prompt()
+
+    assert "x" * (MAX_VALUE_LENGTH + 1) not in prompt
+    assert len(prompt) < 50 * (MAX_VALUE_LENGTH + 50)
+
+
+def test_reproducible_with_seed():
+    """Тест: одинаковые строки и seed дают одинаковую сводку."""
+    rows = [{"n": i * 7 % 1000} for i in range(10_000)]
+
+    assert ResultSummary.from_rows(rows).to_prompt() == ResultSummary.from_rows(rows).to_prompt()
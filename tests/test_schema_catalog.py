@@ -0,0 +1,107 @@
+"""Тесты для каталога схемы БД admin режима."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from backend.api.config import APIConfig
+from backend.api.prompts import DEFAULT_SQL_SCHEMA
+from backend.api.schema_catalog import SchemaCatalog
+from backend.api.sql_generator import SQLGenerator
+from backend.api.sql_sandbox import ALLOWED_TABLES
+from src.storage.database import Database
+
+
+class FakeClock:
+    """Управляемые часы для интервала обновления."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_catalog_from_database():
+    """Тест: таблицы, комментарии, индексы, оценки строк и значения из pg_stats."""
+    config = APIConfig()
+    async with Database(
+        host=config.postgres_host,
+        port=config.postgres_port,
+        database=config.postgres_db,
+        user=config.postgres_user,
+        password=config.postgres_password,
+    ) as database:
+        assert database.pool is not None
+        async with database.pool.acquire() as conn:
+            await conn.execute("DELETE FROM messages")
+            await conn.executemany(
+                "INSERT INTO messages (user_id, chat_id, role, content, content_length, "
+                "username) VALUES ($1, $1, $2, 'hi', 2, 'alice')",
+                [(i % 7, "user" if i % 2 else "assistant") for i in range(200)],
+            )
+            await conn.execute("ANALYZE messages")
+
+            catalog = SchemaCatalog(database.pool)
+            await catalog.refresh()
+            schema = await catalog.get_prompt_schema()
+
+            await conn.execute("DELETE FROM messages")
+
+    messages = catalog.tables["messages"]
+    assert messages.row_estimate == 200
+    assert "PRIMARY KEY (id)" in messages.indexes
+    assert "(created_at)" in messages.indexes
+    role = next(column for column in messages.columns if column.name == "role")
+    assert sorted(role.values) == ["assistant", "user"]
+    assert role.description == "'user' или 'assistant'"
+    # Показываются только разрешённые таблицы: служебные и web_sessions
+    # (id сессий дают доступ к истории веб-чата) в промпт не попадают
+    assert set(catalog.tables) == set(ALLOWED_TABLES)
+    assert "web_sessions" not in schema
+    assert "session_id" not in schema
+    assert "message_rollup_days" not in schema
+    # Бинарные колонки (HLL скетчи) не показываются
+    assert "users_hll" not in schema
+    assert "**Таблица: message_daily_stats**" in schema
+    assert "- role: varchar NOT NULL ('user' или 'assistant'), значения: 'assistant', 'user'" in (
+        schema
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_after_max_age():
+    """Тест: каталог перечитывается не чаще max_age, при ошибке остаётся прежний."""
+    clock = FakeClock()
+    catalog = SchemaCatalog(MagicMock(), max_age=600, clock=clock)
+    catalog.refresh = AsyncMock(side_effect=lambda: setattr(catalog, "_refreshed_at", clock()))
+
+    await catalog.get_prompt_schema()
+    clock.now += 599
+    await catalog.get_prompt_schema()
+    assert catalog.refresh.await_count == 1
+
+    clock.now += 1
+    catalog.refresh.side_effect = Exception("connection lost")
+    assert await catalog.get_prompt_schema() is None
+    await catalog.get_prompt_schema()
+    assert catalog.refresh.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_generator_uses_catalog_schema():
+    """Тест: промпт генерации SQL содержит схему из каталога, без каталога - схему по умолчанию."""
+    llm_client = MagicMock()
+    llm_client.get_response = AsyncMock(return_value="SELECT 1")
+    catalog = MagicMock()
+    catalog.get_prompt_schema = AsyncMock(return_value="**Таблица: message_daily_stats**")
+
+    await SQLGenerator(llm_client, schema_catalog=catalog).generate_sql("Сколько сообщений?")
+    with_catalog = llm_client.get_response.await_args.kwargs["messages"][0].content
+    await SQLGenerator(llm_client).generate_sql("Сколько сообщений?")
+    without_catalog = llm_client.get_response.await_args.kwargs["messages"][0].content
+
+    assert "**Таблица: message_daily_stats**" in with_catalog
+    assert DEFAULT_SQL_SCHEMA not in with_catalog
+    assert DEFAULT_SQL_SCHEMA in without_catalog
@@ -0,0 +1,73 @@
+"""Тесты для кэша text-to-SQL."""
+
+from backend.api.result_summary import ResultSummary
+from backend.api.sql_cache import SQLCache, normalize_question
+
+
+class FakeClock:
+    """Управляемые часы для TTL результатов."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_normalize_question():
+    """Тест: регистр, ё, пробелы и знаки в конце не влияют на ключ."""
+    assert normalize_question("  Сколько   сообщений ещё сегодня?? ") == (
+        "сколько сообщений еще сегодня"
+    )
+    assert normalize_question("Топ пользователей за неделю.") == normalize_question(
+        "топ пользователей за неделю"
+    )
+
+
+def test_sql_by_normalized_question():
+    """Тест: SQL находится по нормализованному вопросу."""
+    cache = SQLCache()
+
+    assert cache.get_sql("Сколько сообщений?") is None
+    cache.put_sql("Сколько сообщений?", "SELECT COUNT(*) FROM messages")
+
+    assert cache.get_sql("сколько  сообщений") == "SELECT COUNT(*) FROM messages"
+    assert cache.stats.sql_hits == 1
+    assert cache.stats.sql_misses == 1
+
+
+def test_results_invalidated_by_version():
+    """Тест: результаты отдаются, пока версия данных не изменилась."""
+    cache = SQLCache()
+    summary = ResultSummary.from_rows([{"count": 1}])
+    cache.put_results("SELECT 1", 10, summary)
+
+    assert cache.get_results("SELECT 1", 10) is summary
+    assert cache.get_results("SELECT 1", 11) is None
+    assert cache.stats.result_hits == 1
+    assert cache.stats.result_misses == 1
+
+
+def test_results_expire_after_ttl():
+    """Тест: результаты устаревают по времени даже без новых строк."""
+    clock = FakeClock()
+    cache = SQLCache(result_ttl=300, clock=clock)
+    cache.put_results("SELECT 1", 10, ResultSummary.from_rows([{"count": 1}]))
+
+    clock.now += 299
+    assert cache.get_results("SELECT 1", 10) is not None
+    clock.now += 1
+    assert cache.get_results("SELECT 1", 10) is None
+
+
+def test_lru_bounds():
+    """Тест: оба уровня ограничены, вытесняется давно не использованный ключ."""
+    cache = SQLCache(max_questions=2, max_results=2)
+    for i in range(3):
+        cache.put_sql(f"q{i}", f"SELECT {i}")
+        cache.put_results(f"SELECT {i}", 1, ResultSummary())
+
+    assert cache.get_sql("q0") is None
+    assert cache.get_sql("q2") == "SELECT 2"
+    assert cache.get_results("SELECT 0", 1) is None
+    assert cache.get_results("SELECT 1", 1) is not None
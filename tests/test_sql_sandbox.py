@@ -0,0 +1,169 @@
+"""Тесты для ограниченного выполнения SQL admin режима."""
+
+import asyncpg  # type: ignore[import-untyped]
+import pytest
+
+from backend.api.config import APIConfig
+from backend.api.sql_sandbox import READER_ROLE, SQLRejectedError, SQLSandbox
+
+
+@pytest.fixture
+async def sandbox() -> SQLSandbox:
+    """Фикстура для sandbox с маленькими лимитами."""
+    config = APIConfig()
+    sandbox = await SQLSandbox.create(
+        host=config.postgres_host,
+        port=config.postgres_port,
+        database=config.postgres_db,
+        user=config.postgres_user,
+        password=config.postgres_password,
+        pool_size=1,
+        statement_timeout=0.5,
+        max_cost=100_000,
+        max_rows=10,
+    )
+    yield sandbox
+    await sandbox.close()
+
+
+@pytest.mark.asyncio
+async def test_select_with_params(sandbox: SQLSandbox) -> None:
+    """Тест: обычный запрос с параметрами и завершающей ';'."""
+    rows = await sandbox.execute("SELECT $1::int + 1 AS answer;", 41)
+
+    assert rows == [{"answer": 42}]
+
+
+@pytest.mark.asyncio
+async def test_rows_capped(sandbox: SQLSandbox) -> None:
+    """Тест: результат обрезается до max_rows."""
+    rows = await sandbox.execute("SELECT n FROM generate_series(1, 5000) AS n ORDER BY n")
+
+    assert [row["n"] for row in rows] == list(range(1, 11))
+
+
+@pytest.mark.asyncio
+async def test_expensive_query_rejected(sandbox: SQLSandbox) -> None:
+    """Тест: декартово произведение отклоняется по оценке стоимости до выполнения."""
+    with pytest.raises(SQLRejectedError):
+        await sandbox.execute(
+            "SELECT COUNT(*) FROM generate_series(1, 100000) a, generate_series(1, 100000) b"
+        )
+
+
+@pytest.mark.asyncio
+async def test_statement_timeout(sandbox: SQLSandbox) -> None:
+    """Тест: долгий запрос прерывается по statement_timeout."""
+    with pytest.raises(asyncpg.QueryCanceledError):
+        await sandbox.execute("SELECT pg_sleep(5)")
+
+
+@pytest.mark.asyncio
+async def test_writes_rejected(sandbox: SQLSandbox) -> None:
+    """Тест: запись невозможна (роль без прав записи, только чтение, один SELECT)."""
+    with pytest.raises(asyncpg.InsufficientPrivilegeError):
+        await sandbox.execute("SELECT nextval('messages_id_seq')")
+    with pytest.raises(asyncpg.PostgresSyntaxError):
+        await sandbox.execute("DELETE FROM messages")
+    with pytest.raises(asyncpg.PostgresSyntaxError):
+        await sandbox.execute("SELECT 1; DELETE FROM messages")
+
+    # Соединения pool и вне sandbox.execute только для чтения
+    async with sandbox.pool.acquire() as conn:
+        assert await conn.fetchval("SHOW default_transaction_read_only") == "on"
+        # Границы периодов шаблонов - naive UTC
+        assert await conn.fetchval("SHOW timezone") == "UTC"
+
+
+@pytest.mark.asyncio
+async def test_only_allowed_tables(sandbox: SQLSandbox) -> None:
+    """Тест: запросы читают только ALLOWED_TABLES (сессии веб-чата недоступны)."""
+    assert sandbox.role == READER_ROLE
+    assert await sandbox.execute("SELECT COUNT(*) >= 0 AS ok FROM messages") == [{"ok": True}]
+
+    for sql in [
+        "SELECT session_id FROM web_sessions",
+        "SELECT m.id FROM messages m JOIN web_sessions s USING (chat_id)",
+        "SELECT rolname FROM pg_roles",
+    ]:
+        with pytest.raises(SQLRejectedError, match="недоступным таблицам"):
+            await sandbox.execute(sql)
+
+    # Таблицы, которые не видны в плане (запрос внутри функции), закрыты правами роли
+    with pytest.raises(asyncpg.InsufficientPrivilegeError):
+        await sandbox.execute(
+            "SELECT * FROM ts_stat('SELECT to_tsvector(session_id::text) FROM web_sessions')"
+        )
+
+    # Смена роли внутри запроса обнаруживается, результат отбрасывается
+    with pytest.raises(SQLRejectedError, match="роль"):
+        await sandbox.execute("SELECT set_config('role', 'none', true) AS role")
+
+
+@pytest.mark.asyncio
+async def test_dedicated_login(caplog: pytest.LogCaptureFixture) -> None:
+    """Тест: с отдельным логином выход из роли через set_config не открывает другие таблицы."""
+    config = APIConfig()
+    params = {
+        "host": config.postgres_host,
+        "port": config.postgres_port,
+        "database": config.postgres_db,
+        "pool_size": 1,
+    }
+    # Логин приложения читает все таблицы: при старте предупреждение
+    sandbox = await SQLSandbox.create(
+        user=config.postgres_user, password=config.postgres_password, **params
+    )
+    await sandbox.close()
+    assert "SQL_SANDBOX_USER" in caplog.text
+
+    admin = await asyncpg.connect(config.get_db_dsn())
+    await admin.execute("DROP ROLE IF EXISTS aidd_sql_test")
+    await admin.execute(f"CREATE ROLE aidd_sql_test LOGIN PASSWORD 'test' IN ROLE {READER_ROLE}")
+    caplog.clear()
+    try:
+        sandbox = await SQLSandbox.create(user="aidd_sql_test", password="test", **params)
+        try:
+            assert "SQL_SANDBOX_USER" not in caplog.text
+            assert sandbox.role == READER_ROLE
+            # Роль сбрасывается к логину и возвращается до проверки после запроса
+            with pytest.raises(asyncpg.InsufficientPrivilegeError):
+                await sandbox.execute(
+                    "SELECT set_config('role', 'none', true), "
+                    "(SELECT COUNT(*) FROM ts_stat("
+                    "'SELECT to_tsvector(session_id::text) FROM web_sessions')), "
+                    f"set_config('role', '{READER_ROLE}', true)"
+                )
+        finally:
+            await sandbox.close()
+    finally:
+        await admin.execute("DROP ROLE aidd_sql_test")
+        await admin.close()
+
+
+@pytest.mark.asyncio
+async def test_summarize_reads_cursor(sandbox: SQLSandbox) -> None:
+    """Тест: summarize() читает весь результат курсором, в сводке точные min/max/mean."""
+    summary = await sandbox.summarize(
+        "SELECT n, n % 3 AS bucket FROM generate_series(1, 5000) AS n"
+    )
+
+    assert summary.row_count == 5000
+    assert not summary.truncated
+    assert summary.columns["n"].min == 1
+    assert summary.columns["n"].max == 5000
+    assert summary.columns["n"].total / summary.columns["n"].numbers == 2500.5
+    assert len(summary.sample) == summary.sample_size
+    assert "Сводка по колонкам" in summary.to_prompt()
+
+
+@pytest.mark.asyncio
+async def test_summarize_truncated(sandbox: SQLSandbox) -> None:
+    """Тест: summarize() останавливается на max_scan_rows и отмечает обрезку."""
+    sandbox.max_scan_rows = 100
+
+    summary = await sandbox.summarize("SELECT n FROM generate_series(1, 5000) AS n")
+
+    assert summary.row_count == 100
+    assert summary.truncated
+    assert "обрезан" in summary.to_prompt()
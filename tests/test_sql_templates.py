@@ -0,0 +1,175 @@
+"""Тесты для шаблонов SQL частых вопросов admin режима."""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from backend.api.config import APIConfig
+from backend.api.sql_templates import (
+    MAX_TOP_USERS,
+    TEMPLATES,
+    SQLTemplateMatcher,
+    TemplateMatch,
+    parse_period,
+    plural,
+)
+from src.storage.database import Database
+
+# Время в БД - UTC без зоны
+NOW = datetime(2026, 10, 18, 15, 30, tzinfo=UTC).replace(tzinfo=None)
+TODAY = NOW.replace(hour=0, minute=0)
+
+
+@pytest.mark.parametrize(
+    ("question", "name"),
+    [
+        ("Сколько сообщений сегодня?", "message_count"),
+        ("сколько сообщений было за последние 7 дней", "message_count"),
+        ("Количество сообщений", "message_count"),
+        ("Сколько активных пользователей за неделю?", "user_count"),
+        ("Топ 5 пользователей за месяц", "top_users"),
+        ("самые активные пользователи вчера", "top_users"),
+        ("Средняя длина сообщений за 30 дней", "average_length"),
+        ("Активность по часам за 24 часа", "activity_by_hour"),
+        ("покажи сообщения по часам сегодня", "activity_by_hour"),
+    ],
+)
+def test_match_intents(question, name):
+    """Тест: частые вопросы распознаются шаблонами."""
+    match = SQLTemplateMatcher().match(question, NOW)
+
+    assert match is not None
+    assert match.template.name == name
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "сколько сообщений от пользователя 42",
+        "сколько сообщений за прошлый вторник",
+        "какие темы обсуждали чаще всего",
+        "топ 0 пользователей",
+    ],
+)
+def test_unknown_questions_go_to_llm(question):
+    """Тест: вопросы с дополнительными условиями шаблонами не обслуживаются."""
+    assert SQLTemplateMatcher().match(question, NOW) is None
+
+
+def test_parse_period():
+    """Тест: границы и подписи периодов."""
+    assert parse_period("сегодня", NOW) == parse_period("за сегодня", NOW)
+    assert parse_period("сегодня", NOW).start == TODAY
+    yesterday = parse_period("вчера", NOW)
+    assert (yesterday.start, yesterday.end) == (TODAY - timedelta(days=1), TODAY)
+
+    week = parse_period("за последние 7 дней", NOW)
+    assert (week.start, week.end, week.label) == (NOW - timedelta(days=7), NOW, "за 7 дней")
+    assert parse_period("за неделю", NOW).start == week.start
+    assert parse_period("за 24 часа", NOW).label == "за 24 часа"
+    assert parse_period("за 2 недели", NOW).label == "за 2 недели"
+    assert parse_period("", NOW).label == "за всё время"
+    assert parse_period("за прошлый вторник", NOW) is None
+
+
+def test_plural():
+    """Тест: формы слова для чисел."""
+    forms = ("сообщение", "сообщения", "сообщений")
+    assert [plural(n, forms) for n in (1, 2, 5, 11, 21, 22, 112)] == [
+        "сообщение",
+        "сообщения",
+        "сообщений",
+        "сообщений",
+        "сообщение",
+        "сообщения",
+        "сообщений",
+    ]
+
+
+def test_top_users_limit():
+    """Тест: N для топа передаётся параметром и ограничено."""
+    matcher = SQLTemplateMatcher()
+
+    assert matcher.match("топ 5 пользователей", NOW).args[2] == 5
+    assert matcher.match("топ пользователей", NOW).args[2] == 10
+    assert matcher.match("топ 100500 пользователей", NOW).args[2] == MAX_TOP_USERS
+
+
+def test_render_answers():
+    """Тест: детерминированные ответы по строкам результата."""
+    matcher = SQLTemplateMatcher()
+
+    count = matcher.match("сколько сообщений сегодня", NOW)
+    assert count.render([{"messages": 1234}]) == "Сегодня: 1 234 сообщения."
+
+    top = matcher.match("топ 2 пользователей за неделю", NOW)
+    assert top.render(
+        [
+            {"user_id": 7, "username": "alice", "messages": 21},
+            {"user_id": 9, "username": "bob", "messages": 5},
+        ]
+    ) == (
+        "Топ-2 пользователей по сообщениям за неделю:\n"
+        "1. alice (id 7) - 21 сообщение\n"
+        "2. bob (id 9) - 5 сообщений"
+    )
+    assert top.render([]) == "За неделю сообщений от пользователей нет."
+
+
+def test_hit_rate():
+    """Тест: счётчики попаданий по шаблонам и доля попаданий."""
+    matcher = SQLTemplateMatcher()
+
+    matcher.match("сколько сообщений сегодня", NOW)
+    matcher.match("сколько сообщений вчера", NOW)
+    matcher.match("топ пользователей", NOW)
+    matcher.match("о чём пишут пользователи", NOW)
+
+    assert matcher.stats.hits == {"message_count": 2, "top_users": 1}
+    assert matcher.stats.misses == 1
+    assert matcher.stats.hit_rate == 0.75
+
+
+@pytest.mark.asyncio
+async def test_templates_execute_on_database():
+    """Тест: SQL всех шаблонов выполняется на реальной схеме."""
+    config = APIConfig()
+    async with Database(
+        host=config.postgres_host,
+        port=config.postgres_port,
+        database=config.postgres_db,
+        user=config.postgres_user,
+        password=config.postgres_password,
+    ) as database:
+        assert database.pool is not None
+        now = datetime.now(UTC).replace(tzinfo=None)
+        async with database.pool.acquire() as conn:
+            await conn.execute("DELETE FROM messages")
+            await conn.executemany(
+                "INSERT INTO messages (user_id, chat_id, role, content, content_length, "
+                "username, created_at) VALUES ($1, $1, 'user', 'hi', $2, $3, $4)",
+                [
+                    (1, 10, "alice", now - timedelta(minutes=5)),
+                    (1, 20, "alice", now - timedelta(minutes=3)),
+                    (2, 30, "bob", now - timedelta(days=3)),
+                ],
+            )
+
+            results: dict[str, list[dict]] = {}
+            for template in TEMPLATES:
+                match = TemplateMatch(
+                    template,
+                    parse_period("за неделю", now),
+                    10 if "$3" in template.sql else None,
+                )
+                rows = [dict(row) for row in await conn.fetch(match.sql, *match.args)]
+                results[template.name] = rows
+                assert match.render(rows)
+
+            await conn.execute("DELETE FROM messages")
+
+    assert results["message_count"] == [{"messages": 3}]
+    assert results["user_count"] == [{"users": 2}]
+    assert [row["username"] for row in results["top_users"]] == ["alice", "bob"]
+    assert float(results["average_length"][0]["avg_length"]) == 20.0
+    assert sum(row["messages"] for row in results["activity_by_hour"]) == 3
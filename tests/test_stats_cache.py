@@ -0,0 +1,219 @@
+"""Тесты для кэша ответов /api/stats."""
+
+import asyncio
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.api.collectors import MockStatCollector
+from backend.api.models import GranularityEnum, PeriodEnum, StatsResponse
+from backend.api.server import app
+from backend.api.stats_cache import StatsCache, StatsQuery, etag_matches
+
+
+class FakeClock:
+    """Управляемые часы для TTL."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_loader(delay: float = 0.0) -> AsyncMock:
+    """Хелпер: загрузчик mock статистики со счётчиком вызовов."""
+    collector = MockStatCollector()
+    versions = iter(range(1, 1000))
+
+    async def load(query: StatsQuery) -> StatsResponse:
+        await asyncio.sleep(delay)
+        stats = await collector.get_stats(query.period, query.granularity, query.start, query.end)
+        # Каждая загрузка возвращает новое значение
+        stats.metrics.total_messages.value = float(next(versions))
+        return stats.model_copy(update={"approximate": query.approximate})
+
+    return AsyncMock(side_effect=load)
+
+
+@pytest.mark.asyncio
+async def test_fresh_entry_served_from_cache():
+    """Тест: в пределах TTL ответ берётся из кэша без загрузки."""
+    clock = FakeClock()
+    loader = make_loader()
+    cache = StatsCache(loader, ttl=60, max_stale=600, clock=clock)
+
+    first = await cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS))
+    clock.now += 30
+    second = await cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS))
+
+    assert second is first
+    assert cache.age(second) == 30
+    assert loader.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_keys_are_separate():
+    """Тест: период и approximate - разные ключи кэша."""
+    loader = make_loader()
+    cache = StatsCache(loader, clock=FakeClock())
+
+    await cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS))
+    await cache.get(StatsQuery(PeriodEnum.THIRTY_DAYS))
+    await cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS, approximate=True))
+
+    assert loader.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_lru_bound_on_entries():
+    """Тест: количество ключей ограничено, вытесняется давно не запрошенный."""
+    loader = make_loader()
+    cache = StatsCache(loader, max_entries=2, clock=FakeClock())
+    week = StatsQuery(PeriodEnum.SEVEN_DAYS)
+    month = StatsQuery(PeriodEnum.THIRTY_DAYS)
+    hourly = StatsQuery(PeriodEnum.TWENTY_FOUR_HOURS, GranularityEnum.HOUR)
+
+    await cache.get(week)
+    await cache.get(month)
+    await cache.get(week)
+    await cache.get(hourly)
+    assert loader.await_count == 3
+
+    await cache.get(week)
+    assert loader.await_count == 3
+    await cache.get(month)
+    assert loader.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    """Тест: параллельные запросы без кэша ждут одну загрузку."""
+    loader = make_loader(delay=0.05)
+    cache = StatsCache(loader, clock=FakeClock())
+
+    results = await asyncio.gather(
+        *(cache.get(StatsQuery(PeriodEnum.THREE_MONTHS)) for _ in range(10))
+    )
+
+    assert loader.await_count == 1
+    assert len({r.etag for r in results}) == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_served_while_one_refresh_runs():
+    """Тест: устаревший ответ отдаётся сразу, обновление - одна фоновая задача."""
+    clock = FakeClock()
+    loader = make_loader(delay=0.05)
+    cache = StatsCache(loader, ttl=60, max_stale=600, clock=clock)
+    first = await cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS))
+
+    clock.now += 120
+    stale = await asyncio.gather(*(cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS)) for _ in range(5)))
+
+    assert all(entry is first for entry in stale)
+    await asyncio.sleep(0.1)
+    assert loader.await_count == 2
+
+    refreshed = await cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS))
+    assert refreshed.etag != first.etag
+    assert cache.age(refreshed) == 0
+
+
+@pytest.mark.asyncio
+async def test_too_old_entry_waits_for_load():
+    """Тест: ответ старше ttl + max_stale не отдаётся, запрос ждёт загрузку."""
+    clock = FakeClock()
+    loader = make_loader()
+    cache = StatsCache(loader, ttl=60, max_stale=600, clock=clock)
+    first = await cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS))
+
+    clock.now += 1000
+    second = await cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS))
+
+    assert second.etag != first.etag
+    assert loader.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_stale_entry():
+    """Тест: ошибка фонового обновления не портит кэш."""
+    clock = FakeClock()
+    loader = make_loader()
+    cache = StatsCache(loader, ttl=60, max_stale=600, clock=clock)
+    first = await cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS))
+
+    loader.side_effect = RuntimeError("db down")
+    clock.now += 120
+    assert await cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS)) is first
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert await cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS)) is first
+
+
+@pytest.mark.asyncio
+async def test_load_error_without_entry_propagates():
+    """Тест: без ответа в кэше ошибка загрузки передаётся вызывающему."""
+    cache = StatsCache(AsyncMock(side_effect=RuntimeError("db down")), clock=FakeClock())
+
+    with pytest.raises(RuntimeError):
+        await cache.get(StatsQuery(PeriodEnum.SEVEN_DAYS))
+
+
+def test_etag_matches():
+    """Тест: сравнение If-None-Match с ETag."""
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"x"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_stats_endpoint_etag_and_304():
+    """Тест: /api/stats отдаёт ETag, Cache-Control, Age и 304 на If-None-Match."""
+    app.state.stats_cache = StatsCache(make_loader(), ttl=60, clock=FakeClock())
+    client = TestClient(app)
+
+    response = client.get("/api/stats?period=7d")
+    assert response.status_code == 200
+    assert StatsResponse.model_validate(response.json()).period == PeriodEnum.SEVEN_DAYS
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, max-age=60"
+    assert response.headers["Age"] == "0"
+    assert response.headers["X-Cache"] == "HIT"
+
+    not_modified = client.get("/api/stats?period=7d", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    other = client.get("/api/stats?period=30d", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_stats_endpoint_granularity_and_range():
+    """Тест: from/to задают custom диапазон, некорректные параметры - 422."""
+    loader = make_loader()
+    app.state.stats_cache = StatsCache(loader, clock=FakeClock())
+    client = TestClient(app)
+
+    hourly = client.get("/api/stats?period=24h")
+    assert hourly.status_code == 200
+    assert hourly.json()["granularity"] == "hour"
+    assert len(hourly.json()["timeline"]) == 24
+
+    custom = client.get("/api/stats?from=2024-01-01T00:00&to=2024-01-03T00:00%2B03:00")
+    assert custom.status_code == 200
+    query = loader.await_args.args[0]
+    assert query.period == PeriodEnum.CUSTOM
+    assert query.granularity == GranularityEnum.DAY
+    assert query.start == datetime(2024, 1, 1, tzinfo=UTC)
+    assert query.end == datetime(2024, 1, 2, 21, tzinfo=UTC)
+
+    assert client.get("/api/stats?period=custom").status_code == 422
+    assert client.get("/api/stats?from=2024-01-03&to=2024-01-01").status_code == 422
+    assert client.get("/api/stats?period=3m&granularity=hour").status_code == 422
@@ -1,8 +1,13 @@
 """Тесты для Database класса с PostgreSQL."""
 
+import asyncio
+import logging
+from datetime import UTC, datetime, timedelta
+
 import pytest
 
 from src.storage.database import Database
+from src.storage.history_cache import HistoryCache
 from src.storage.models import Message
 
 
@@ -44,6 +49,64 @@ async def test_init_db():
         assert db._pool is not None
 
 
+@pytest.mark.asyncio
+async def test_session_timezone_utc(db):
+    """Тест: сессии pool в UTC, DEFAULT created_at совпадает с naive UTC из Python."""
+    before = datetime.now(UTC).replace(tzinfo=None)
+    async with db._pool.acquire() as conn:
+        assert await conn.fetchval("SHOW timezone") == "UTC"
+        await conn.execute("ALTER DATABASE systech_aidd SET timezone = 'Asia/Tokyo'")
+    try:
+        # Новые соединения получают timezone БД, но pool его переопределяет
+        async with Database(
+            host="localhost",
+            port=5432,
+            database="systech_aidd",
+            user="postgres",
+            password="postgres",
+        ) as database:
+            assert database._pool is not None
+            async with database._pool.acquire() as conn:
+                created_at = await conn.fetchval(
+                    "INSERT INTO messages (user_id, chat_id, role, content, content_length, "
+                    "username) VALUES (1, 1, 'user', 'hi', 2, 'u') RETURNING created_at"
+                )
+    finally:
+        async with db._pool.acquire() as conn:
+            await conn.execute("ALTER DATABASE systech_aidd RESET timezone")
+
+    assert before - timedelta(seconds=5) <= created_at <= datetime.now(UTC).replace(tzinfo=None)
+
+
+@pytest.mark.asyncio
+async def test_init_db_concurrent():
+    """Тест одновременного применения миграций (бот и API стартуют вместе)."""
+    databases = [
+        Database(
+            host="localhost",
+            port=5432,
+            database="systech_aidd",
+            user="postgres",
+            password="postgres",
+        )
+        for _ in range(3)
+    ]
+    for database in databases:
+        await database.connect()
+    try:
+        await asyncio.gather(*(database.init_db() for database in databases))
+
+        assert databases[0]._pool is not None
+        async with databases[0]._pool.acquire() as conn:
+            # Advisory lock отпущен после миграций
+            assert not await conn.fetchval(
+                "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory')"
+            )
+    finally:
+        for database in databases:
+            await database.close()
+
+
 @pytest.mark.asyncio
 async def test_save_message_user(db):
     """Тест сохранения user сообщения с автоматическим content_length."""
@@ -292,3 +355,251 @@ async def test_connection_not_opened_raises_error():
 
     with pytest.raises(RuntimeError, match="Database not connected"):
         await db.save_message(msg)
+
+
+@pytest.fixture
+async def write_behind_db():
+    """Фикстура для БД в режиме write-behind.
+
+    Большой интервал flush, чтобы сообщения гарантированно оставались в очереди.
+    """
+    database = Database(
+        host="localhost",
+        port=5432,
+        database="systech_aidd",
+        user="postgres",
+        password="postgres",
+        write_behind=True,
+        flush_batch_size=100,
+        flush_interval=60,
+    )
+    async with database:
+        assert database._pool is not None
+        async with database._pool.acquire() as conn:
+            await conn.execute("TRUNCATE TABLE messages RESTART IDENTITY CASCADE")
+        yield database
+
+
+async def _count_rows(db: Database, chat_id: int) -> int:
+    """Хелпер: количество строк в messages для чата."""
+    assert db._pool is not None
+    async with db._pool.acquire() as conn:
+        return int(await conn.fetchval("SELECT COUNT(*) FROM messages WHERE chat_id = $1", chat_id))
+
+
+@pytest.mark.asyncio
+async def test_write_behind_read_your_writes(write_behind_db):
+    """Тест что сообщения из очереди видны в get_history до flush."""
+    for i in range(3):
+        await write_behind_db.save_message(
+            Message(
+                user_id=900,
+                chat_id=900,
+                role="user" if i % 2 == 0 else "assistant",
+                content=f"Message {i}",
+                content_length=0,
+                username="test_user",
+            )
+        )
+
+    # В БД ещё ничего нет
+    assert await _count_rows(write_behind_db, 900) == 0
+
+    history = await write_behind_db.get_history(chat_id=900, user_id=900, limit=2)
+    assert [m.content for m in history] == ["Message 1", "Message 2"]
+
+
+@pytest.mark.asyncio
+async def test_write_behind_flush(write_behind_db):
+    """Тест что flush записывает очередь в БД без дубликатов в истории."""
+    for i in range(5):
+        await write_behind_db.save_message(
+            Message(
+                user_id=901,
+                chat_id=901,
+                role="user",
+                content=f"Message {i}",
+                content_length=0,
+                username="test_user",
+            )
+        )
+
+    await write_behind_db.flush()
+
+    assert await _count_rows(write_behind_db, 901) == 5
+    history = await write_behind_db.get_history(chat_id=901, user_id=901, limit=10)
+    assert [m.content for m in history] == [f"Message {i}" for i in range(5)]
+    assert history[0].content_length == len("Message 0")
+
+
+@pytest.mark.asyncio
+async def test_write_behind_flush_on_close():
+    """Тест что при закрытии очередь записывается в БД."""
+    db = Database(
+        host="localhost",
+        port=5432,
+        database="systech_aidd",
+        user="postgres",
+        password="postgres",
+        write_behind=True,
+        flush_interval=60,
+    )
+    async with db:
+        assert db._pool is not None
+        async with db._pool.acquire() as conn:
+            await conn.execute("DELETE FROM messages WHERE chat_id = 902")
+        await db.save_message(
+            Message(
+                user_id=902, chat_id=902, role="user", content="Bye", content_length=3, username="test_user"
+            )
+        )
+
+    async with db:
+        assert await _count_rows(db, 902) == 1
+
+
+@pytest.mark.asyncio
+async def test_write_behind_clear_history_includes_pending(write_behind_db):
+    """Тест что clear_history удаляет и сообщения из очереди."""
+    await write_behind_db.save_message(
+        Message(
+            user_id=903, chat_id=903, role="user", content="Test", content_length=4, username="test_user"
+        )
+    )
+
+    await write_behind_db.clear_history(chat_id=903, user_id=903)
+
+    history = await write_behind_db.get_history(chat_id=903, user_id=903, limit=10)
+    assert len(history) == 0
+
+
+@pytest.fixture
+async def cached_db():
+    """Фикстура для БД с кэшем истории."""
+    database = Database(
+        host="localhost",
+        port=5432,
+        database="systech_aidd",
+        user="postgres",
+        password="postgres",
+        history_cache=HistoryCache(max_dialogs=10, max_messages=5),
+    )
+    async with database:
+        assert database._pool is not None
+        async with database._pool.acquire() as conn:
+            await conn.execute("TRUNCATE TABLE messages RESTART IDENTITY CASCADE")
+        yield database
+
+
+@pytest.mark.asyncio
+async def test_history_cache_hit_includes_saved_messages(cached_db):
+    """Тест что после загрузки новые сообщения попадают в кэш и история корректна."""
+    await cached_db.save_message(
+        Message(user_id=1000, chat_id=1000, role="user", content="First", content_length=5, username="u")
+    )
+    history = await cached_db.get_history(chat_id=1000, user_id=1000, limit=5)
+    assert [m.content for m in history] == ["First"]
+
+    await cached_db.save_message(
+        Message(user_id=1000, chat_id=1000, role="assistant", content="Second", content_length=6, username="u")
+    )
+    history = await cached_db.get_history(chat_id=1000, user_id=1000, limit=5)
+
+    assert [m.content for m in history] == ["First", "Second"]
+    assert history[1].id is not None
+    assert cached_db.history_cache.stats.hits == 1
+    assert cached_db.history_cache.stats.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_history_cache_invalidated_on_clear(cached_db):
+    """Тест что clear_history сбрасывает кэш диалога."""
+    await cached_db.save_message(
+        Message(user_id=1001, chat_id=1001, role="user", content="Test", content_length=4, username="u")
+    )
+    await cached_db.get_history(chat_id=1001, user_id=1001, limit=5)
+
+    await cached_db.clear_history(chat_id=1001, user_id=1001)
+
+    history = await cached_db.get_history(chat_id=1001, user_id=1001, limit=5)
+    assert history == []
+    assert cached_db.history_cache.stats.invalidations == 1
+
+
+@pytest.mark.asyncio
+async def test_history_cache_stats_logged_on_close(caplog):
+    """Тест что при закрытии Database статистика кэша истории пишется в лог."""
+    database = Database(
+        host="localhost",
+        port=5432,
+        database="systech_aidd",
+        user="postgres",
+        password="postgres",
+        history_cache=HistoryCache(max_dialogs=10, max_messages=5),
+    )
+    with caplog.at_level(logging.INFO, logger="src.storage.database"):
+        async with database:
+            await database.clear_history(chat_id=1002, user_id=1002)
+            await database.get_history(chat_id=1002, user_id=1002, limit=5)
+            await database.get_history(chat_id=1002, user_id=1002, limit=5)
+
+    assert "History cache stats: hits=1, misses=1, hit_rate=50.0%" in caplog.text
+    assert "size=1" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_append_and_get_history(db):
+    """Тест сохранения сообщения и получения истории одним запросом."""
+    for i in range(3):
+        await db.save_message(
+            Message(
+                user_id=1100,
+                chat_id=1100,
+                role="user" if i % 2 == 0 else "assistant",
+                content=f"Message {i}",
+                content_length=len(f"Message {i}"),
+                username="test_user",
+            )
+        )
+
+    history = await db.append_and_get_history(
+        Message(user_id=1100, chat_id=1100, role="user", content="New", content_length=0, username="u"),
+        limit=3,
+    )
+
+    assert [m.content for m in history] == ["Message 1", "Message 2", "New"]
+    assert history[-1].id is not None
+    assert history[-1].content_length == 3
+
+    # Сообщение действительно сохранено
+    stored = await db.get_history(chat_id=1100, user_id=1100, limit=10)
+    assert len(stored) == 4
+
+
+@pytest.mark.asyncio
+async def test_append_and_get_history_fills_cache(cached_db):
+    """Тест что append_and_get_history заполняет кэш истории."""
+    await cached_db.append_and_get_history(
+        Message(user_id=1101, chat_id=1101, role="user", content="Hi", content_length=2, username="u"),
+        limit=5,
+    )
+
+    history = await cached_db.get_history(chat_id=1101, user_id=1101, limit=5)
+
+    assert [m.content for m in history] == ["Hi"]
+    assert cached_db.history_cache.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_token_count_saved_and_budget_applied(db):
+    """Тест что token_count сохраняется и история обрезается по бюджету токенов."""
+    for content in ["A" * 400, "B" * 400, "C" * 4]:
+        await db.save_message(
+            Message(user_id=1200, chat_id=1200, role="user", content=content, content_length=0, username="u")
+        )
+
+    history = await db.get_history(chat_id=1200, user_id=1200, limit=10)
+    assert [m.token_count for m in history] == [100, 100, 1]
+
+    history = await db.get_history(chat_id=1200, user_id=1200, limit=10, max_tokens=150)
+    assert [m.content for m in history] == ["B" * 400, "C" * 4]
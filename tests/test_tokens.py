@@ -0,0 +1,78 @@
+"""Тесты для оценки токенов и выбора истории по бюджету."""
+
+from src.storage.models import Message
+from src.storage.tokens import estimate_tokens, fit_token_budget, message_tokens
+
+
+def make_message(content: str, token_count: int | None = None) -> Message:
+    """Хелпер для создания сообщения."""
+    return Message(
+        user_id=1,
+        chat_id=1,
+        role="user",
+        content=content,
+        content_length=len(content),
+        username="test_user",
+        token_count=token_count,
+    )
+
+
+def test_estimate_tokens_empty():
+    """Тест оценки пустого текста."""
+    assert estimate_tokens("") == 0
+
+
+def test_estimate_tokens_ascii_and_punctuation():
+    """Тест оценки латиницы и пунктуации."""
+    # "Hello" -> 2, "," -> 1, "world" -> 2, "!" -> 1
+    assert estimate_tokens("Hello, world!") == 6
+
+
+def test_estimate_tokens_cyrillic_denser():
+    """Тест что кириллица оценивается в большее число токенов, чем латиница той же длины."""
+    assert estimate_tokens("Гравитация") > estimate_tokens("Gravitation")
+
+
+def test_estimate_tokens_grows_with_length():
+    """Тест что оценка растёт с длиной текста."""
+    short = "Почему небо голубое?"
+    assert estimate_tokens(short * 10) > estimate_tokens(short)
+
+
+def test_message_tokens_caches_value():
+    """Тест что оценка кэшируется в token_count."""
+    msg = make_message("Привет")
+
+    tokens = message_tokens(msg)
+
+    assert msg.token_count == tokens
+
+
+def test_fit_token_budget_keeps_newest():
+    """Тест что выбираются самые новые сообщения в пределах бюджета."""
+    messages = [make_message(f"m{i}", token_count=10) for i in range(5)]
+
+    selected = fit_token_budget(messages, max_tokens=25)
+
+    assert [m.content for m in selected] == ["m3", "m4"]
+
+
+def test_fit_token_budget_all_fit():
+    """Тест что короткая история возвращается целиком."""
+    messages = [make_message(f"m{i}", token_count=1) for i in range(3)]
+
+    assert fit_token_budget(messages, max_tokens=100) == messages
+
+
+def test_fit_token_budget_always_keeps_last_message():
+    """Тест что последнее сообщение включается даже сверх бюджета."""
+    messages = [make_message("old", token_count=1), make_message("huge", token_count=500)]
+
+    selected = fit_token_budget(messages, max_tokens=100)
+
+    assert [m.content for m in selected] == ["huge"]
+
+
+def test_fit_token_budget_empty():
+    """Тест пустой истории."""
+    assert fit_token_budget([], max_tokens=100) == []